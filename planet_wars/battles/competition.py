@@ -3,6 +3,7 @@ import warnings
 import pandas as pd
 
 from planet_wars.battles.tournament import Tournament
+from planet_wars.rounds.view_rounds import save_battle_results_df
 from planet_wars.player_bots.baseline_code.baseline_bot import AttackWeakestPlanetFromStrongestBot, \
     AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
 
@@ -31,7 +32,7 @@ if __name__ == '__main__':
     print(battle_results_df)
 
     # player_scores_df.to_parquet("./player_scores_df.parquet")
-    battle_results_df.to_parquet("./battle_results_df.parquet")
+    save_battle_results_df(battle_results_df, "./battle_results_df.parquet")
     # player_scores_df.to_csv("./player_scores_df.csv")
     battle_results_df.to_csv("./battle_results_df.csv")
     # TODO commit the saved df so all players can see the battle results
\ No newline at end of file
@@ -1,7 +1,7 @@
 import os
 import random
 import time
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 
 import pandas as pd
 
@@ -9,7 +9,10 @@ from dataclasses import dataclass
 
 from planet_wars import PLANET_WARS_MODULE_PATH, SHOW_GAME_JAR_PATH, TMP_DIR_PATH
 from planet_wars.engine.game_logic import GameManager
+from planet_wars.engine.map_library import get_map_library
+from planet_wars.engine.scheduler import LockstepScheduler
 from planet_wars.planet_wars import Player, PlanetWars, list_to_data_frame
+from planet_wars.replays.archive import ReplayArchive, ReplayArchiveWriter
 
 
 @dataclass
@@ -25,7 +28,8 @@ class BattleResult:
     player_1_score: int
     player_2_score: int
     turns: int  # How many turns the battle occurred
-    description_for_display: str  # String representation of the battle for display
+    # String representation of the battle for display, None if the replay was written to the tournament's replay archive
+    description_for_display: Optional[str]
     end_game_object: PlanetWars  # The PlanetWars object after the game ended
 
 
@@ -70,17 +74,28 @@ class Tournament:
     def __init__(
             self,
             players: List[Player],
-            maps: List[str],
+            maps: List[Union[str, PlanetWars]],
             raise_bot_exceptions: bool=False,
-            all_against_all: bool = True
+            all_against_all: bool = True,
+            coalesce_fleets: bool = False,
+            concurrent_games: int = 1,
+            turn_time_limit: Optional[float] = None,
+            replay_archive_path: Optional[str] = None
     ):
         """
         Battles will be between each player in each map.
         Each 2 players and map will have 2 battles - changing sides between them.
         :param players: List of players
-        :param maps: List of maps
+        :param maps: List of maps, as strings or PlanetWars objects
         :param raise_bot_exceptions: If False catch exceptions from the player bots
         :param all_against_all: If True all bots play against all bots
+        :param coalesce_fleets: If True the games keep fleets with the same owner, destination and arrival turn as one
+                                record (see GameManager)
+        :param concurrent_games: How many battles run together. With more than 1 the battles run turn by turn
+                                 together and each bot gets all its pending turns in one Player.play_turns call.
+        :param turn_time_limit: Seconds each bot has for its turn, given to the bots as a deadline (see GameManager)
+        :param replay_archive_path: If given the replays are written to a replay archive in this path while the
+                                    battles run, instead of kept in memory in the battle results (see replays.archive)
         """
         assert len(players) >= 2, "tournament needs at least 2 players"
         assert len(maps) >= 1, "tournament needs at least 1 map"
@@ -90,6 +105,13 @@ class Tournament:
         self.battle_results = []
         self.last_battle_id = 0
         self.all_against_all = all_against_all
+        self.coalesce_fleets = coalesce_fleets
+        self.concurrent_games = concurrent_games
+        self.turn_time_limit = turn_time_limit
+        self.replay_archive_path = replay_archive_path
+        # Opened on the first battle, closed after the battles of run_battles (see close)
+        self._replay_archive: Optional[ReplayArchiveWriter] = None
+        self._replay_archive_started = False
 
     def run_tournament(self) -> List[BattleResult]:
         """
@@ -99,13 +121,10 @@ class Tournament:
         self.battle_results = []
         for map_str in self.maps:
             if self.all_against_all:
-                for player1 in self.players:
-                    for player2 in self.players:
-                        if player1 == player2:
-                            continue
-                        self.battle_results.append(
-                            self.run_battle(map_str, player1=player1, player2=player2)
-                        )
+                self.battle_results.extend(self.run_battles([
+                    (map_str, player1, player2)
+                    for player1 in self.players for player2 in self.players if player1 != player2
+                ]))
             else:
                 # Shuffle the players so the pairs are random
                 shuffled_players = self.players.copy()
@@ -134,8 +153,8 @@ class Tournament:
 
                     next_round_players = []
                     # Run the current round battles
-                    for player1, player2 in pairs:
-                        battle_result = self.run_battle(map_str, player1=player1, player2=player2)
+                    round_results = self.run_battles([(map_str, player1, player2) for player1, player2 in pairs])
+                    for (player1, player2), battle_result in zip(pairs, round_results):
                         self.battle_results.append(battle_result)
 
                         # The winner goes to the next round
@@ -275,7 +294,7 @@ class Tournament:
             ]
         ).set_index("battle_id")
 
-    def run_battle(self, map_str: str, player1: Player, player2: Player) -> BattleResult:
+    def run_battle(self, map_str: Union[str, PlanetWars], player1: Player, player2: Player) -> BattleResult:
         """
         Run a battle in the given map between the given player 1 and player 2. Returns the battle results.
         :param map_str: The map to battle in
@@ -283,10 +302,68 @@ class Tournament:
         :param player2: Player 2 bot
         :return: The BattleResult
         """
-        print(f"run battle between {self._get_player_name(player1)} and {self._get_player_name(player2)}")
-        game_manager = GameManager(map_str, player1, player2, self.raise_bot_exceptions)
+        game_manager = self._create_game_manager(map_str, player1, player2)
         finish_state = game_manager.run_game()
+        return self._create_battle_result(game_manager, finish_state)
+
+    def run_battles(self, battles: List[Tuple[Union[str, PlanetWars], Player, Player]]) -> List[BattleResult]:
+        """
+        Run the given battles, concurrent_games battles at a time (see LockstepScheduler).
+        :param battles: (map, player 1, player 2) of each battle
+        :return: The BattleResult of each battle, in the order of the given battles
+        """
+        try:
+            if self.concurrent_games <= 1:
+                return [
+                    self.run_battle(map_str, player1=player1, player2=player2) for map_str, player1, player2 in battles
+                ]
 
+            game_managers = [
+                self._create_game_manager(map_str, player1, player2) for map_str, player1, player2 in battles
+            ]
+            finish_states = LockstepScheduler(self.concurrent_games).run(game_managers)
+            return [
+                self._create_battle_result(game_manager, finish_state)
+                for game_manager, finish_state in zip(game_managers, finish_states)
+            ]
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Close the replay archive file, if open. Called at the end of run_battles - call it (or use the tournament as a
+        context manager) after running battles with run_battle. Later battles add their replays to the same archive.
+        """
+        if self._replay_archive is not None:
+            self._replay_archive.close()
+            self._replay_archive = None
+
+    def __enter__(self) -> "Tournament":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _create_game_manager(self, map_str: Union[str, PlanetWars], player1: Player, player2: Player) -> GameManager:
+        print(f"run battle between {self._get_player_name(player1)} and {self._get_player_name(player2)}")
+        game_manager = GameManager(
+            map_str, player1, player2, self.raise_bot_exceptions, self.coalesce_fleets,
+            turn_time_limit=self.turn_time_limit
+        )
+        if self.replay_archive_path is not None:
+            if self._replay_archive is None:
+                # After close, reopen in append mode to keep the replays of the earlier battles
+                self._replay_archive = ReplayArchiveWriter(
+                    self.replay_archive_path, append=self._replay_archive_started
+                )
+                self._replay_archive_started = True
+            game_manager.set_replay_writer(self._replay_archive.new_replay(game_manager.get_map_description()))
+        return game_manager
+
+    def _create_battle_result(self, game_manager: GameManager, finish_state: str) -> BattleResult:
+        """
+        :return: The BattleResult of the given game that ended with the given finish state
+        """
         winner = None
         if finish_state == GameManager.PLAYER_1_WIN_STATE:
             winner = 1
@@ -296,16 +373,21 @@ class Tournament:
             winner = 0
 
         self.last_battle_id += 1
+        if game_manager.replay_writer is not None:
+            self._replay_archive.finish_replay(game_manager.replay_writer, self.last_battle_id)
+            description_for_display = None
+        else:
+            description_for_display = game_manager.get_description_for_display()
         return BattleResult(
             battle_id=self.last_battle_id,
             finish_state=finish_state,
             winner=winner,
-            player_1_name=self._get_player_name(player1),
-            player_2_name=self._get_player_name(player2),
+            player_1_name=self._get_player_name(game_manager.player_1),
+            player_2_name=self._get_player_name(game_manager.player_2),
             player_1_score=game_manager.get_player_score(player_num=1),
             player_2_score=game_manager.get_player_score(player_num=2),
             turns=game_manager.turns,
-            description_for_display=game_manager.get_description_for_display(),
+            description_for_display=description_for_display,
             end_game_object=game_manager.game
         )
 
@@ -316,7 +398,13 @@ class Tournament:
         :param battle_id: The id of the battle to view
         """
         battle = [b for b in self.battle_results if b.battle_id == battle_id][0]
-        self.view_battle_given_battle_description(battle.description_for_display)
+        if battle.description_for_display is None:
+            # Read only this battle from the replay archive
+            self.view_battle_given_battle_description(
+                ReplayArchive(self.replay_archive_path).get_description(battle_id)
+            )
+        else:
+            self.view_battle_given_battle_description(battle.description_for_display)
 
     @staticmethod
     def view_battle_given_battle_description(battle_description_for_display: str):
@@ -352,9 +440,12 @@ class TestBot(Tournament):
             self,
             player: Player,
             competitors: List[Player],
-            maps: List[str],
+            maps: List[Union[str, PlanetWars]],
             always_be_player_1: bool = False,
-            raise_bot_exceptions: bool = True
+            raise_bot_exceptions: bool = True,
+            concurrent_games: int = 1,
+            turn_time_limit: Optional[float] = None,
+            replay_archive_path: Optional[str] = None
     ):
         """
         Battle will run between the given player and all other competitors on all the given maps
@@ -364,28 +455,31 @@ class TestBot(Tournament):
         :param always_be_player_1: If True the given player will always be player 1 in all battle, if False
                                    will run 2 battle in each map against each bot - changing sides between the battles.
         :param raise_bot_exceptions: If False catch exceptions from the player bots
+        :param concurrent_games: How many battles run together (see Tournament)
+        :param turn_time_limit: Seconds each bot has for its turn (see Tournament)
+        :param replay_archive_path: The path of the replay archive to write the replays to (see Tournament)
         """
         assert len(maps) >= 1, "tournament needs at least 1 map"
         self.player = player
         self.competitors = competitors
         self.always_be_player_1 = always_be_player_1
-        super().__init__(competitors + [player], maps, raise_bot_exceptions)
+        super().__init__(
+            competitors + [player], maps, raise_bot_exceptions, concurrent_games=concurrent_games,
+            turn_time_limit=turn_time_limit, replay_archive_path=replay_archive_path
+        )
 
     def run_tournament(self) -> List[BattleResult]:
         """
         Run the "test" - the given player will battle each competitor in each map.
         :return: The BattleResults
         """
-        self.battle_results = []
+        battles = []
         for map_str in self.maps:
             for competitor in self.competitors:
-                self.battle_results.append(
-                    self.run_battle(map_str, player1=self.player, player2=competitor)
-                )
+                battles.append((map_str, self.player, competitor))
                 if not self.always_be_player_1:
-                    self.battle_results.append(
-                        self.run_battle(map_str, player1=competitor, player2=self.player)
-                    )
+                    battles.append((map_str, competitor, self.player))
+        self.battle_results = self.run_battles(battles)
         return self.battle_results
 
     def get_testing_results_data_frame(self) -> pd.DataFrame:
@@ -412,7 +506,7 @@ class TestBot(Tournament):
         return super().get_player_scores()
 
 
-def run_and_view_battle(player_1: Player, player_2: Player, map_str: str, ):
+def run_and_view_battle(player_1: Player, player_2: Player, map_str: Union[str, PlanetWars], ):
     """
     Run a battle between the given players in the given map and open the Java viewer to view it.
 
@@ -437,3 +531,13 @@ def get_map_by_id(map_id: int) -> str:
     """
     with open(os.path.join(PLANET_WARS_MODULE_PATH, "maps", f"map{map_id}.txt")) as f:
         return f.read()
+
+
+def get_map_game_by_id(map_id: int) -> PlanetWars:
+    """
+    Load the relevant map from the compiled map library - no file reading or text parsing per call.
+    The returned object can be given to Tournament/TestBot/GameManager instead of the map string.
+    :param map_id: Make should map{map_id).txt exists in the map folder. legal values are 1 to 100
+    :return: PlanetWars object of the map initial state
+    """
+    return get_map_library().get_map(map_id)
@@ -0,0 +1,59 @@
+import time
+from typing import Iterable
+
+from planet_wars.bot_host.worker import RemotePlayer, RemotePlayerPool
+from planet_wars.engine.async_scheduler import AsyncScheduler
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.engine.map_library import get_map_library
+from planet_wars.planet_wars import Player, PlanetWars, Order
+
+
+class SlowBot(Player):
+    """
+    Bot that thinks for a fixed time each turn and then sends half the ships of its strongest planet to the weakest
+    planet it doesn't own - like a real bot, most of the turn time is spent in the bot
+    """
+
+    NAME = "SlowBot"
+
+    def __init__(self, think_seconds: float = 0.002):
+        self.think_seconds = think_seconds
+
+    def play_turn(self, game: PlanetWars) -> Iterable[Order]:
+        time.sleep(self.think_seconds)
+        my_planets = game.get_planets_by_owner(PlanetWars.ME)
+        other_planets = [p for p in game.planets if p.owner != PlanetWars.ME]
+        if not my_planets or not other_planets:
+            return []
+        source = max(my_planets, key=lambda p: p.num_ships)
+        destination = min(other_planets, key=lambda p: p.num_ships)
+        return [Order(source, destination, source.num_ships // 2)]
+
+
+def run_benchmark(num_games: int = 32, workers_per_bot: int = 8, think_seconds: float = 0.002):
+    """
+    Print the games per second of running the same games one after another (each bot in one worker) and with the
+    AsyncScheduler (each bot in a pool of workers)
+    """
+    maps = [get_map_library().get_map(map_id) for map_id in range(1, num_games + 1)]
+
+    with RemotePlayer(SlowBot(think_seconds)) as player_1, RemotePlayer(SlowBot(think_seconds)) as player_2:
+        start = time.perf_counter()
+        sequential_states = [GameManager(game_map, player_1, player_2).run_game() for game_map in maps]
+        sequential_time = time.perf_counter() - start
+
+    with RemotePlayerPool(SlowBot(think_seconds), workers_per_bot) as player_1, \
+            RemotePlayerPool(SlowBot(think_seconds), workers_per_bot) as player_2:
+        start = time.perf_counter()
+        async_states = AsyncScheduler(max_in_flight=workers_per_bot * 2).run(
+            GameManager(game_map, player_1, player_2) for game_map in maps
+        )
+        async_time = time.perf_counter() - start
+
+    assert sequential_states == async_states, "the scheduler changed the games results"
+    print(f"sequential: {num_games / sequential_time:.2f} games/s")
+    print(f"async scheduler with {workers_per_bot} workers per bot: {num_games / async_time:.2f} games/s")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,54 @@
+import time
+from typing import Iterable, List
+
+from planet_wars.benchmarks.stress_scenarios import make_stress_scenario
+from planet_wars.bot_host.worker import RemotePlayer
+from planet_wars.planet_wars import Player, PlanetWars, Order
+
+# (num_planets, num_fleets)
+STATE_SIZES = [(30, 0), (30, 30), (300, 1000), (3000, 30000)]
+
+
+class IdleBot(Player):
+    """
+    Bot that never sends fleets - so only the transport is measured
+    """
+
+    NAME = "IdleBot"
+
+    def play_turn(self, game: PlanetWars) -> Iterable[Order]:
+        return []
+
+
+def measure_round_trip(game: PlanetWars, remote_player: RemotePlayer, turns: int = 2000) -> float:
+    """
+    :return: The mean seconds per turn of sending the given state to the worker and getting the orders back
+    """
+    remote_player.play_turn(game)  # warm up
+    start = time.perf_counter()
+    for _ in range(turns):
+        game.invalidate_arrays()  # the engine gives a new game object each turn, so the arrays are built each turn
+        remote_player.play_turn(game)
+    return (time.perf_counter() - start) / turns
+
+
+def run_benchmark(sizes: List = STATE_SIZES):
+    """
+    Print the per turn round trip time between the engine and a bot worker for growing game states
+    """
+    print(f"{'planets':>8} {'fleets':>8} {'message [bytes]':>16} {'round trip [us]':>16} {'shared memory [us]':>19}")
+    with RemotePlayer(IdleBot()) as remote_player, RemotePlayer(IdleBot(), shared_state=True) as shared_player:
+        for num_planets, num_fleets in sizes:
+            game = make_stress_scenario(num_planets, num_fleets).game
+            message_size = len(remote_player.encode_turn(game))
+            turns = max(20, 2000 // max(1, num_fleets // 100))
+            round_trip = measure_round_trip(game, remote_player, turns)
+            shared_round_trip = measure_round_trip(game, shared_player, turns)
+            print(
+                f"{len(game.planets):>8} {len(game.fleets):>8} {message_size:>16} {round_trip * 1e6:>16.1f} "
+                f"{shared_round_trip * 1e6:>19.1f}"
+            )
+
+
+if __name__ == "__main__":
+    run_benchmark()
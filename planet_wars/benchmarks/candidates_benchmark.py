@@ -0,0 +1,72 @@
+import time
+from typing import List
+
+from planet_wars.candidates import CandidateMoves
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.engine.map_library import get_map_library
+from planet_wars.planet_wars import PlanetWars, Planet
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+
+
+def get_game_states(num_maps: int = 20, turns: int = 60, every: int = 5) -> List[PlanetWars]:
+    """
+    :return: Game states from the middle of games between the baseline bots
+    """
+    map_library = get_map_library()
+    games = []
+    for map_id in range(1, num_maps + 1):
+        game_manager = GameManager(
+            map_library.get_map(map_id), AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot(),
+            AttackWeakestPlanetFromStrongestBot(), record_display=False
+        )
+        for turn in range(turns):
+            if game_manager.make_turn() != GameManager.IN_GAME_STATE:
+                break
+            if turn % every == 0:
+                games.append(game_manager.get_game_object_for_player(1))
+    return games
+
+
+def evaluate_candidates_in_loops(game: PlanetWars) -> dict:
+    """
+    The features of CandidateMoves computed one move at a time, the way the bots do it with Planet objects
+    """
+    forecast = game.get_forecast()
+    features = {}
+    for source in game.get_planets_by_owner(PlanetWars.ME):
+        for destination in game.planets:
+            trip_length = Planet.distance_between_planets(source, destination)
+            if trip_length == 0:
+                continue
+            forecast = forecast.extend(trip_length)
+            forces = forecast.get_forces(trip_length, destination.planet_id)
+            owner_before = forecast.owners[trip_length - 1, destination.planet_id]
+            other_force = max(forces[PlanetWars.NEUTRAL], forces[PlanetWars.ENEMY])
+            ships_needed = max(other_force - forces[PlanetWars.ME] + (owner_before != PlanetWars.ME), 0)
+            if 0 < ships_needed <= source.num_ships:
+                features[source.planet_id, destination.planet_id] = (
+                    trip_length, ships_needed, destination.growth_rate / ships_needed
+                )
+    return features
+
+
+def run_benchmark():
+    """
+    Print the time to evaluate all the moves of a turn with CandidateMoves and with loops over the planets
+    """
+    games = get_game_states()
+    for name, evaluate in [("loops", evaluate_candidates_in_loops), ("CandidateMoves", CandidateMoves)]:
+        # Each evaluation gets a fresh forecast, like in a real turn
+        for game in games:
+            game.invalidate_arrays()
+        start = time.perf_counter()
+        for game in games:
+            evaluate(game)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed / len(games) * 1000:.2f} ms per turn ({len(games)} turns)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
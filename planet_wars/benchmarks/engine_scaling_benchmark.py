@@ -0,0 +1,55 @@
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from planet_wars.benchmarks.stress_scenarios import make_stress_scenario
+from planet_wars.engine.game_logic import GameManager
+
+# (num_planets, num_fleets)
+SCENARIO_SIZES = [
+    (30, 100), (300, 1000), (1000, 10000), (3000, 30000), (10000, 100000)
+]
+MEASURED_STEPS = ["execute_orders", "advance", "population_growth", "arrival", "check_endgame_conditions"]
+
+
+def measure_engine_scaling(
+        num_planets: int, num_fleets: int, turns: int = 5, orders_per_turn: int = 100
+) -> Dict[str, float]:
+    """
+    Run the engine turn logic on a stress scenario and time each of its steps.
+    The bots are not called - the scripted orders are executed directly, so only the engine is measured.
+    :return: Mean seconds per call of each step. For execute_orders it is the time to execute one turn's orders of
+             both players.
+    """
+    scenario = make_stress_scenario(num_planets, num_fleets, turns=turns, orders_per_turn=orders_per_turn)
+    player_1, player_2 = scenario.get_players()
+    game_manager = GameManager(scenario.game, player_1, player_2)
+
+    total_times = defaultdict(float)
+    for turn in range(turns):
+        start = time.perf_counter()
+        game_manager.execute_orders(scenario.player_1_orders[turn], player_id=1)
+        game_manager.execute_orders(scenario.player_2_orders[turn], player_id=2)
+        total_times["execute_orders"] += time.perf_counter() - start
+
+        for step in MEASURED_STEPS[1:]:
+            start = time.perf_counter()
+            getattr(game_manager, step)()
+            total_times[step] += time.perf_counter() - start
+        game_manager.turns += 1
+
+    return {step: total_times[step] / turns for step in MEASURED_STEPS}
+
+
+def run_benchmark(sizes: List[Tuple[int, int]] = SCENARIO_SIZES, turns: int = 5):
+    """
+    Print the time per call of each engine step as the numbers of planets and fleets grow.
+    """
+    print(f"{'planets':>8} {'fleets':>8} " + " ".join(f"{step + ' [ms]':>26}" for step in MEASURED_STEPS))
+    for num_planets, num_fleets in sizes:
+        times = measure_engine_scaling(num_planets, num_fleets, turns=turns)
+        print(f"{num_planets:>8} {num_fleets:>8} " + " ".join(f"{times[step] * 1e3:>26.3f}" for step in MEASURED_STEPS))
+
+
+if __name__ == "__main__":
+    run_benchmark()
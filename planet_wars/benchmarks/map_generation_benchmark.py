@@ -0,0 +1,53 @@
+import time
+from typing import Callable, List
+
+from planet_wars.engine.map_generator import generate_large_map
+from planet_wars.planet_wars import PlanetWars, Planet
+
+PLANET_COUNTS = [30, 100, 300, 1000, 3000, 10000]
+
+
+def _time_it(func: Callable, repeat: int = 3) -> float:
+    """
+    :return: The best run time of func in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _linear_closest_planet(game: PlanetWars, planet: Planet, owner: int) -> Planet:
+    candidates = [p for p in game.planets if p is not planet and p.owner == owner]
+    return min(candidates, key=lambda p: (p.x - planet.x) ** 2 + (p.y - planet.y) ** 2, default=None)
+
+
+def run_benchmark(planet_counts: List[int] = PLANET_COUNTS, seed: int = 1):
+    """
+    Print the timing curves of map generation (with and without the grid spatial index) and of "closest planet"
+    queries (grid spatial index vs. scanning all the planets) as the number of planets grows.
+    """
+    print(f"{'planets':>8} {'gen grid [s]':>13} {'gen numpy [s]':>14} {'closest grid [us]':>18} "
+          f"{'closest scan [us]':>18}")
+    for num_planets in planet_counts:
+        generate_with_grid = _time_it(lambda: generate_large_map(num_planets, seed))
+        generate_without_grid = _time_it(lambda: generate_large_map(num_planets, seed, use_spatial_index=False))
+
+        game = PlanetWars.parse_game_state(generate_large_map(num_planets, seed))
+        game.get_spatial_index()
+        queries = game.planets[:200]
+        closest_with_grid = _time_it(
+            lambda: [game.get_closest_planet(p, owner=PlanetWars.NEUTRAL) for p in queries]
+        ) / len(queries)
+        closest_with_scan = _time_it(
+            lambda: [_linear_closest_planet(game, p, PlanetWars.NEUTRAL) for p in queries]
+        ) / len(queries)
+
+        print(f"{num_planets:>8} {generate_with_grid:>13.4f} {generate_without_grid:>14.4f} "
+              f"{closest_with_grid * 1e6:>18.1f} {closest_with_scan * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
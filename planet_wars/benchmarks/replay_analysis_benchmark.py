@@ -0,0 +1,28 @@
+import os
+import time
+
+from planet_wars.replays.analysis import decode_replays_arrays, summarize_replays
+from planet_wars.rounds.view_rounds import REPLAY_COLUMN, get_battle_results_df
+
+
+def run_benchmark(copies: int = 50, worker_counts=(0, None)):
+    """
+    Print the replays per second of decoding the round 1 replays (copies times) to arrays and summarizing them
+    """
+    replays = list(get_battle_results_df(1, columns=[REPLAY_COLUMN])[REPLAY_COLUMN]) * copies
+    for num_workers in worker_counts:
+        start = time.perf_counter()
+        arrays = decode_replays_arrays(replays, num_workers=num_workers)
+        decode_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        summarize_replays(arrays)
+        summarize_seconds = time.perf_counter() - start
+        workers = os.cpu_count() if num_workers is None else num_workers
+        print(
+            f"{len(replays)} replays, {workers} workers: decode {len(replays) / decode_seconds:.0f} replays/s, "
+            f"summarize {len(replays) / summarize_seconds:.0f} replays/s"
+        )
+
+
+if __name__ == "__main__":
+    run_benchmark()
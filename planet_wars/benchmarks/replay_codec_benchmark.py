@@ -0,0 +1,43 @@
+import os
+import time
+import zlib
+
+import pandas as pd
+
+from planet_wars import PLANET_WARS_MODULE_PATH
+from planet_wars.replays.codec import ReplayReader, encode_replay
+
+
+def run_benchmark(keyframe_intervals=(8, 32, 64), compressions=("zlib", "lzma")):
+    """
+    Print the size of the round 1 replays in the replay text, the zlib compressed text and the replay codec, and the
+    time to encode them and to read a turn
+    """
+    descriptions = list(pd.read_parquet(
+        os.path.join(PLANET_WARS_MODULE_PATH, "rounds", "round1", "battle_results_df.parquet")
+    )["description_for_display"])
+    print(f"{len(descriptions)} replays")
+    print(f"text: {sum(len(d) for d in descriptions)} bytes")
+    print(f"zlib text: {sum(len(zlib.compress(d.encode(), 9)) for d in descriptions)} bytes")
+    for compression in compressions:
+        for keyframe_interval in keyframe_intervals:
+            start = time.perf_counter()
+            encoded = [encode_replay(d, keyframe_interval, compression) for d in descriptions]
+            encode_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            num_reads = 0
+            for data in encoded:
+                # A new reader for each turn, so no block is cached
+                for turn in range(0, len(ReplayReader(data)), 17):
+                    ReplayReader(data).get_turn(turn)
+                    num_reads += 1
+            read_seconds = time.perf_counter() - start
+            print(
+                f"{compression} keyframe every {keyframe_interval} turns: {sum(len(e) for e in encoded)} bytes, "
+                f"encode {encode_seconds * 1000:.0f} ms, random turn read {read_seconds / num_reads * 1000:.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,25 @@
+import os
+import tempfile
+import time
+
+from planet_wars.replays.render import GIF, THUMBNAIL, render_replays
+from planet_wars.rounds.view_rounds import REPLAY_COLUMN, get_battle_results_df
+
+
+def run_benchmark(copies: int = 20, worker_counts=(0, None)):
+    """
+    Print the replays per second of rendering the round 1 replays (copies times) to thumbnails and to GIFs
+    """
+    replays = list(get_battle_results_df(1, columns=[REPLAY_COLUMN])[REPLAY_COLUMN]) * copies
+    for kind, num_replays in ((THUMBNAIL, len(replays)), (GIF, len(replays) // copies)):
+        for num_workers in worker_counts:
+            with tempfile.TemporaryDirectory() as output_dir:
+                start = time.perf_counter()
+                render_replays(replays[:num_replays], output_dir, kind=kind, num_workers=num_workers)
+                seconds = time.perf_counter() - start
+            workers = os.cpu_count() if num_workers is None else num_workers
+            print(f"{kind}, {num_replays} replays, {workers} workers: {num_replays / seconds:.1f} replays/s")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,35 @@
+import os
+import time
+from typing import List, Optional
+
+from planet_wars.engine.map_library import get_map_library
+from planet_wars.player_bots.search_code.search_bot import SearchBot
+
+
+def run_benchmark(map_ids: Optional[List[int]] = None, time_budget: float = 1.0, workers: Optional[List[int]] = None):
+    """
+    Print the rollouts per second per core of SearchBot turns on the first turn of the given maps, with the rollouts
+    in the bot's process and on pools of worker processes
+    """
+    map_ids = map_ids or [1, 5, 10]
+    workers = workers or sorted({0, 1, 2, os.cpu_count() or 1})
+    games = [get_map_library().get_map(map_id) for map_id in map_ids]
+
+    print(f"{'workers':>8} {'rollouts':>9} {'rollouts/s':>11} {'rollouts/s/core':>16}")
+    for num_workers in workers:
+        with SearchBot(time_budget=time_budget, num_workers=num_workers, seed=0) as bot:
+            bot.new_game_has_started(games[0])
+            time.sleep(0.5)  # let the workers start
+            num_rollouts = 0
+            elapsed = 0.0
+            for game in games:
+                bot.play_turn(game)
+                num_rollouts += bot.last_search_stats.num_rollouts
+                elapsed += bot.last_search_stats.elapsed_seconds
+            num_cores = max(min(num_workers, os.cpu_count() or 1), 1)
+            print(f"{num_workers:>8} {num_rollouts:>9} {num_rollouts / elapsed:>11.0f} "
+                  f"{num_rollouts / elapsed / num_cores:>16.0f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
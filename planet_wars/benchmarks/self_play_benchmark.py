@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackWeakestPlanetFromStrongestBot, AttackEnemyWeakestPlanetFromStrongestBot,
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+from planet_wars.self_play.pipeline import run_self_play
+
+
+def run_benchmark(num_games: int = 200):
+    """
+    Print the positions per hour of self-play data generation with the baseline bots, in this process and on a
+    pool of workers (one per core)
+    """
+    players = [
+        AttackWeakestPlanetFromStrongestBot(), AttackEnemyWeakestPlanetFromStrongestBot(),
+        AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot()
+    ]
+    for num_workers in sorted({0, os.cpu_count() or 1}):
+        with tempfile.TemporaryDirectory() as output_dir:
+            report = run_self_play(output_dir, players, num_games, num_workers=num_workers)
+            size = sum(os.path.getsize(os.path.join(output_dir, file_name)) for file_name, _ in report.shards)
+        print(f"{num_workers} workers: {report.num_positions} positions in {report.seconds:.1f}s - "
+              f"{report.positions_per_hour / 1e6:.1f}M positions/hour, "
+              f"{size / report.num_positions:.0f} bytes/position")
+
+
+if __name__ == "__main__":
+    run_benchmark()
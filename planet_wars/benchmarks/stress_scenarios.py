@@ -0,0 +1,112 @@
+"""
+Stress scenarios for the engine benchmarks - large generated maps with many fleets already in flight, and bots that
+replay scripted orders, so the engine's cost can be measured without the cost of real bots.
+    scenario = make_stress_scenario(num_planets=5000, num_fleets=100000)
+    game_manager = GameManager(scenario.game, *scenario.get_players())
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Iterable, List
+
+import numpy as np
+
+from planet_wars.engine.map_generator import generate_large_map
+from planet_wars.planet_wars import PlanetWars, Player, Fleet, Order
+
+
+@dataclass
+class StressScenario:
+    """
+    A large custom scenario - a map with many planets and fleets in flight, and scripted orders for both players.
+    """
+    game: PlanetWars  # The initial state, can be given to GameManager instead of a map string
+    player_1_orders: List[List[Order]]  # player_1_orders[turn] are the orders player 1 issues in that turn
+    player_2_orders: List[List[Order]]  # player_2_orders[turn] are the orders player 2 issues in that turn
+
+    def get_players(self) -> List[Player]:
+        """
+        :return: Player 1 and player 2 bots that replay the scripted orders
+        """
+        return [ScriptedPlayer(self.player_1_orders), ScriptedPlayer(self.player_2_orders)]
+
+
+class ScriptedPlayer(Player):
+    """
+    Player that ignores the game state and issues pre-generated orders. Orders that become illegal (for example
+    because the source planet was conquered) are rejected by the engine like any other illegal order.
+    """
+
+    NAME = "ScriptedPlayer"
+
+    def __init__(self, orders_per_turn: List[List[Order]]):
+        self.orders_per_turn = orders_per_turn
+
+    def play_turn(self, game: PlanetWars) -> Iterable[Order]:
+        return self.orders_per_turn[game.turns] if game.turns < len(self.orders_per_turn) else []
+
+
+def make_stress_scenario(
+        num_planets: int,
+        num_fleets: int,
+        turns: int = 10,
+        orders_per_turn: int = 100,
+        owned_planets_fraction: float = 0.5,
+        seed: int = 0
+) -> StressScenario:
+    """
+    Create a stress scenario.
+    The map is generated with generate_large_map. owned_planets_fraction of the planets are split between the two
+    players (so both can issue orders from many planets) and num_fleets fleets are put in flight between random
+    planets, at random points of their trips. Each turn each player orders orders_per_turn fleets from random
+    planets it owns in the initial state, with a few ships each so most of the orders stay legal.
+
+    :param num_planets: Number of planets in the map (up to tens of thousands)
+    :param num_fleets: Number of fleets in flight at the start (up to hundreds of thousands)
+    :param turns: Number of turns with scripted orders
+    :param orders_per_turn: Number of orders each player issues each turn
+    :param owned_planets_fraction: The fraction of the planets owned by the players at the start
+    :param seed: The random seed, the same seed and parameters create the same scenario
+    :return: The StressScenario
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    game = PlanetWars.parse_game_state(generate_large_map(num_planets, seed))
+    num_planets = len(game.planets)
+
+    owned = [p for p in game.planets if p.owner == 0]
+    rng.shuffle(owned)
+    owned = owned[:int(len(owned) * owned_planets_fraction)]
+    for i, p in enumerate(owned):
+        p.owner = 1 if i % 2 == 0 else 2
+        p.num_ships = rng.randint(100, 1000)
+    planets_of_player = {
+        owner: [p.planet_id for p in game.planets if p.owner == owner] for owner in (1, 2)
+    }
+
+    xs = np.array([p.x for p in game.planets])
+    ys = np.array([p.y for p in game.planets])
+    sources = np_rng.integers(0, num_planets, num_fleets)
+    destinations = (sources + np_rng.integers(1, num_planets, num_fleets)) % num_planets
+    trip_lengths = np.ceil(np.sqrt((xs[sources] - xs[destinations]) ** 2 + (ys[sources] - ys[destinations]) ** 2))
+    trip_lengths = trip_lengths.astype(int)
+    turns_remaining = np_rng.integers(1, trip_lengths + 1)
+    owners = np_rng.integers(1, 3, num_fleets)
+    num_ships = np_rng.integers(1, 50, num_fleets)
+    game.fleets = [
+        Fleet(int(owner), int(ships), int(source), int(destination), int(trip_length), int(remaining))
+        for owner, ships, source, destination, trip_length, remaining in zip(
+            owners, num_ships, sources, destinations, trip_lengths, turns_remaining
+        )
+    ]
+
+    def scripted_orders(player: int) -> List[List[Order]]:
+        own = planets_of_player[player]
+        if not own:
+            return [[] for _ in range(turns)]
+        return [
+            [Order(rng.choice(own), rng.randrange(num_planets), rng.randint(1, 5)) for _ in range(orders_per_turn)]
+            for _ in range(turns)
+        ]
+
+    return StressScenario(game=game, player_1_orders=scripted_orders(1), player_2_orders=scripted_orders(2))
@@ -0,0 +1,48 @@
+import time
+
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.engine.map_library import get_map_library
+from planet_wars.engine.vector_env import PlanetWarsVectorEnv, attack_weakest_planet_from_strongest_policy
+from planet_wars.player_bots.baseline_code.baseline_bot import AttackWeakestPlanetFromStrongestBot
+
+
+def measure_game_manager_steps(num_steps: int = 2000) -> float:
+    """
+    :return: Steps per second of GameManager games between the baseline bots - the same games the vector
+             environment plays with its default policies
+    """
+    map_library = get_map_library()
+    steps = 0
+    start = time.perf_counter()
+    map_id = 1
+    while steps < num_steps:
+        game_manager = GameManager(
+            map_library.get_map(map_id), AttackWeakestPlanetFromStrongestBot(), AttackWeakestPlanetFromStrongestBot(),
+            record_display=False
+        )
+        state = GameManager.IN_GAME_STATE
+        while state == GameManager.IN_GAME_STATE and steps < num_steps:
+            state = game_manager.make_turn()
+            steps += 1
+        map_id = map_id % len(map_library) + 1
+    return steps / (time.perf_counter() - start)
+
+
+def run_benchmark(num_steps: int = 200, env_counts=(1, 16, 256, 1024)):
+    """
+    Print the environment steps per second of PlanetWarsVectorEnv with different numbers of environments, with the
+    baseline policy playing both sides, next to GameManager
+    """
+    print(f"GameManager: {measure_game_manager_steps():.0f} steps/s")
+    for num_envs in env_counts:
+        env = PlanetWarsVectorEnv(num_envs, seed=0)
+        observation = env.reset()
+        start = time.perf_counter()
+        for _ in range(num_steps):
+            observation, _, _, _ = env.step(attack_weakest_planet_from_strongest_policy(observation))
+        elapsed = time.perf_counter() - start
+        print(f"PlanetWarsVectorEnv with {num_envs} envs: {num_envs * num_steps / elapsed:.0f} steps/s")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,208 @@
+"""
+Compact binary encoding of the game state and orders, used between the engine and bot worker processes.
+
+State message:  header (message type, flags, turn, number of planets, number of fleets, seconds left)
+                + planets as WIRE_PLANET_DTYPE records + fleets as WIRE_FLEET_DTYPE records
+Orders message: header (message type, number of orders) + orders as WIRE_ORDER_DTYPE records
+Shared turn:    header (message type, flags, seconds left, sequence number) + utf-8 shared memory region name
+                (the state itself is in the shared memory, see bot_host.shared_state)
+Error message:  header (message type) + utf-8 error text
+
+Seconds left is the time left in the turn when the message was encoded (see PlanetWars.deadline), NaN if the turn has
+no deadline. The deadline is an absolute time.monotonic() value, which can't be compared between processes.
+"""
+
+import math
+import numbers
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from planet_wars.planet_wars import PlanetWars, Planet, Fleet, Order
+
+WIRE_PLANET_DTYPE = np.dtype([
+    ("planet_id", "<i4"), ("owner", "<i4"), ("num_ships", "<i4"), ("growth_rate", "<i4"), ("x", "<f8"), ("y", "<f8")
+])
+WIRE_FLEET_DTYPE = np.dtype([
+    ("owner", "<i4"), ("num_ships", "<i4"), ("source_planet_id", "<i4"), ("destination_planet_id", "<i4"),
+    ("total_trip_length", "<i4"), ("turns_remaining", "<i4")
+])
+# The number of ships is a float, so the engine gets the same value as from a bot in its own process - and rejects the
+# fractional numbers of ships the same way (see Order.get_rejection_reason)
+WIRE_ORDER_DTYPE = np.dtype([("source_planet_id", "<i4"), ("destination_planet_id", "<i4"), ("num_ships", "<f8")])
+# Planet ids of orders without a planet id (None), and of orders with planet ids that are not planet ids
+MISSING_WIRE_PLANET_ID = -2
+INVALID_WIRE_PLANET_ID = -1
+
+# Message types
+TURN_MESSAGE = 1
+ORDERS_MESSAGE = 2
+ERROR_MESSAGE = 3
+STOP_MESSAGE = 4
+SHARED_TURN_MESSAGE = 5
+
+# Turn message flags
+NEW_GAME_FLAG = 1
+
+_STATE_HEADER = struct.Struct("<BBiiid")
+_ORDERS_HEADER = struct.Struct("<Bi")
+_SHARED_TURN_HEADER = struct.Struct("<BBdq")
+_TYPE_HEADER = struct.Struct("<B")
+
+
+def message_type(message: bytes) -> int:
+    return message[0]
+
+
+def _get_seconds_left(game: PlanetWars) -> float:
+    return math.nan if game.deadline is None else game.get_time_left()
+
+
+def decode_seconds_left(message: bytes) -> Optional[float]:
+    """
+    :param message: A turn message or a shared turn message
+    :return: The seconds left in the turn when the message was encoded, None if the turn has no deadline
+    """
+    if message_type(message) == SHARED_TURN_MESSAGE:
+        seconds_left = _SHARED_TURN_HEADER.unpack_from(message)[2]
+    else:
+        seconds_left = _STATE_HEADER.unpack_from(message)[5]
+    return None if math.isnan(seconds_left) else seconds_left
+
+
+def encode_state(game: PlanetWars, flags: int = 0) -> bytes:
+    """
+    :param game: The game state to encode, with the seconds left until its deadline
+    :param flags: Message flags, for example NEW_GAME_FLAG
+    :return: The turn message
+    """
+    planets = game.get_planets_array().astype(WIRE_PLANET_DTYPE)
+    fleets = game.get_fleets_array().astype(WIRE_FLEET_DTYPE)
+    header = _STATE_HEADER.pack(TURN_MESSAGE, flags, game.turns, len(planets), len(fleets), _get_seconds_left(game))
+    return b"".join([header, planets.tobytes(), fleets.tobytes()])
+
+
+def decode_state_arrays(message: bytes) -> Tuple[int, int, np.ndarray, np.ndarray]:
+    """
+    :param message: A turn message
+    :return: The flags, the turn, and the planets and fleets arrays (read only views on the message bytes)
+    """
+    _, flags, turn, num_planets, num_fleets, _ = _STATE_HEADER.unpack_from(message)
+    planets = np.frombuffer(message, dtype=WIRE_PLANET_DTYPE, count=num_planets, offset=_STATE_HEADER.size)
+    fleets = np.frombuffer(
+        message, dtype=WIRE_FLEET_DTYPE, count=num_fleets,
+        offset=_STATE_HEADER.size + num_planets * WIRE_PLANET_DTYPE.itemsize
+    )
+    return flags, turn, planets, fleets
+
+
+def arrays_to_game(planets: np.ndarray, fleets: np.ndarray, turn: int) -> PlanetWars:
+    """
+    :return: PlanetWars object with the planets and fleets of the given arrays
+    """
+    game = PlanetWars(
+        planets=[
+            Planet(planet_id, owner, num_ships, growth_rate, x, y)
+            for planet_id, owner, num_ships, growth_rate, x, y in planets.tolist()
+        ],
+        fleets=[Fleet(*f) for f in fleets.tolist()]
+    )
+    game.turns = turn
+    return game
+
+
+def decode_state(message: bytes) -> Tuple[int, PlanetWars]:
+    """
+    :param message: A turn message
+    :return: The message flags and the decoded PlanetWars object
+    """
+    flags, turn, planets, fleets = decode_state_arrays(message)
+    return flags, arrays_to_game(planets, fleets, turn)
+
+
+def encode_shared_turn(
+        region_name: str, sequence: int, flags: int = 0, seconds_left: Optional[float] = None
+) -> bytes:
+    """
+    :param region_name: The name of the shared memory region the state was published to
+    :param sequence: The sequence number of the published state
+    :param flags: Message flags, for example NEW_GAME_FLAG
+    :param seconds_left: The seconds left in the turn, None if the turn has no deadline
+    :return: The shared turn message
+    """
+    seconds_left = math.nan if seconds_left is None else seconds_left
+    return _SHARED_TURN_HEADER.pack(SHARED_TURN_MESSAGE, flags, seconds_left, sequence) + region_name.encode()
+
+
+def decode_shared_turn(message: bytes) -> Tuple[int, int, str]:
+    """
+    :param message: A shared turn message
+    :return: The flags, the sequence number and the shared memory region name
+    """
+    _, flags, _, sequence = _SHARED_TURN_HEADER.unpack_from(message)
+    return flags, sequence, message[_SHARED_TURN_HEADER.size:].decode()
+
+
+def _encode_planet_id(planet_id) -> int:
+    if planet_id is None:
+        return MISSING_WIRE_PLANET_ID
+    planet_id = Order._get_planet_id(planet_id)
+    # Only numbers equal to a planet id are found by PlanetWars.get_planet_by_id
+    if not isinstance(planet_id, numbers.Real) or not float(planet_id).is_integer() or not 0 <= planet_id < 2 ** 31:
+        return INVALID_WIRE_PLANET_ID
+    return int(planet_id)
+
+
+def _encode_num_ships(num_ships) -> float:
+    # Not a number - sent as NaN, which the engine rejects like the value itself (it's not a whole number)
+    return float(num_ships) if isinstance(num_ships, numbers.Real) else math.nan
+
+
+def encode_orders(orders: Iterable[Order]) -> bytes:
+    """
+    :param orders: The orders of a bot (Order objects or objects with the same members)
+    :return: The orders message. Values the engine would reject are encoded so the engine rejects the decoded order
+             too: missing planet ids as MISSING_WIRE_PLANET_ID, other planet ids that are not planet ids as
+             INVALID_WIRE_PLANET_ID and a number of ships that is not a number as NaN.
+    """
+    records = [
+        (
+            _encode_planet_id(o.source_planet_id), _encode_planet_id(o.destination_planet_id),
+            _encode_num_ships(o.num_ships)
+        )
+        for o in orders
+    ]
+    return _ORDERS_HEADER.pack(ORDERS_MESSAGE, len(records)) + np.array(records, dtype=WIRE_ORDER_DTYPE).tobytes()
+
+
+def _decode_planet_id(planet_id: int) -> Optional[int]:
+    return None if planet_id == MISSING_WIRE_PLANET_ID else planet_id
+
+
+def decode_orders(message: bytes) -> List[Order]:
+    """
+    :param message: An orders message
+    :return: The orders, with whole numbers of ships as int
+    """
+    _, num_orders = _ORDERS_HEADER.unpack_from(message)
+    records = np.frombuffer(message, dtype=WIRE_ORDER_DTYPE, count=num_orders, offset=_ORDERS_HEADER.size)
+    return [
+        Order(
+            _decode_planet_id(source), _decode_planet_id(destination),
+            int(num_ships) if num_ships.is_integer() else num_ships
+        )
+        for source, destination, num_ships in records.tolist()
+    ]
+
+
+def encode_error(error: str) -> bytes:
+    return _TYPE_HEADER.pack(ERROR_MESSAGE) + error.encode()
+
+
+def decode_error(message: bytes) -> str:
+    return message[_TYPE_HEADER.size:].decode()
+
+
+def encode_stop() -> bytes:
+    return _TYPE_HEADER.pack(STOP_MESSAGE)
@@ -0,0 +1,216 @@
+"""
+Game state handoff through shared memory, used between the engine and bot workers instead of sending the state in
+the turn message.
+
+Shared memory layout: header (sequence, turn, number of planets, number of fleets, planets capacity, fleets capacity)
+                      + planets capacity PLANET_DTYPE records + fleets capacity FLEET_DTYPE records
+The engine writes each turn's state to the region and sends the worker only the region name and the sequence number.
+The worker wraps the region in a SharedGameView - the planets and fleets arrays are read only views on the shared
+memory, so the handoff costs the same for any map size.
+"""
+
+import mmap
+import os
+import struct
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from planet_wars.planet_wars import PlanetWars, Planet, Fleet, PLANET_DTYPE, FLEET_DTYPE
+
+_HEADER = struct.Struct("<qqqqqq")
+_HEADER_SIZE = 64  # the header is padded so the arrays are aligned
+_SHM_DIR = "/dev/shm"
+
+
+class StaleGameStateError(Exception):
+    """
+    A SharedGameView was used after the engine published the state of the next turn over it
+    """
+
+
+def _region_size(planet_capacity: int, fleet_capacity: int) -> int:
+    return _HEADER_SIZE + planet_capacity * PLANET_DTYPE.itemsize + fleet_capacity * FLEET_DTYPE.itemsize
+
+
+def _region_arrays(buffer, planet_capacity: int, fleet_capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+    planets = np.frombuffer(buffer, dtype=PLANET_DTYPE, count=planet_capacity, offset=_HEADER_SIZE)
+    fleets = np.frombuffer(
+        buffer, dtype=FLEET_DTYPE, count=fleet_capacity,
+        offset=_HEADER_SIZE + planet_capacity * PLANET_DTYPE.itemsize
+    )
+    return planets, fleets
+
+
+def _grow(capacity: int, needed: int) -> int:
+    return capacity if needed <= capacity else max(needed, capacity * 2)
+
+
+def _map_read_only(name: str) -> mmap.mmap:
+    """
+    Map an existing shared memory region read only.
+    The mapping stays valid as long as there are numpy views on it, even after the engine removed the region.
+    On POSIX the region is the file of its name in /dev/shm, on Windows a named mapping.
+    """
+    if os.name == "nt":
+        memory = shared_memory.SharedMemory(name=name)
+        try:
+            return mmap.mmap(-1, memory.size, tagname=name, access=mmap.ACCESS_READ)
+        finally:
+            memory.close()
+    fd = os.open(os.path.join(_SHM_DIR, name.lstrip("/")), os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, os.fstat(fd).st_size, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+
+class SharedStatePublisher:
+    """
+    Engine side - owns the shared memory region and writes the game state to it.
+    The region grows (a new region with a new name is created) when a state doesn't fit in it.
+    """
+
+    def __init__(self, planet_capacity: int = 64, fleet_capacity: int = 1024):
+        self._memory = None
+        self._planets = None
+        self._fleets = None
+        self._sequence = 0
+        self._allocate(planet_capacity, fleet_capacity)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def _allocate(self, planet_capacity: int, fleet_capacity: int):
+        self.close()
+        self._memory = shared_memory.SharedMemory(create=True, size=_region_size(planet_capacity, fleet_capacity))
+        self._planets, self._fleets = _region_arrays(self._memory.buf, planet_capacity, fleet_capacity)
+        self._planet_capacity = planet_capacity
+        self._fleet_capacity = fleet_capacity
+
+    def publish(self, game: PlanetWars) -> Tuple[str, int]:
+        """
+        Write the state of the given game to the shared memory
+        :return: The region name and the sequence number of the published state
+        """
+        planets = game.get_planets_array()
+        fleets = game.get_fleets_array()
+        if len(planets) > self._planet_capacity or len(fleets) > self._fleet_capacity:
+            self._allocate(_grow(self._planet_capacity, len(planets)), _grow(self._fleet_capacity, len(fleets)))
+        self._planets[:len(planets)] = planets
+        self._fleets[:len(fleets)] = fleets
+        self._sequence += 1
+        _HEADER.pack_into(
+            self._memory.buf, 0,
+            self._sequence, game.turns, len(planets), len(fleets), self._planet_capacity, self._fleet_capacity
+        )
+        return self.name, self._sequence
+
+    def close(self):
+        """
+        Release and remove the shared memory region
+        """
+        if self._memory is None:
+            return
+        self._planets = None
+        self._fleets = None
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+
+class SharedStateReader:
+    """
+    Worker side - maps the region of a SharedStatePublisher (read only) and reads the published states from it
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._mmap = _map_read_only(name)
+        _, _, _, _, planet_capacity, fleet_capacity = _HEADER.unpack_from(self._mmap)
+        self._planets, self._fleets = _region_arrays(self._mmap, planet_capacity, fleet_capacity)
+
+    def sequence(self) -> int:
+        """
+        :return: The sequence number of the state currently in the region
+        """
+        return _HEADER.unpack_from(self._mmap)[0]
+
+    def read_arrays(self) -> Tuple[int, int, np.ndarray, np.ndarray]:
+        """
+        :return: The sequence number, the turn, and the planets and fleets arrays (read only views on the region,
+                 valid until the next state is published)
+        """
+        sequence, turn, num_planets, num_fleets, _, _ = _HEADER.unpack_from(self._mmap)
+        return sequence, turn, self._planets[:num_planets], self._fleets[:num_fleets]
+
+    def get_game(self) -> "SharedGameView":
+        """
+        :return: The published state as a PlanetWars object
+        """
+        sequence, turn, planets, fleets = self.read_arrays()
+        return SharedGameView(self, sequence, turn, planets, fleets)
+
+    def close(self):
+        self._planets = None
+        self._fleets = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # There are still numpy views on the region - it will be unmapped when they are released
+
+
+class SharedGameView(PlanetWars):
+    """
+    PlanetWars on top of the shared memory arrays. get_planets_array/get_fleets_array return the shared memory
+    views without copying, and the Planet and Fleet objects are created only when game.planets or game.fleets is
+    first used - so bots that work with the arrays never pay for the objects.
+
+    The view is valid only in the turn it was given to the bot: the next turn's state is written over the same
+    memory. Creating the objects of an old view raises StaleGameStateError (objects already created stay usable).
+    """
+
+    def __init__(
+            self, reader: SharedStateReader, sequence: int, turn: int, planets_array: np.ndarray,
+            fleets_array: np.ndarray
+    ):
+        self._reader = reader
+        self._sequence = sequence
+        self._shared_planets = planets_array
+        self._shared_fleets = fleets_array
+        super().__init__(planets=None, fleets=None)
+        self.turns = turn
+        self._arrays_turn = turn
+        self._planets_array = planets_array
+        self._fleets_array = fleets_array
+
+    def _check_sequence(self):
+        if self._reader.sequence() != self._sequence:
+            raise StaleGameStateError("The game state of this turn was replaced by the state of a later turn")
+
+    @property
+    def planets(self) -> List[Planet]:
+        if self._planets is None:
+            self._check_sequence()
+            self._planets = [
+                Planet(planet_id, owner, num_ships, growth_rate, x, y)
+                for planet_id, owner, num_ships, growth_rate, x, y in self._shared_planets.tolist()
+            ]
+        return self._planets
+
+    @planets.setter
+    def planets(self, planets: Optional[List[Planet]]):
+        self._planets = planets
+
+    @property
+    def fleets(self) -> List[Fleet]:
+        if self._fleets is None:
+            self._check_sequence()
+            self._fleets = [Fleet(*f) for f in self._shared_fleets.tolist()]
+        return self._fleets
+
+    @fleets.setter
+    def fleets(self, fleets: Optional[List[Fleet]]):
+        self._fleets = fleets
@@ -0,0 +1,274 @@
+import asyncio
+import multiprocessing
+import time
+import traceback
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Connection
+from typing import Iterable, List, Optional
+
+from planet_wars.bot_host import codec
+from planet_wars.bot_host.shared_state import SharedStatePublisher, SharedStateReader
+from planet_wars.planet_wars import Player, PlanetWars, Order
+
+
+class RemoteBotError(Exception):
+    """
+    The bot raised an exception in its worker process
+    """
+
+
+def _get_player_name(player: Player) -> str:
+    return player.NAME if player.NAME != Player.NAME else player.__class__.__name__
+
+
+async def _recv_bytes_async(connection: Connection) -> bytes:
+    """
+    Wait for a message on the connection without blocking the event loop
+    """
+    loop = asyncio.get_running_loop()
+    readable = loop.create_future()
+    try:
+        loop.add_reader(connection.fileno(), lambda: readable.done() or readable.set_result(None))
+    except NotImplementedError:
+        # The default event loop of Windows (ProactorEventLoop) can't watch pipes - wait in a thread instead
+        return await loop.run_in_executor(None, connection.recv_bytes)
+    try:
+        await readable
+    finally:
+        loop.remove_reader(connection.fileno())
+    return connection.recv_bytes()
+
+
+def run_bot_worker(connection: Connection, player: Player):
+    """
+    The main loop of a bot worker process: receive turn messages, run the bot and send back its orders.
+    The bot's game object gets the turn deadline from the seconds left in the message (see PlanetWars.deadline).
+    Runs until a stop message is received or the connection is closed.
+    """
+    reader = None
+    while True:
+        try:
+            message = connection.recv_bytes()
+        except EOFError:
+            break
+        if codec.message_type(message) == codec.STOP_MESSAGE:
+            break
+
+        try:
+            if codec.message_type(message) == codec.SHARED_TURN_MESSAGE:
+                flags, _, region_name = codec.decode_shared_turn(message)
+                if reader is None or reader.name != region_name:
+                    # The engine moved to a bigger region
+                    if reader is not None:
+                        reader.close()
+                    reader = SharedStateReader(region_name)
+                game = reader.get_game()
+            else:
+                flags, game = codec.decode_state(message)
+            seconds_left = codec.decode_seconds_left(message)
+            if seconds_left is not None:
+                game.deadline = time.monotonic() + seconds_left
+            if flags & codec.NEW_GAME_FLAG:
+                player.new_game_has_started(game)
+            orders = player.play_turn(game)
+            orders = orders if orders is not None else []
+            if isinstance(orders, Order):
+                orders = [orders]
+            reply = codec.encode_orders(orders)
+        except Exception as e:
+            reply = codec.encode_error(f"{e.__class__.__name__}: {e}\n{traceback.format_exc()}")
+        connection.send_bytes(reply)
+
+    if reader is not None:
+        reader.close()
+
+
+class RemotePlayer(Player):
+    """
+    Runs the given bot in a long running worker process. Use it like any other Player - the worker is started on
+    first use and serves all the games the RemotePlayer plays, one after another.
+
+    Each turn the game state is sent to the worker as one packed binary message (see bot_host.codec) and the
+    orders come back the same way. With shared_state=True the state is written to shared memory instead and the bot
+    gets a SharedGameView of it (see bot_host.shared_state), so the handoff doesn't grow with the map size.
+    Exceptions in the bot are raised in the engine process as RemoteBotError.
+
+    play_turn_async is the same as play_turn for asyncio schedulers (see engine.async_scheduler) - the event loop
+    keeps running other games while the worker plays. The worker plays one turn at a time, concurrent calls wait for
+    their turn - use RemotePlayerPool to play many turns of the same bot at the same time.
+    """
+
+    def __init__(self, player: Player, mp_context: Optional[str] = None, shared_state: bool = False):
+        """
+        :param player: The bot to run in the worker (it is pickled to the worker if the start method is not fork)
+        :param mp_context: The multiprocessing start method, None for the platform default
+        :param shared_state: If True hand the state to the worker through shared memory
+        """
+        self.player = player
+        self.NAME = _get_player_name(player)
+        self.mp_context = mp_context
+        self.shared_state = shared_state
+        self._publisher = None
+        self._process = None
+        self._connection = None
+        self._lock = None
+        self._lock_loop = None
+
+    def start(self):
+        """
+        Start the worker process (done automatically on first use)
+        """
+        if self._process is not None:
+            return
+        if self.shared_state:
+            # Start the resource tracker before the worker, so the worker shares it and doesn't report the engine's
+            # shared memory regions as leaked
+            resource_tracker.ensure_running()
+        context = multiprocessing.get_context(self.mp_context)
+        self._connection, worker_connection = context.Pipe()
+        self._process = context.Process(
+            target=run_bot_worker, args=(worker_connection, self.player), name=f"bot-{self.NAME}", daemon=True
+        )
+        self._process.start()
+        worker_connection.close()
+
+    def close(self):
+        """
+        Stop the worker process
+        """
+        if self._process is None:
+            return
+        try:
+            self._connection.send_bytes(codec.encode_stop())
+        except (BrokenPipeError, OSError):
+            pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._connection.close()
+        self._process = None
+        self._connection = None
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def new_game_has_started(self, game: PlanetWars):
+        # Sent to the worker together with the first turn (see encode_turn), to save a round trip
+        pass
+
+    def encode_turn(self, game: PlanetWars) -> bytes:
+        """
+        :return: The turn message for the worker
+        """
+        # Decided by the turn and not in new_game_has_started, because with concurrent games the worker plays several
+        # games at the same time
+        flags = codec.NEW_GAME_FLAG if game.turns == 0 else 0
+        if not self.shared_state:
+            return codec.encode_state(game, flags)
+        if self._publisher is None:
+            self._publisher = SharedStatePublisher()
+        region_name, sequence = self._publisher.publish(game)
+        seconds_left = None if game.deadline is None else game.get_time_left()
+        return codec.encode_shared_turn(region_name, sequence, flags, seconds_left)
+
+    @staticmethod
+    def decode_reply(reply: bytes) -> List[Order]:
+        """
+        :return: The orders in the worker reply, raises RemoteBotError if the bot failed
+        """
+        if codec.message_type(reply) == codec.ERROR_MESSAGE:
+            raise RemoteBotError(codec.decode_error(reply))
+        return codec.decode_orders(reply)
+
+    def play_turn(self, game: PlanetWars) -> Iterable[Order]:
+        self.start()
+        self._connection.send_bytes(self.encode_turn(game))
+        return self.decode_reply(self._connection.recv_bytes())
+
+    async def play_turn_async(self, game: PlanetWars) -> List[Order]:
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            self.start()
+            self._connection.send_bytes(self.encode_turn(game))
+            try:
+                reply = await _recv_bytes_async(self._connection)
+            except asyncio.CancelledError:
+                # The reply would be read as the reply of the next turn - restart the worker instead
+                self.close()
+                raise
+            return self.decode_reply(reply)
+
+
+class RemotePlayerPool(Player):
+    """
+    Runs the given bot in several worker processes (see RemotePlayer), so asyncio schedulers can play many turns of
+    the bot at the same time - each play_turn_async call is served by an idle worker.
+    The bot object is copied to each worker, so the bot shouldn't keep state between turns.
+    """
+
+    def __init__(self, player: Player, size: int, mp_context: Optional[str] = None, shared_state: bool = False):
+        """
+        :param player: The bot to run in the workers
+        :param size: The number of worker processes
+        :param mp_context: The multiprocessing start method, None for the platform default
+        :param shared_state: If True hand the state to the workers through shared memory
+        """
+        assert size >= 1, "the pool needs at least 1 worker"
+        self.NAME = _get_player_name(player)
+        self.workers = [RemotePlayer(player, mp_context, shared_state) for _ in range(size)]
+        self._idle_workers = None
+        self._idle_workers_loop = None
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def play_turn(self, game: PlanetWars) -> Iterable[Order]:
+        return self.workers[0].play_turn(game)
+
+    async def play_turn_async(self, game: PlanetWars) -> List[Order]:
+        loop = asyncio.get_running_loop()
+        if self._idle_workers_loop is not loop:
+            self._idle_workers = asyncio.Queue()
+            for worker in self.workers:
+                self._idle_workers.put_nowait(worker)
+            self._idle_workers_loop = loop
+        worker = await self._idle_workers.get()
+        try:
+            return await worker.play_turn_async(game)
+        finally:
+            self._idle_workers.put_nowait(worker)
+
+
+def host_players(
+        players: List[Player], mp_context: Optional[str] = None, shared_state: bool = False
+) -> List[RemotePlayer]:
+    """
+    Wrap each of the given bots in a RemotePlayer and start the workers
+    :return: The RemotePlayer objects, close them when done
+    """
+    remote_players = [RemotePlayer(player, mp_context, shared_state) for player in players]
+    for remote_player in remote_players:
+        remote_player.start()
+    return remote_players
@@ -0,0 +1,83 @@
+from typing import List, Optional
+
+import numpy as np
+
+from planet_wars.planet_wars import Order, PlanetWars
+
+
+class CandidateMoves:
+    """
+    All the moves of a turn - from each of my planets to each other planet - with features of all the (source,
+    destination) pairs computed at once with numpy, so a bot can score its moves with a few array operations instead of
+    loops over the planets.
+    The features are (planets, planets) arrays indexed [source planet id, destination planet id]:
+        trip_lengths     The turns until a fleet sent now arrives (see PlanetWars.get_distance_matrix)
+        arrival_owners   The owner of the destination when the fleet arrives if no fleet is sent (see Forecast)
+        ships_needed     The ships a fleet sent now needs to own the destination after the battle of its arrival turn,
+                         given the growth and the fleets in flight - 0 if I will own it then anyway
+        feasible         The source is mine and has the ships needed (more than 0)
+        growth_per_ship  The growth rate of the destination per ship needed for the feasible moves, 0 for the others
+    Each move is evaluated alone - two fleets to the same destination change each other's ships needed.
+    For example, a bot sending the feasible moves with the best growth per ship:
+        moves = CandidateMoves(game)
+        return moves.get_orders(moves.growth_per_ship, max_orders=3)
+    """
+
+    def __init__(self, game: PlanetWars):
+        """
+        :param game: The game state, from the perspective of the player to move
+        """
+        planets = game.get_planets_array()
+        num_planets = len(planets)
+        assert (planets["planet_id"] == np.arange(num_planets)).all(), "planet ids must be 0..num planets - 1"
+        self.growth = planets["growth_rate"]
+        self.available_ships = np.where(planets["owner"] == PlanetWars.ME, planets["num_ships"], 0)
+        self.trip_lengths = game.get_distance_matrix()
+
+        sources = planets["owner"] == PlanetWars.ME
+        valid = sources[:, None] & (self.trip_lengths > 0)
+        # Fleets with trip length 0 never arrive - look them up in turn 1 and mask them out
+        arrival_turns = np.maximum(self.trip_lengths, 1)
+        destinations = np.arange(num_planets)[None, :]
+        forecast = game.get_forecast(turns=int(arrival_turns.max(initial=1)))
+        self.arrival_owners = forecast.owners[arrival_turns, destinations]
+
+        forces = forecast.get_forces(arrival_turns, destinations)
+        my_force = forces[..., PlanetWars.ME]
+        other_force = np.maximum(forces[..., PlanetWars.NEUTRAL], forces[..., PlanetWars.ENEMY])
+        # The owner before the battle keeps the planet in a tie, anyone else must have the largest force
+        owner_before = forecast.owners[arrival_turns - 1, destinations]
+        self.ships_needed = np.maximum(
+            np.where(owner_before == PlanetWars.ME, other_force - my_force, other_force - my_force + 1), 0
+        )
+        self.feasible = valid & (self.ships_needed > 0) & (self.ships_needed <= self.available_ships[:, None])
+        self.growth_per_ship = np.where(self.feasible, self.growth[None, :] / np.maximum(self.ships_needed, 1), 0.0)
+
+    def get_orders(
+            self, scores: np.ndarray, max_orders: Optional[int] = None, num_ships: Optional[np.ndarray] = None
+    ) -> List[Order]:
+        """
+        Pick orders by the given scores - the feasible moves from the highest score down, at most one order to each
+        destination, as long as the source has the ships left after the orders picked before.
+        :param scores: (planets, planets) score of each move, moves with score -inf are never picked
+        :param max_orders: The maximal number of orders, None for no limit
+        :param num_ships: (planets, planets) the ships to send in each move, default ships_needed
+        :return: The orders
+        """
+        num_ships = self.ships_needed if num_ships is None else num_ships
+        scores = np.where(self.feasible & (num_ships > 0), scores, -np.inf)
+        num_candidates = int((scores > -np.inf).sum())
+        ships_left = self.available_ships.copy()
+        targeted = set()
+        orders = []
+        for flat_index in np.argsort(-scores, axis=None, kind="stable")[:num_candidates]:
+            if max_orders is not None and len(orders) >= max_orders:
+                break
+            source, destination = (int(i) for i in np.unravel_index(flat_index, scores.shape))
+            ships = int(num_ships[source, destination])
+            if destination in targeted or ships > ships_left[source]:
+                continue
+            ships_left[source] -= ships
+            targeted.add(destination)
+            orders.append(Order(source, destination, ships))
+        return orders
@@ -0,0 +1,148 @@
+import asyncio
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from planet_wars.engine.game_logic import GameManager
+
+
+class AsyncScheduler:
+    """
+    Runs many games as asyncio tasks, each game progressing on its own.
+    Each turn the game awaits the orders of both bots together. Bots with a play_turn_async coroutine (RemotePlayer,
+    RemotePlayerPool) play in their worker processes while the event loop advances other games, so one process can
+    keep a large pool of bot workers busy. Other bots are called directly, like in GameManager.run_game.
+
+    At most max_in_flight games run at the same time. The games are taken from the given iterable only when there
+    is room for them, so with a lazy iterable (for example a generator creating the GameManager objects) only
+    max_in_flight games are in memory at a time.
+    """
+
+    def __init__(self, max_in_flight: int = 256):
+        """
+        :param max_in_flight: The maximal number of games running at the same time
+        """
+        assert max_in_flight >= 1, "max_in_flight must be at least 1"
+        self.max_in_flight = max_in_flight
+
+    def run(
+            self,
+            game_managers: Iterable[GameManager],
+            on_game_end: Optional[Callable[[int, GameManager, str], None]] = None
+    ) -> List[str]:
+        """
+        Run the given games until they all end (see run_async).
+        :return: The finish state of each game, in the order of the given games
+        """
+        return asyncio.run(self.run_async(game_managers, on_game_end))
+
+    async def run_async(
+            self,
+            game_managers: Iterable[GameManager],
+            on_game_end: Optional[Callable[[int, GameManager, str], None]] = None
+    ) -> List[str]:
+        """
+        Run the given games until they all end.
+        :param game_managers: The games to run, taken one by one when there is room for them
+        :param on_game_end: Called with (index of the game, the game manager, finish state) when a game ends. Keep
+                            what you need from the game manager here - the scheduler doesn't keep it.
+        :return: The finish state of each game, in the order of the given games
+        """
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        # A bot that receives state deltas keeps a single game state - it plays one game at a time
+        delta_player_locks: Dict[int, asyncio.Lock] = {}
+        finish_states: Dict[int, str] = {}
+        tasks = set()
+        errors = []
+
+        async def run_game(game_index: int, game_manager: GameManager):
+            try:
+                # Always lock in the same order, so two games with the same two bots don't wait for each other
+                delta_player_ids = sorted({
+                    id(player) for player in (game_manager.player_1, game_manager.player_2)
+                    if player.RECEIVES_STATE_DELTAS
+                })
+                locks = [delta_player_locks.setdefault(player_id, asyncio.Lock()) for player_id in delta_player_ids]
+                for lock in locks:
+                    await lock.acquire()
+                try:
+                    state = await self.run_game_async(game_manager)
+                finally:
+                    for lock in locks:
+                        lock.release()
+                finish_states[game_index] = state
+                if on_game_end is not None:
+                    on_game_end(game_index, game_manager, state)
+            finally:
+                in_flight.release()
+
+        def on_task_done(task: asyncio.Task):
+            tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                errors.append(task.exception())
+
+        try:
+            games = enumerate(game_managers)
+            while True:
+                await in_flight.acquire()  # back-pressure - wait for room before taking the next game
+                if errors:
+                    # Fail fast if a game raised (with raise_bot_exceptions)
+                    raise errors[0]
+                game = next(games, None)
+                if game is None:
+                    in_flight.release()
+                    break
+                game_index, game_manager = game
+                task = asyncio.create_task(run_game(game_index, game_manager))
+                tasks.add(task)
+                task.add_done_callback(on_task_done)
+            await asyncio.gather(*tasks)
+            if errors:
+                raise errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return [finish_states[game_index] for game_index in range(len(finish_states))]
+
+    @staticmethod
+    async def run_game_async(game_manager: GameManager) -> str:
+        """
+        Run the game - run turns until the game end, like GameManager.run_game
+        :return: The game finish state - tie, player 1 wins or player 2 wins
+        """
+        state = GameManager.IN_GAME_STATE
+        while state == GameManager.IN_GAME_STATE:
+            orders_of_player_1, orders_of_player_2 = await asyncio.gather(
+                AsyncScheduler._get_orders(game_manager, 1), AsyncScheduler._get_orders(game_manager, 2)
+            )
+            state = game_manager.finish_turn(orders_of_player_1, orders_of_player_2)
+        print(state)
+        return state
+
+    @staticmethod
+    async def _get_orders(game_manager: GameManager, player_num: int):
+        """
+        :return: The orders of the given player in the current turn, or False if the bot failed
+        """
+        start = time.monotonic()
+        orders = await AsyncScheduler._play_turn(game_manager, player_num)
+        game_manager.record_turn_time(player_num, time.monotonic() - start)
+        return orders
+
+    @staticmethod
+    async def _play_turn(game_manager: GameManager, player_num: int):
+        player = game_manager.get_player(player_num)
+        game_object = game_manager.safely_start_bot_turn(
+            player, game_manager.get_game_object_for_player(player_num),
+            game_manager.get_turn_delta_for_player(player_num)
+        )
+        if game_object is False:
+            return False
+        play_turn_async = getattr(player, "play_turn_async", None)
+        if play_turn_async is None:
+            return game_manager.safely_play_turn(player, game_object)
+        try:
+            orders = await play_turn_async(game_object)
+        except Exception as e:
+            return game_manager.handle_bot_exception(player, e)
+        return game_manager.safely_check_orders(player, orders)
@@ -1,19 +1,121 @@
-from planet_wars.planet_wars import PlanetWars, Player, Planet, Fleet, Order
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from planet_wars.forecast import Forecast
+from planet_wars.planet_wars import PlanetWars, Player, Planet, Fleet, Order, Battle, TurnDelta, fleets_to_array
+from planet_wars.replays.codec import DEFAULT_KEYFRAME_INTERVAL, ReplayTurn, ReplayWriter, encode_replay
+from planet_wars.state_hash import (
+    combine_hashes, fleet_hash, fleets_hashes, planets_hashes, sum_hashes, switched_owners, turn_hash
+)
+from planet_wars.turn_timing import HeadroomStats, get_headroom_stats
+
+# The rejection reasons the vectorized order validation checks, in the order Order.get_rejection_reason checks them
+_STATIC_REJECTION_REASONS = [
+    Order.MISSING_PLANET_ID, Order.UNKNOWN_SOURCE_PLANET, Order.UNKNOWN_DESTINATION_PLANET, Order.SAME_PLANET,
+    Order.NOT_OWNER
+]
+_INTEGER_TYPES = (int, np.integer)
+
+
+@dataclass
+class RejectedOrder:
+    """
+    An order the engine didn't execute
+    """
+    index: int  # The index of the order in the orders the bot returned
+    order: Order  # The order as the bot returned it
+    reason: str  # Why the order was rejected, one of the reasons defined in Order (like Order.NOT_ENOUGH_SHIPS)
+
+
+@dataclass
+class OrdersReport:
+    """
+    The result of executing the orders of a player in a turn
+    """
+    player_id: int
+    num_accepted: int = 0  # How many orders became fleets
+    rejected: List[RejectedOrder] = field(default_factory=list)
+
+
+class CoalescedFleet(Fleet):
+    """
+    Engine internal record of all the fleets with the same owner, destination and turns remaining.
+    Such fleets arrive together and fight as one force, so the engine can advance and fight them as one fleet.
+    num_ships is the total of the merged fleets, the merged fleets themselves are kept in 'parts' as
+    (num_ships, source_planet_id, total_trip_length, launch_sequence) tuples - use expand() to get the per-fleet view.
+    The launch sequence is the order in which the engine added the fleets (see GameManager.add_fleet).
+    """
+
+    def __init__(self, fleet: Fleet, launch_sequence: int):
+        super().__init__(
+            fleet.owner, fleet.num_ships, fleet.source_planet_id, fleet.destination_planet_id,
+            fleet.total_trip_length, fleet.turns_remaining
+        )
+        self.parts = [(fleet.num_ships, fleet.source_planet_id, fleet.total_trip_length, launch_sequence)]
+
+    def merge(self, fleet: Fleet, launch_sequence: int):
+        """
+        Merge the given fleet (with the same owner, destination and turns remaining) into this record
+        """
+        self.num_ships += fleet.num_ships
+        self.parts.append((fleet.num_ships, fleet.source_planet_id, fleet.total_trip_length, launch_sequence))
+
+    def expand(self) -> List[Fleet]:
+        """
+        :return: The merged fleets as separate Fleet objects
+        """
+        return [fleet for _, fleet in self._expand_with_sequence()]
+
+    def _expand_with_sequence(self) -> List[Tuple[int, Fleet]]:
+        return [
+            (launch_sequence, Fleet(
+                self.owner, num_ships, source_planet_id, self.destination_planet_id, total_trip_length,
+                self.turns_remaining
+            ))
+            for num_ships, source_planet_id, total_trip_length, launch_sequence in self.parts
+        ]
+
+
+def expand_fleets(fleets: List[Fleet]) -> List[Fleet]:
+    """
+    :return: The given fleets with every CoalescedFleet replaced by the fleets merged into it. When all the given
+             fleets are CoalescedFleet records (the fleets of a coalescing engine) the fleets are in launch order, the
+             same order as the fleets of the engine without coalescing.
+    """
+    if fleets and all(isinstance(f, CoalescedFleet) for f in fleets):
+        parts = [part for f in fleets for part in f._expand_with_sequence()]
+        parts.sort(key=lambda part: part[0])
+        return [fleet for _, fleet in parts]
+    expanded = []
+    for f in fleets:
+        if isinstance(f, CoalescedFleet):
+            expanded.extend(f.expand())
+        else:
+            expanded.append(f)
+    return expanded
 
 
 def clone_game_object(game: PlanetWars) -> PlanetWars:
     """
-    Cloned the given game object
+    Cloned the given game object.
+    Coalesced fleets are cloned as the separate fleets merged into them.
     """
     cloned_fleet = []
     cloned_planets = []
-    for f in game.fleets:
+    for f in expand_fleets(game.fleets):
         cloned_fleet.append(Fleet(
             f.owner, f.num_ships, f.source_planet_id, f.destination_planet_id, f.total_trip_length, f.turns_remaining
         ))
     for p in game.planets:
         cloned_planets.append(Planet(p.planet_id, p.owner, p.num_ships, p.growth_rate, p.x, p.y))
-    return PlanetWars(planets=cloned_planets, fleets=cloned_fleet)
+    cloned_game = PlanetWars(planets=cloned_planets, fleets=cloned_fleet)
+    # The planets never move - so the spatial index and the map signature are shared between the clones
+    cloned_game._spatial_index = game.get_spatial_index()
+    cloned_game._map_signature = game.get_map_signature()
+    return cloned_game
 
 
 def switch_players_of_game_object(game: PlanetWars):
@@ -48,48 +150,207 @@ class GameManager:
     TIE_STATE = "Tie"
     IN_GAME_STATE = "Still In Game"
 
-    def __init__(self, map_str: str, player_1: Player, player_2: Player, raise_bot_exceptions: bool = False):
+    # execute_orders validates the orders together when (number of orders) * (number of planets) is at least this.
+    # Below it the fixed cost of the arrays is more than the cost of validating the orders one by one.
+    BATCH_ORDERS_MIN_WORK = 2000
+
+    def __init__(
+            self, map_str: Union[str, PlanetWars], player_1: Player, player_2: Player,
+            raise_bot_exceptions: bool = False, coalesce_fleets: bool = False, record_display: bool = True,
+            turn_time_limit: Optional[float] = None
+    ):
         """
         Initiate a game
-        :param map_str: The map to play in, as stirng.
+        :param map_str: The map to play in, as stirng or as PlanetWars object (for example from the map library).
+                        A given PlanetWars object is cloned, so the same object can be used for many games.
         :param player_1: Player 1 bot
         :param player_2: Player 2 bot
         :param raise_bot_exceptions: If False catch exceptions from the player bots
+        :param coalesce_fleets: If True fleets with the same owner, destination and turns remaining are kept as one
+                                CoalescedFleet record. The game result is the same, but the per-turn work is
+                                proportional to the number of records instead of the number of fleets.
+                                The bots and the display still get the separate fleets, in launch order.
+        :param record_display: If False the turns are not recorded for display (get_description_for_display) - for
+                               games nobody watches, like the simulations of search bots
+        :param turn_time_limit: Seconds each bot has for its turn. The bots get the deadline in their game object
+                                (PlanetWars.deadline), and the time they take is compared to it (get_headroom_stats).
+                                The limit is not enforced.
         """
-        self.game = PlanetWars.parse_game_state(map_str)
+        if isinstance(map_str, PlanetWars):
+            self.game = clone_game_object(map_str)
+        else:
+            self.game = PlanetWars.parse_game_state(map_str)
         self.original_map = clone_game_object(self.game)
         self.player_1 = player_1
         self.player_2 = player_2
         self.raise_bot_exceptions = raise_bot_exceptions
         self.turns = 0
         self.str_turns_for_display = []
+        # When set (see set_replay_writer) the turns for display are written to it instead of str_turns_for_display
+        self.replay_writer: Optional[ReplayWriter] = None
+        self.coalesce_fleets = coalesce_fleets
+        self.record_display = record_display
+        self.turn_time_limit = turn_time_limit
+        # player number -> how long the bot took in each turn
+        self.turn_seconds: Dict[int, List[float]] = {1: [], 2: []}
+        # (owner, destination planet id, arrival turn) -> the CoalescedFleet record of these fleets
+        self._coalesced_fleets: Dict[Tuple[int, int, int], CoalescedFleet] = {}
+        # The launch sequence of the next fleet merged into a CoalescedFleet record
+        self._next_launch_sequence = 0
+        # The forecast given to the bots, and the fleets launched in the last turn - used to update it incrementally
+        self._forecast = None
+        self._forecast_turn = None
+        self._launched_fleets: List[Tuple[int, int, int, int, int, int]] = []
+        # The changes in the last turn, recorded only if one of the players receives state deltas
+        self._record_turn_deltas = player_1.RECEIVES_STATE_DELTAS or player_2.RECEIVES_STATE_DELTAS
+        self._turn_delta: Optional[TurnDelta] = None
+        self._turn_battles: List[Battle] = []
+        self._turn_landed_fleets: List[Fleet] = []
+        # player id -> the report of executing its orders in the last turn
+        self.last_orders_reports: Dict[int, OrdersReport] = {}
+        # The hash of the fleets in flight from the perspective of player 1 and of player 2 - kept up to date from the
+        # first call to get_state_hash (see state_hash)
+        self._fleets_hashes: Optional[List[int]] = None
+        # (the planets array, its hash from the perspective of player 1 and of player 2)
+        self._planets_hashes: Optional[Tuple[np.ndarray, List[int]]] = None
+        if coalesce_fleets:
+            fleets = self.game.fleets
+            self.game.fleets = []
+            for fleet in fleets:
+                self.add_fleet(fleet)
+
+    def get_player(self, player_num: int) -> Player:
+        """
+        :param player_num: The player number (1 or 2)
+        :return: The bot of the given player
+        """
+        return self.player_1 if player_num == 1 else self.player_2
+
+    def get_game_object_for_player(self, player_num: int) -> Optional[PlanetWars]:
+        """
+        :param player_num: The player number (1 or 2)
+        :return: A clone of the game from the perspective of the given player (the player is always player 1 in its
+                 game object). None for a player that receives state deltas, except in the first turn.
+        """
+        player = self.get_player(player_num)
+        if player.RECEIVES_STATE_DELTAS and self.turns > 0:
+            return None
+        game_object = clone_game_object(self.game)
+        if player_num == 2:
+            switch_players_of_game_object(game_object)
+        game_object.turns = self.turns
+        game_object._forecast_provider = self.get_forecast
+        game_object._forecast_switched = player_num == 2
+        return game_object
+
+    def get_turn_delta_for_player(self, player_num: int) -> Optional[TurnDelta]:
+        """
+        :param player_num: The player number (1 or 2)
+        :return: The changes in the last turn from the perspective of the given player, None if not recorded
+        """
+        if self._turn_delta is None:
+            return None
+        return self._turn_delta if player_num == 1 else self._turn_delta.switched()
 
-    def safely_run_bot(self, player, game_object):
+    def safely_run_bot(self, player, game_object, turn_delta: Optional[TurnDelta] = None):
         """
         Safely run the player bot.
 
         :param player: The bot to run
         :param game_object: The game object to give the bot
+        :param turn_delta: For bots that receive state deltas - the changes in the last turn. The bot updates its own
+                           game object with them and that object is given to play_turn.
         :return: The bot orders or False if the bot raised Exception of the orders are not iterable
         """
-        # TODO add timeout to the play_turn call
+        game_object = self.safely_start_bot_turn(player, game_object, turn_delta)
+        if game_object is False:
+            return False
+        return self.safely_play_turn(player, game_object)
+
+    def safely_start_bot_turn(
+            self, player: Player, game_object: Optional[PlanetWars], turn_delta: Optional[TurnDelta] = None
+    ) -> Union[PlanetWars, bool]:
+        """
+        Everything the bot does in a turn before play_turn - apply the turn delta (for bots that receive state deltas),
+        set the turn deadline and call new_game_has_started in the first turn.
+        :return: The game object to give play_turn, or False if the bot raised Exception
+        """
+        deadline = time.monotonic() + self.turn_time_limit if self.turn_time_limit is not None else None
         try:
+            if turn_delta is not None:
+                game_object = player.observe_turn_delta(turn_delta)
+            if game_object is not None:
+                game_object.deadline = deadline
             if self.turns == 0:
                 player.new_game_has_started(game_object)
+            return game_object
+        except Exception as e:
+            return self.handle_bot_exception(player, e)
+
+    def run_player_turn(self, player_num: int):
+        """
+        Run the turn of the given player's bot, and record how long it took
+        :return: The bot orders or False if the bot failed
+        """
+        start = time.monotonic()
+        orders = self.safely_run_bot(
+            self.get_player(player_num), self.get_game_object_for_player(player_num),
+            self.get_turn_delta_for_player(player_num)
+        )
+        self.record_turn_time(player_num, time.monotonic() - start)
+        return orders
+
+    def record_turn_time(self, player_num: int, seconds: float):
+        self.turn_seconds[player_num].append(seconds)
+
+    def get_headroom_stats(self, player_num: int) -> HeadroomStats:
+        """
+        :return: How long the bot of the given player took in its turns, and how much time it had left of the
+                 turn_time_limit
+        """
+        turn_seconds = self.turn_seconds[player_num]
+        headroom_seconds = None
+        if self.turn_time_limit is not None:
+            headroom_seconds = [self.turn_time_limit - seconds for seconds in turn_seconds]
+        return get_headroom_stats(turn_seconds, headroom_seconds)
+
+    def safely_play_turn(self, player: Player, game_object: PlanetWars):
+        """
+        Safely call the bot play_turn.
+        :return: The bot orders or False if the bot raised Exception of the orders are not iterable
+        """
+        # TODO add timeout to the play_turn call
+        try:
             orders = player.play_turn(game_object)
+        except Exception as e:
+            return self.handle_bot_exception(player, e)
+        return self.safely_check_orders(player, orders)
+
+    def safely_check_orders(self, player: Player, orders) -> Union[List[Order], bool]:
+        """
+        :param orders: What the bot play_turn returned
+        :return: The orders as list, or False if the orders are not iterable
+        """
+        try:
             # Don't fail if you return None - replace it with empty array
             orders = orders if orders is not None else []
             # Don't fail if you return order instead of list of orders
             if isinstance(orders, Order):
                 orders = [orders]
-            [o for o in orders]  # check orders is iterable
-            return orders
+            return list(orders)  # check orders is iterable
         except Exception as e:
-            if self.raise_bot_exceptions:
-                raise e
+            return self.handle_bot_exception(player, e)
 
-            print(f"Player {player.__class__.__name__} throw exception {e.__class__.__name__}: {e}")
-            return False
+    def handle_bot_exception(self, player: Player, e: Exception) -> bool:
+        """
+        Raise the exception the bot raised, or print it if raise_bot_exceptions is False
+        :return: False - the bot orders when the bot failed
+        """
+        if self.raise_bot_exceptions:
+            raise e
+
+        print(f"Player {player.__class__.__name__} throw exception {e.__class__.__name__}: {e}")
+        return False
 
     def execute_order(self, order: Order, player_id: int) -> bool:
         """
@@ -98,27 +359,244 @@ class GameManager:
         :param player_id: The player sening this order
         :return: True is the order successfully sent.
         """
+        return self._execute_single_order(order, player_id) is None
+
+    def _execute_single_order(self, order: Order, player_id: int) -> Optional[str]:
+        """
+        :return: None if the order was executed, otherwise why it was rejected
+        """
         order = Order(order.source_planet_id, order.destination_planet_id, order.num_ships)
-        if not order.verify_order(self.game, player_id):
-            return False
+        rejection_reason = order.get_rejection_reason(self.game, player_id)
+        if rejection_reason is not None:
+            return rejection_reason
 
-        # execute order
+        # execute order - with int values, also for orders with other whole numbers (like 3.0 ships)
         source_planet = self.game.get_planet_by_id(order.source_planet_id)
         destination_planet = self.game.get_planet_by_id(order.destination_planet_id)
         total_trip_length = Planet.distance_between_planets(source_planet, destination_planet)
+        num_ships = int(order.num_ships)
 
-        source_planet.num_ships -= order.num_ships
+        source_planet.num_ships -= num_ships
+        self.game.invalidate_arrays()
 
         fleet = Fleet(
             owner=player_id,
-            num_ships=order.num_ships,
-            source_planet_id=order.source_planet_id,
-            destination_planet_id=order.destination_planet_id,
+            num_ships=num_ships,
+            source_planet_id=source_planet.planet_id,
+            destination_planet_id=destination_planet.planet_id,
             total_trip_length=total_trip_length,
             turns_remaining=total_trip_length  # assume speed of 1 per turn
         )
-        self.game.fleets.append(fleet)
-        return True
+        self.add_fleet(fleet)
+        return None
+
+    def execute_orders(
+            self, orders: Iterable[Order], player_id: int, planets: Optional[np.ndarray] = None
+    ) -> OrdersReport:
+        """
+        Execute the orders of a player - the same as calling execute_order for each order in turn, but the orders are
+        validated together against the planets array and the fleets are created in bulk.
+        Ships are reserved in the orders' order: an order is rejected if the ships left in its source planet, after the
+        earlier orders from that planet, are not enough.
+
+        :param orders: The orders to execute
+        :param player_id: The player sending the orders
+        :param planets: The planets array to validate against (only the planets of the player matter). Default is the
+                        current state - from game.get_planets_array()
+        :return: Report of the accepted and rejected orders
+        """
+        orders = list(orders)
+        report = OrdersReport(player_id)
+        parsed_orders = self._parse_orders(orders) if self._use_batch_validation(orders) else None
+        if parsed_orders is None:
+            # Few orders, or orders with values the arrays can't hold exactly (like float number of ships) - execute
+            # them one by one
+            for index, order in enumerate(orders):
+                rejection_reason = self._execute_single_order(order, player_id)
+                if rejection_reason is None:
+                    report.num_accepted += 1
+                else:
+                    report.rejected.append(RejectedOrder(index, order, rejection_reason))
+            return report
+
+        if planets is None:
+            planets = self.game.get_planets_array()
+        sources, destinations, num_ships, missing_ids = parsed_orders
+        source_indices = self._get_planet_indices(planets, sources)
+        destination_indices = self._get_planet_indices(planets, destinations)
+
+        # The checks that don't depend on the earlier orders, see Order.get_rejection_reason
+        source_owners = planets["owner"][source_indices]
+        static_reasons = np.select(
+            [
+                missing_ids, source_indices < 0, destination_indices < 0, sources == destinations,
+                (source_owners != player_id) | (source_owners == 0)
+            ],
+            np.arange(len(_STATIC_REJECTION_REASONS)),
+            default=-1
+        )
+        available_ships = planets["num_ships"][source_indices]
+        candidates = (static_reasons < 0) & (num_ships > 0)
+        accepted = self._reserve_ships(candidates, source_indices, num_ships, available_ships)
+
+        for index in np.flatnonzero(~accepted).tolist():
+            if static_reasons[index] >= 0:
+                rejection_reason = _STATIC_REJECTION_REASONS[static_reasons[index]]
+            elif num_ships[index] > 0 or available_ships[index] < num_ships[index]:
+                rejection_reason = Order.NOT_ENOUGH_SHIPS
+            else:
+                rejection_reason = Order.NON_POSITIVE_SHIPS
+            report.rejected.append(RejectedOrder(index, orders[index], rejection_reason))
+        report.num_accepted = int(accepted.sum())
+        if report.num_accepted == 0:
+            return report
+
+        # Take the ships from the source planets
+        launched_ships = np.zeros(len(planets), dtype=np.int64)
+        np.add.at(launched_ships, source_indices[accepted], num_ships[accepted])
+        for planet_index in np.flatnonzero(launched_ships).tolist():
+            self.game.planets[planet_index].num_ships -= int(launched_ships[planet_index])
+        self.game.invalidate_arrays()
+
+        # Launch the fleets
+        dx = planets["x"][source_indices[accepted]] - planets["x"][destination_indices[accepted]]
+        dy = planets["y"][source_indices[accepted]] - planets["y"][destination_indices[accepted]]
+        trip_lengths = np.ceil(np.sqrt(dx * dx + dy * dy)).astype(np.int64)
+        self.add_fleets([
+            Fleet(player_id, ships, source_planet_id, destination_planet_id, trip_length, trip_length)
+            for ships, source_planet_id, destination_planet_id, trip_length in zip(
+                num_ships[accepted].tolist(), sources[accepted].tolist(), destinations[accepted].tolist(),
+                trip_lengths.tolist()
+            )
+        ])
+        return report
+
+    def _use_batch_validation(self, orders: List[Order]) -> bool:
+        return len(orders) * len(self.game.planets) >= self.BATCH_ORDERS_MIN_WORK
+
+    @staticmethod
+    def _parse_orders(orders: List[Order]) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        :return: The sources, destinations and number of ships of the orders as arrays, and which orders miss a
+                 planet id (their ids are -1). None if some value is not an integer.
+        """
+        sources = [Order._get_planet_id(o.source_planet_id) for o in orders]
+        destinations = [Order._get_planet_id(o.destination_planet_id) for o in orders]
+        num_ships = [o.num_ships for o in orders]
+        if not all(
+                (source is None or isinstance(source, _INTEGER_TYPES)) and
+                (destination is None or isinstance(destination, _INTEGER_TYPES)) and isinstance(ships, _INTEGER_TYPES)
+                for source, destination, ships in zip(sources, destinations, num_ships)
+        ):
+            return None
+        missing_ids = np.array([s is None or d is None for s, d in zip(sources, destinations)], dtype=bool)
+        sources = np.array([-1 if s is None else s for s in sources], dtype=np.int64)
+        destinations = np.array([-1 if d is None else d for d in destinations], dtype=np.int64)
+        sources[missing_ids] = -1
+        destinations[missing_ids] = -1
+        return sources, destinations, np.array(num_ships, dtype=np.int64), missing_ids
+
+    @staticmethod
+    def _get_planet_indices(planets: np.ndarray, planet_ids: np.ndarray) -> np.ndarray:
+        """
+        :return: The index in the planets array of each of the given planet ids, -1 for unknown ids
+        """
+        ids = planets["planet_id"]
+        if np.array_equal(ids, np.arange(len(planets))):
+            return np.where((planet_ids >= 0) & (planet_ids < len(planets)), planet_ids, -1)
+        # Like PlanetWars.get_planet_by_id - the first planet with the id
+        unique_ids, first_indices = np.unique(ids, return_index=True)
+        positions = np.minimum(np.searchsorted(unique_ids, planet_ids), len(unique_ids) - 1)
+        found = unique_ids[positions] == planet_ids
+        return np.where(found, first_indices[positions], -1)
+
+    @staticmethod
+    def _reserve_ships(
+            candidates: np.ndarray, source_indices: np.ndarray, num_ships: np.ndarray, available_ships: np.ndarray
+    ) -> np.ndarray:
+        """
+        :param candidates: The orders that passed all the other checks
+        :return: Which of the candidate orders have enough ships left in their source planet, taking the ships of the
+                 accepted orders before them
+        """
+        accepted = candidates.copy()
+        candidate_indices = np.flatnonzero(candidates)
+        if len(candidate_indices) == 0:
+            return accepted
+
+        # Fast path - the running total of the ships of each source planet, if all the orders fit they are accepted
+        by_source = candidate_indices[np.argsort(source_indices[candidate_indices], kind="stable")]
+        group_sources = source_indices[by_source]
+        running_totals = np.cumsum(num_ships[by_source])
+        group_starts = np.flatnonzero(np.r_[True, group_sources[1:] != group_sources[:-1]])
+        group_offsets = np.repeat(
+            np.r_[0, running_totals[group_starts[1:] - 1]], np.diff(np.r_[group_starts, len(by_source)])
+        )
+        fits = running_totals - group_offsets <= available_ships[by_source]
+        if fits.all():
+            return accepted
+
+        # Sources with an order that doesn't fit - an order is rejected without taking ships, so the orders after it
+        # may still fit. Go over these sources' orders one by one.
+        overdrawn_sources = np.unique(group_sources[~fits])
+        remaining_ships = {}
+        for index in candidate_indices[np.isin(source_indices[candidate_indices], overdrawn_sources)].tolist():
+            source_index = source_indices[index]
+            remaining = remaining_ships.get(source_index, available_ships[index])
+            if num_ships[index] <= remaining:
+                remaining_ships[source_index] = remaining - num_ships[index]
+            else:
+                accepted[index] = False
+        return accepted
+
+    def add_fleet(self, fleet: Fleet):
+        """
+        Add the fleet to the game. If coalesce_fleets is on, the fleet is merged into the record of the fleets with the
+        same owner, destination and arrival turn.
+        """
+        self._launched_fleets.append((
+            fleet.owner, fleet.source_planet_id, fleet.destination_planet_id, fleet.num_ships,
+            self.turns + fleet.turns_remaining, fleet.total_trip_length
+        ))
+        if self._fleets_hashes is not None:
+            arrival_turn = self.turns + fleet.turns_remaining
+            for perspective, owner in enumerate((fleet.owner, 0 if fleet.owner == 0 else 3 - fleet.owner)):
+                self._fleets_hashes[perspective] = combine_hashes(self._fleets_hashes[perspective], fleet_hash(
+                    owner, fleet.num_ships, fleet.source_planet_id, fleet.destination_planet_id,
+                    fleet.total_trip_length, arrival_turn
+                ))
+        if not self.coalesce_fleets:
+            self.game.fleets.append(fleet)
+            return
+
+        key = (fleet.owner, fleet.destination_planet_id, self.turns + fleet.turns_remaining)
+        coalesced_fleet = self._coalesced_fleets.get(key)
+        launch_sequence = self._next_launch_sequence
+        self._next_launch_sequence += 1
+        if coalesced_fleet is None:
+            coalesced_fleet = CoalescedFleet(fleet, launch_sequence)
+            self._coalesced_fleets[key] = coalesced_fleet
+            self.game.fleets.append(coalesced_fleet)
+        else:
+            coalesced_fleet.merge(fleet, launch_sequence)
+
+    def add_fleets(self, fleets: List[Fleet]):
+        """
+        Add the fleets to the game, see add_fleet
+        """
+        if self.coalesce_fleets:
+            for fleet in fleets:
+                self.add_fleet(fleet)
+            return
+        self._launched_fleets.extend(
+            (
+                fleet.owner, fleet.source_planet_id, fleet.destination_planet_id, fleet.num_ships,
+                self.turns + fleet.turns_remaining, fleet.total_trip_length
+            )
+            for fleet in fleets
+        )
+        self._update_fleets_hashes(fleets, arrival_turn_offset=self.turns, sign=1)
+        self.game.fleets.extend(fleets)
 
     def advance(self):
         """
@@ -148,6 +626,13 @@ class GameManager:
             return
 
         self.game.fleets = [f for f in self.game.fleets if f.turns_remaining > 0]
+        # The fleets landing now had 1 turn remaining at the start of the turn - arrival turn self.turns + 1
+        self._update_fleets_hashes(arriving_fleets, arrival_turn_offset=self.turns + 1, sign=-1)
+        if self._record_turn_deltas:
+            self._turn_landed_fleets.extend(expand_fleets(arriving_fleets))
+        if self.coalesce_fleets:
+            for fleet in arriving_fleets:
+                self._coalesced_fleets.pop((fleet.owner, fleet.destination_planet_id, self.turns + 1), None)
 
         for planet in self.game.planets:
 
@@ -165,13 +650,111 @@ class GameManager:
             largest_force_owner = [owner for owner, size in forces.items() if size == max_force_size]
             if len(largest_force_owner) > 1:
                 planet.num_ships = 0  # in a tie the original owner keeps the planet with zero ships remaining
-                continue
+            else:
+                # When no tie the planet belongs to the biggest force.
+                # The num_ships in the planet is the biggest force size minus the second biggest force size
+                second_largest_force = max([size for size in forces.values() if size < max_force_size])
+                planet.owner = largest_force_owner[0]
+                planet.num_ships = max_force_size - second_largest_force
+
+            if self._record_turn_deltas:
+                self._turn_battles.append(Battle(planet.planet_id, forces, planet.owner, planet.num_ships))
+
+    def get_forecast(self) -> Forecast:
+        """
+        The forecast of the current turn (see Forecast), from the engine perspective. It is computed at most once per
+        turn and shared by both players' game objects. When the previous turn's forecast exists, only the planets
+        affected by the fleets launched in the last turn are recomputed.
+        """
+        if self._forecast_turn == self.turns:
+            return self._forecast
+
+        planets = self.game.get_planets_array()
+        if self._forecast is not None and self._forecast_turn == self.turns - 1:
+            forecast = self._forecast.next_turn()
+            changed_planets = set()
+            new_fleets = []
+            for owner, source_planet_id, destination_planet_id, num_ships, arrival_turn, _ in self._launched_fleets:
+                changed_planets.update([source_planet_id, destination_planet_id])
+                new_fleets.append((owner, destination_planet_id, num_ships, arrival_turn - self.turns))
+            forecast.update_planets(planets, changed_planets, new_fleets)
+        else:
+            forecast = Forecast.from_arrays(planets, self.game.get_fleets_array())
+        self._forecast = forecast
+        self._forecast_turn = self.turns
+        return forecast
 
-            # When no tie the planet belongs to the biggest force.
-            # The num_ships in the planet is the biggest force size minus the second biggest force size
-            second_largest_force = max([size for size in forces.values() if size < max_force_size])
-            planet.owner = largest_force_owner[0]
-            planet.num_ships = max_force_size - second_largest_force
+    def get_state_hash(self, player_num: int = 1) -> int:
+        """
+        The hash of the current game state (see state_hash) from the perspective of the given player, equal to
+        state_hash.state_hash of the player's game object arrays.
+        From the first call the engine keeps the hash of the fleets in flight up to date - it adds the hash of each
+        launched fleet and subtracts the hash of each fleet that lands - so each call costs only the hash of the planets
+        (vectorized, once per change of the planets). The engine is also the forward simulator of search bots: step a
+        GameManager of a cloned game with finish_turn and compare the states by their hash.
+
+        :param player_num: The player number (1 or 2)
+        """
+        if self._fleets_hashes is None:
+            self._fleets_hashes = [0, 0]
+            self._update_fleets_hashes(self.game.fleets, arrival_turn_offset=self.turns, sign=1)
+
+        planets = self.game.get_planets_array()
+        if self._planets_hashes is None or self._planets_hashes[0] is not planets:
+            owners = planets["owner"]
+            self._planets_hashes = (planets, [
+                sum_hashes(planets_hashes(planets["planet_id"], perspective_owners, planets["num_ships"]))
+                for perspective_owners in (owners, switched_owners(owners))
+            ])
+        perspective = player_num - 1
+        return combine_hashes(
+            self._planets_hashes[1][perspective], self._fleets_hashes[perspective], turn_hash(self.turns)
+        )
+
+    def _update_fleets_hashes(self, fleets: List[Fleet], arrival_turn_offset: int, sign: int):
+        """
+        Add (sign 1) or subtract (sign -1) the hashes of the given fleets to the fleets hashes, if they are kept
+        :param arrival_turn_offset: The turn the turns_remaining of the fleets counts from
+        """
+        if self._fleets_hashes is None or len(fleets) == 0:
+            return
+        fleets_array = fleets_to_array(expand_fleets(fleets))
+        owners = fleets_array["owner"]
+        for perspective, perspective_owners in enumerate((owners, switched_owners(owners))):
+            fleets_hash = sum_hashes(fleets_hashes(
+                perspective_owners, fleets_array["num_ships"], fleets_array["source_planet_id"],
+                fleets_array["destination_planet_id"], fleets_array["total_trip_length"],
+                arrival_turn_offset + fleets_array["turns_remaining"]
+            ))
+            self._fleets_hashes[perspective] = combine_hashes(self._fleets_hashes[perspective], sign * fleets_hash)
+
+    def _create_turn_delta(self, planets_before_turn) -> TurnDelta:
+        """
+        :param planets_before_turn: The planets array from the start of the turn
+        :return: The changes in the turn that just ended
+        """
+        planets = self.game.get_planets_array()
+        changed = (planets["owner"] != planets_before_turn["owner"]) | (
+            planets["num_ships"] != planets_before_turn["num_ships"]
+        )
+        return TurnDelta(
+            turn=self.turns,
+            changed_planets=[
+                (planet_id, owner, num_ships)
+                for planet_id, owner, num_ships in zip(
+                    changed.nonzero()[0].tolist(), planets["owner"][changed].tolist(),
+                    planets["num_ships"][changed].tolist()
+                )
+            ],
+            launched_fleets=[
+                Fleet(owner, num_ships, source_planet_id, destination_planet_id, total_trip_length,
+                      arrival_turn - self.turns)
+                for owner, source_planet_id, destination_planet_id, num_ships, arrival_turn, total_trip_length
+                in self._launched_fleets
+            ],
+            landed_fleets=self._turn_landed_fleets,
+            battles=self._turn_battles
+        )
 
     def get_player_score(self, player_num: int):
         """
@@ -215,31 +798,53 @@ class GameManager:
         :return: The game state - tie, player 1 wins, player 2 wins or still in-game
         """
         # get orders of player 1
-        game_object_for_player_1 = clone_game_object(self.game)
-        game_object_for_player_1.turns = self.turns
-        orders_of_player_1 = self.safely_run_bot(self.player_1, game_object_for_player_1)
+        orders_of_player_1 = self.run_player_turn(1)
         if orders_of_player_1 is False:
             return self.PLAYER_2_WIN_STATE
 
         # get orders of player 2
-        game_object_for_player_2 = clone_game_object(self.game)
-        switch_players_of_game_object(game_object_for_player_2)
-        game_object_for_player_2.turns = self.turns
-        orders_of_player_2 = self.safely_run_bot(self.player_2, game_object_for_player_2)
+        orders_of_player_2 = self.run_player_turn(2)
+        return self.finish_turn(orders_of_player_1, orders_of_player_2)
+
+    def finish_turn(
+            self, orders_of_player_1: Union[List[Order], bool], orders_of_player_2: Union[List[Order], bool]
+    ) -> str:
+        """
+        The second part of a turn, after the bots played - execute the orders and advance the game one turn.
+        Used by make_turn, and by schedulers that get the orders of many games together (see engine.scheduler).
+
+        :param orders_of_player_1: The orders of player 1, False if the bot failed
+        :param orders_of_player_2: The orders of player 2, False if the bot failed
+        :return: The game state - tie, player 1 wins, player 2 wins or still in-game
+        """
+        if orders_of_player_1 is False:
+            return self.PLAYER_2_WIN_STATE
         if orders_of_player_2 is False:
             return self.PLAYER_1_WIN_STATE
 
-        for order in orders_of_player_1:
-            self.execute_order(order, player_id=1)
-        for order in orders_of_player_2:
-            self.execute_order(order, player_id=2)
+        planets_before_turn = self.game.get_planets_array() if self._record_turn_deltas else None
+        self._launched_fleets = []
+        self._turn_battles = []
+        self._turn_landed_fleets = []
+        # The orders of each player only touch its own planets - so both are validated against the same snapshot
+        planets = None
+        if self._use_batch_validation(orders_of_player_1) or self._use_batch_validation(orders_of_player_2):
+            planets = self.game.get_planets_array()
+        self.last_orders_reports = {
+            1: self.execute_orders(orders_of_player_1, player_id=1, planets=planets),
+            2: self.execute_orders(orders_of_player_2, player_id=2, planets=planets)
+        }
 
         self.advance()
         self.population_growth()
         self.arrival()
 
         self.turns += 1
-        self.add_turn_for_display()
+        self.game.turns = self.turns
+        if self.record_display:
+            self.add_turn_for_display()
+        if self._record_turn_deltas:
+            self._turn_delta = self._create_turn_delta(planets_before_turn)
 
         return self.check_endgame_conditions()
 
@@ -258,6 +863,9 @@ class GameManager:
         """
         Add self.str_turns_for_display string representation of the game state
         """
+        if self.replay_writer is not None:
+            self.replay_writer.add_turn(self.get_display_turn())
+            return
         planets_desc = ",".join(f"{p.owner}.{int(p.num_ships)}" for p in self.game.planets)
         if len(self.game.fleets) == 0:
             self.str_turns_for_display.append(planets_desc)
@@ -265,14 +873,53 @@ class GameManager:
             fleet_desc = ",".join(
                 f"{f.owner}.{int(f.num_ships)}.{f.source_planet_id}.{f.destination_planet_id}."
                 f"{int(f.total_trip_length)}.{int(f.turns_remaining)}"
-                for f in self.game.fleets
+                for f in expand_fleets(self.game.fleets)
             )
             self.str_turns_for_display.append(planets_desc + "," + fleet_desc)
 
+    def get_display_turn(self) -> ReplayTurn:
+        """
+        :return: The game state for display as arrays - the same as the string add_turn_for_display adds
+        """
+        planets = self.game.planets
+        fleets = expand_fleets(self.game.fleets)
+        return ReplayTurn(
+            owners=np.array([p.owner for p in planets], dtype=np.int8),
+            ships=np.array([int(p.num_ships) for p in planets], dtype=np.int32),
+            fleets=np.array([
+                (f.owner, int(f.num_ships), f.source_planet_id, f.destination_planet_id, int(f.total_trip_length),
+                 int(f.turns_remaining))
+                for f in fleets
+            ], dtype=np.int32).reshape(len(fleets), 6)
+        )
+
+    def set_replay_writer(self, replay_writer: ReplayWriter):
+        """
+        Write the turns for display to the given replay writer while the game runs, instead of keeping them in memory
+        (for example to a replay archive, see replays.archive). Call before the first turn.
+        Then get_description_for_display isn't available - read the replay from the writer.
+        """
+        assert self.turns == 0, "set the replay writer before the game starts"
+        self.replay_writer = replay_writer
+
+    def get_map_description(self) -> str:
+        """
+        :return: The map part of the description for display (before the "|")
+        """
+        return ":".join(f"{p.x},{p.y},{p.owner},{p.num_ships},{p.growth_rate}" for p in self.original_map.planets)
+
     def get_description_for_display(self):
         """
         :return: String representation of the game occurred.
         """
-        map_desc = ":".join(f"{p.x},{p.y},{p.owner},{p.num_ships},{p.growth_rate}" for p in self.original_map.planets)
+        if self.replay_writer is not None:
+            raise ValueError("the turns were written to the replay writer (see set_replay_writer)")
         turns_desc = ":".join(self.str_turns_for_display)
-        return map_desc + "|" + turns_desc
+        return self.get_map_description() + "|" + turns_desc
+
+    def get_replay(self, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, compression: str = "zlib") -> bytes:
+        """
+        :return: The game occurred in the compact replay format (see replays.codec) - decode_replay converts it back to
+                 get_description_for_display
+        """
+        return encode_replay(self.get_description_for_display(), keyframe_interval, compression)
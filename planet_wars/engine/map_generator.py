@@ -1,7 +1,15 @@
 #!/usr/bin/python
 
 import math
+import os
 import random
+from functools import partial
+from multiprocessing import Pool
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from planet_wars.spatial_index import GridIndex
 
 # minimum and maximum total number of planets in map
 minPlanets = 15
@@ -28,19 +36,20 @@ maxRadius = 15
 # this is to try and avoid rounding errors causing different distances to be
 # calculated on different platforms and languages
 epsilon = 0.002
+# on huge maps almost every candidate position has a distance to some planet that is too close to an integer,
+# so there the epsilon check is done only against the planets within this radius
+largeMapEpsilonRadius = 5
+
 
 def make_planet(x, y, owner, num_ships, growth_rate):
     return {"x" : x, "y" : y, "owner" : owner, "num_ships" : num_ships,
             "growth_rate" : growth_rate}
 
-def print_planet(p):
+
+def planet_to_str(p):
     out = ["P", p["x"], p["y"], p["owner"], p["num_ships"], p["growth_rate"]]
-    print(" ".join(str(i) for i in out))
+    return " ".join(str(i) for i in out)
 
-def translate_planets(planets):
-    for p in planets:
-        p["x"] += maxRadius
-        p["y"] += maxRadius
 
 def generate_coordinates(p, r, theta):
     if theta < 0:
@@ -50,159 +59,321 @@ def generate_coordinates(p, r, theta):
     p["x"] = r * math.cos( math.radians(theta) )
     p["y"] = r * math.sin( math.radians(theta) )
 
-def rand_num(min, max):
-    return ( random.random() * (max-min) ) + min
-
-def rand_radius(min_r, max_r):
-    val = min_r - 1
-    while val < min_r:
-        val = math.sqrt(random.random()) * max_r
-    return val
 
 def distance(p1, p2):
     return math.ceil(actual_distance(p1, p2))
 
+
 def actual_distance(p1, p2):
     dx = p1["x"] - p2["x"]
     dy = p1["y"] - p2["y"]
     return math.sqrt(dx * dx + dy * dy)
 
-def not_valid(p1, p2):
-    adist = actual_distance(p1, p2)
-    if distance(p1, p2) < minDistance or abs(adist - round(adist)) < epsilon:
-        return True
-    for p in planets:
-        adist1 = actual_distance(p, p1)
-        adist2 = actual_distance(p, p2)
-        if (distance(p, p1) < minDistance
-                or distance(p, p2) < minDistance
-                or abs(adist1-round(adist1)) < epsilon
-                or abs(adist2-round(adist2)) < epsilon):
-            return True
-    return False
-
-def not_valids(p1):
-    for p in planets:
-        adist = actual_distance(p, p1)
-        if distance(p, p1) < minDistance or abs(adist-round(adist)) < epsilon:
-            return True
-    return False
-
-#works out information about the map
-planetsToGenerate = random.randint(minPlanets, maxPlanets)
-if random.randint(0, 1):
-    symmetryType = 1 # radial symmetry
-    # can only generate an odd number of planets in this symmetry
-    while planetsToGenerate % 2 == 0:
-        if planetsToGenerate == maxPlanets:
-            planetsToGenerate = minPlanets
+
+class _PlanetsPositions:
+    """
+    The positions of the planets placed so far.
+    When epsilon_radius is None a candidate position is checked against all the placed planets at once with numpy.
+    Otherwise only the planets within epsilon_radius (and min_distance) of the candidate can conflict with it, and
+    they are found with a grid spatial index - so placing a planet doesn't get slower as the map grows.
+    """
+
+    def __init__(
+            self, min_distance: float, eps: float, epsilon_radius: Optional[float] = None,
+            use_spatial_index: bool = True, capacity: int = 64
+    ):
+        self.min_distance = min_distance
+        self.epsilon = eps
+        self.epsilon_radius = epsilon_radius
+        self.xs = np.empty(capacity)
+        self.ys = np.empty(capacity)
+        self.count = 0
+        self.grid = None
+        if epsilon_radius is not None and use_spatial_index:
+            self.query_radius = max(min_distance, epsilon_radius)
+            self.grid = GridIndex(self.query_radius)
+
+    def add(self, p):
+        if self.count == len(self.xs):
+            self.xs = np.resize(self.xs, 2 * len(self.xs))
+            self.ys = np.resize(self.ys, 2 * len(self.ys))
+        self.xs[self.count] = p["x"]
+        self.ys[self.count] = p["y"]
+        self.count += 1
+        if self.grid is not None:
+            self.grid.add(p["x"], p["y"])
+
+    def pair_not_valid(self, d: float) -> bool:
+        """
+        :param d: The actual distance between two planets
+        :return: True if the distance is too short or too close to an integer
+        """
+        if self.epsilon_radius is not None and d > self.epsilon_radius:
+            return math.ceil(d) < self.min_distance
+        return math.ceil(d) < self.min_distance or abs(d - round(d)) < self.epsilon
+
+    def conflicts(self, p) -> bool:
+        """
+        :return: True if the given planet is too close to one of the placed planets, or if its distance from one of
+                 them (within epsilon_radius) is too close to an integer.
+        """
+        if self.count == 0:
+            return False
+        if self.grid is not None:
+            return any(
+                self.pair_not_valid(actual_distance(p, {"x": self.grid.xs[i], "y": self.grid.ys[i]}))
+                for i in self.grid.query_radius(p["x"], p["y"], self.query_radius)
+            )
+
+        dx = self.xs[:self.count] - p["x"]
+        dy = self.ys[:self.count] - p["y"]
+        d = np.sqrt(dx * dx + dy * dy)
+        rounding_conflicts = np.abs(d - np.round(d)) < self.epsilon
+        if self.epsilon_radius is not None:
+            rounding_conflicts &= d <= self.epsilon_radius
+        return bool(np.any((np.ceil(d) < self.min_distance) | rounding_conflicts))
+
+
+class _MapGenerator:
+    """
+    The generation of one map, all the randomness comes from the given random.Random object.
+    """
+
+    def __init__(
+            self, rng: random.Random, min_planets: int, max_planets: int, max_central: int, min_ships: int,
+            max_ships: int, min_growth: int, max_growth: int, min_distance: float, min_starting_distance: float,
+            max_radius: float, eps: float, epsilon_radius: Optional[float], use_spatial_index: bool
+    ):
+        self.rng = rng
+        self.min_planets = min_planets
+        self.max_planets = max_planets
+        self.max_central = max_central
+        self.min_ships = min_ships
+        self.max_ships = max_ships
+        self.min_growth = min_growth
+        self.max_growth = max_growth
+        self.min_distance = min_distance
+        self.min_starting_distance = min_starting_distance
+        self.max_radius = max_radius
+        self.planets = []
+        self.positions = _PlanetsPositions(min_distance, eps, epsilon_radius, use_spatial_index)
+
+    def rand_num(self, min, max):
+        return ( self.rng.random() * (max-min) ) + min
+
+    def rand_radius(self, min_r, max_r):
+        val = min_r - 1
+        while val < min_r:
+            val = math.sqrt(self.rng.random()) * max_r
+        return val
+
+    def not_valid(self, p1, p2):
+        return (
+            self.positions.pair_not_valid(actual_distance(p1, p2))
+            or self.positions.conflicts(p1)
+            or self.positions.conflicts(p2)
+        )
+
+    def not_valids(self, p1):
+        return self.positions.conflicts(p1)
+
+    def add_planet(self, p):
+        self.planets.append(p)
+        self.positions.add(p)
+
+    def generate(self) -> List[dict]:
+        rng = self.rng
+
+        #works out information about the map
+        planetsToGenerate = rng.randint(self.min_planets, self.max_planets)
+        if rng.randint(0, 1):
+            symmetryType = 1 # radial symmetry
+            # can only generate an odd number of planets in this symmetry
+            while planetsToGenerate % 2 == 0:
+                if planetsToGenerate == self.max_planets:
+                    planetsToGenerate = self.min_planets
+                else:
+                    planetsToGenerate += 1
         else:
-            planetsToGenerate += 1
-else:
-    symmetryType = -1 # linear symmetry
-
-planets = []
-
-#adds the centre planet
-planets.append(make_planet(0, 0, 0, random.randint(minShips, maxShips),
-    random.randint(0, maxGrowth)))
-planetsToGenerate -= 1
-
-#picks out the home planets
-r = rand_radius(minDistance, maxRadius)
-theta1 = rand_num(0, 360)
-if symmetryType == 1 and theta1 < 180:
-    theta2 = theta1+180
-elif symmetryType == 1:
-    theta2 = theta1-180
-else:
-    theta2 = rand_num(0, 360)
-
-p1 = make_planet(0, 0, 1, 100, 5)
-p2 = make_planet(0, 0, 2, 100, 5)
-generate_coordinates(p1, r, theta1)
-generate_coordinates(p2, r, theta2)
-
-while not_valid(p1, p2) or distance(p1, p2) < minStartingDistance:
-    r = rand_radius(minDistance, maxRadius)
-    theta1 = rand_num(0, 360)
-    if symmetryType == 1 and theta1 < 180:
-        theta2 = theta1+180
-    elif symmetryType == 1:
-        theta2 = theta1-180
-    else:
-        theta2 = rand_num(0, 360)
-
-    generate_coordinates(p1, r, theta1)
-    generate_coordinates(p2, r, theta2)
-planets.append(p1)
-planets.append(p2)
-planetsToGenerate -= 2
-
-#makes the center neutral planets
-if symmetryType == 1:
-    noCenterNeutrals = 2*random.randint(0, maxCentral//2)
-    thetaA = (theta1+theta2)//2
-    thetaB = thetaA + 180
-    for i in range(noCenterNeutrals//2):
-        r = rand_radius(minDistance, maxRadius)
-        num_ships = random.randint(minShips, maxShips)
-        growth_rate = random.randint(minGrowth, maxGrowth)
-        p1 = make_planet(0, 0, 0, num_ships, growth_rate)
-        p2 = make_planet(0, 0, 0, num_ships, growth_rate)
-        generate_coordinates(p1, r, thetaA)
-        generate_coordinates(p2, r, thetaB)
-        while not_valid(p1, p2):
-            r = rand_radius(minDistance, maxRadius)
-            generate_coordinates(p1, r, thetaA)
-            generate_coordinates(p2, r, thetaB)
-        planets.append(p1)
-        planets.append(p2)
-        planetsToGenerate -= 2
-else:
-    # must have an even number of planets left to generate after this
-    minCentral = planetsToGenerate % 2
-    noCenterNeutrals = random.randrange(minCentral, maxCentral+1, 2)
-    theta = (theta1+theta2)//2
-    if random.randint(0, 1) == 1:
-        theta += 180
-    for i in range(noCenterNeutrals):
-        r = rand_radius(0, maxRadius)
-        num_ships = random.randint(minShips, maxShips)
-        growth_rate = random.randint(minGrowth, maxGrowth)
-        p = make_planet(0, 0, 0, num_ships, growth_rate)
-        generate_coordinates(p, r, theta)
-        while not_valids(p):
-            r = rand_radius(0, maxRadius)
-            generate_coordinates(p, r, theta)
-        planets.append(p)
+            symmetryType = -1 # linear symmetry
+
+        #adds the centre planet
+        self.add_planet(make_planet(0, 0, 0, rng.randint(self.min_ships, self.max_ships),
+            rng.randint(0, self.max_growth)))
         planetsToGenerate -= 1
 
-#picks out the rest of the neutral planets
-assert planetsToGenerate % 2 == 0, "Error: odd number of planets left to add"
-for i in range(planetsToGenerate//2):
-    r = rand_radius(minDistance, maxRadius)
-    theta = rand_num(0, 360)
-    if i == 0:
-        planet_max = min(100, 5 * distance(planets[1], planets[2]) - 1)
-        num_ships = random.randint(minShips, planet_max)
-    else:
-        num_ships = random.randint(minShips, maxShips)
-    growth_rate = random.randint(minGrowth, maxGrowth)
-    p1 = make_planet(0, 0, 0, num_ships, growth_rate)
-    p2 = make_planet(0, 0, 0, num_ships, growth_rate)
-    generate_coordinates(p1, r, theta1+theta)
-    generate_coordinates(p2, r, theta2 + symmetryType*theta)
-
-    while not_valid(p1, p2):
-        r = rand_radius(minDistance, maxRadius)
-        theta = rand_num(0, 360)
-        generate_coordinates(p1, r, theta1 + theta)
-        generate_coordinates(p2, r, theta2 + symmetryType*theta)
-    planets.append(p1)
-    planets.append(p2)
-
-translate_planets(planets)
-
-for p in planets:
-    print_planet(p)
+        #picks out the home planets
+        r = self.rand_radius(self.min_distance, self.max_radius)
+        theta1 = self.rand_num(0, 360)
+        if symmetryType == 1 and theta1 < 180:
+            theta2 = theta1+180
+        elif symmetryType == 1:
+            theta2 = theta1-180
+        else:
+            theta2 = self.rand_num(0, 360)
+
+        p1 = make_planet(0, 0, 1, 100, 5)
+        p2 = make_planet(0, 0, 2, 100, 5)
+        generate_coordinates(p1, r, theta1)
+        generate_coordinates(p2, r, theta2)
+
+        while self.not_valid(p1, p2) or distance(p1, p2) < self.min_starting_distance:
+            r = self.rand_radius(self.min_distance, self.max_radius)
+            theta1 = self.rand_num(0, 360)
+            if symmetryType == 1 and theta1 < 180:
+                theta2 = theta1+180
+            elif symmetryType == 1:
+                theta2 = theta1-180
+            else:
+                theta2 = self.rand_num(0, 360)
+
+            generate_coordinates(p1, r, theta1)
+            generate_coordinates(p2, r, theta2)
+        self.add_planet(p1)
+        self.add_planet(p2)
+        planetsToGenerate -= 2
+
+        #makes the center neutral planets
+        if symmetryType == 1:
+            noCenterNeutrals = 2*rng.randint(0, self.max_central//2)
+            thetaA = (theta1+theta2)//2
+            thetaB = thetaA + 180
+            for i in range(noCenterNeutrals//2):
+                r = self.rand_radius(self.min_distance, self.max_radius)
+                num_ships = rng.randint(self.min_ships, self.max_ships)
+                growth_rate = rng.randint(self.min_growth, self.max_growth)
+                p1 = make_planet(0, 0, 0, num_ships, growth_rate)
+                p2 = make_planet(0, 0, 0, num_ships, growth_rate)
+                generate_coordinates(p1, r, thetaA)
+                generate_coordinates(p2, r, thetaB)
+                while self.not_valid(p1, p2):
+                    r = self.rand_radius(self.min_distance, self.max_radius)
+                    generate_coordinates(p1, r, thetaA)
+                    generate_coordinates(p2, r, thetaB)
+                self.add_planet(p1)
+                self.add_planet(p2)
+                planetsToGenerate -= 2
+        else:
+            # must have an even number of planets left to generate after this
+            minCentral = planetsToGenerate % 2
+            noCenterNeutrals = rng.randrange(minCentral, self.max_central+1, 2)
+            theta = (theta1+theta2)//2
+            if rng.randint(0, 1) == 1:
+                theta += 180
+            for i in range(noCenterNeutrals):
+                r = self.rand_radius(0, self.max_radius)
+                num_ships = rng.randint(self.min_ships, self.max_ships)
+                growth_rate = rng.randint(self.min_growth, self.max_growth)
+                p = make_planet(0, 0, 0, num_ships, growth_rate)
+                generate_coordinates(p, r, theta)
+                while self.not_valids(p):
+                    r = self.rand_radius(0, self.max_radius)
+                    generate_coordinates(p, r, theta)
+                self.add_planet(p)
+                planetsToGenerate -= 1
+
+        #picks out the rest of the neutral planets
+        assert planetsToGenerate % 2 == 0, "Error: odd number of planets left to add"
+        for i in range(planetsToGenerate//2):
+            r = self.rand_radius(self.min_distance, self.max_radius)
+            theta = self.rand_num(0, 360)
+            if i == 0:
+                planet_max = min(100, 5 * distance(self.planets[1], self.planets[2]) - 1)
+                num_ships = rng.randint(self.min_ships, planet_max)
+            else:
+                num_ships = rng.randint(self.min_ships, self.max_ships)
+            growth_rate = rng.randint(self.min_growth, self.max_growth)
+            p1 = make_planet(0, 0, 0, num_ships, growth_rate)
+            p2 = make_planet(0, 0, 0, num_ships, growth_rate)
+            generate_coordinates(p1, r, theta1+theta)
+            generate_coordinates(p2, r, theta2 + symmetryType*theta)
+
+            while self.not_valid(p1, p2):
+                r = self.rand_radius(self.min_distance, self.max_radius)
+                theta = self.rand_num(0, 360)
+                generate_coordinates(p1, r, theta1 + theta)
+                generate_coordinates(p2, r, theta2 + symmetryType*theta)
+            self.add_planet(p1)
+            self.add_planet(p2)
+
+        # translate the planets so all the coordinates are positive
+        for p in self.planets:
+            p["x"] += self.max_radius
+            p["y"] += self.max_radius
+        return self.planets
+
+
+def generate_map(
+        seed: Optional[int] = None,
+        min_planets: int = minPlanets,
+        max_planets: int = maxPlanets,
+        max_central: int = maxCentral,
+        min_ships: int = minShips,
+        max_ships: int = maxShips,
+        min_growth: int = minGrowth,
+        max_growth: int = maxGrowth,
+        min_distance: float = minDistance,
+        min_starting_distance: float = minStartingDistance,
+        max_radius: float = maxRadius,
+        eps: float = epsilon,
+        epsilon_radius: Optional[float] = None,
+        use_spatial_index: bool = True
+) -> str:
+    """
+    Generate a random symmetric map. The same seed and parameters always generate the same map.
+    See the module constants for the meaning of the parameters (and their default values).
+
+    :param seed: The random seed, None for a random map
+    :param epsilon_radius: If given the distance rounding (eps) check is done only between planets closer than this
+                           radius, which lets planet placement use a spatial index. None checks all the planet pairs.
+    :param use_spatial_index: Use a grid spatial index for the placement checks (only when epsilon_radius is given)
+    :return: The map string, in the same format as the files in the maps directory
+    """
+    generator = _MapGenerator(
+        random.Random(seed), min_planets, max_planets, max_central, min_ships, max_ships, min_growth, max_growth,
+        min_distance, min_starting_distance, max_radius, eps, epsilon_radius, use_spatial_index
+    )
+    return "\n".join(planet_to_str(p) for p in generator.generate()) + "\n"
+
+
+def generate_large_map(num_planets: int, seed: Optional[int] = None, **params) -> str:
+    """
+    Generate a map with num_planets or num_planets + 1 planets, keeping the planets density of the regular maps.
+    :param num_planets: The number of planets in the map
+    :param seed: The random seed, None for a random map
+    :param params: Parameters for generate_map, override the large map defaults
+    :return: The map string
+    """
+    params.setdefault("max_radius", maxRadius * math.sqrt(max(num_planets, maxPlanets) / maxPlanets))
+    params.setdefault("epsilon_radius", largeMapEpsilonRadius)
+    params.setdefault("max_central", min(maxCentral, num_planets - 3))
+    return generate_map(seed, min_planets=num_planets, max_planets=num_planets + 1, **params)
+
+
+def generate_maps(seeds: Iterable[int], processes: Optional[int] = None, **params) -> List[str]:
+    """
+    Generate a map for each of the given seeds using a process pool.
+    :param seeds: The seeds of the maps, the maps are reproducible given the seeds
+    :param processes: Number of worker processes (None is the number of CPUs)
+    :param params: Parameters for generate_map
+    :return: The map strings, in the order of the given seeds
+    """
+    with Pool(processes) as pool:
+        return pool.map(partial(generate_map, **params), seeds, chunksize=64)
+
+
+def write_maps(maps: List[str], maps_dir: str, first_map_id: int = 1):
+    """
+    Write the given maps into maps_dir as map{id}.txt files, so they can be loaded with the map library.
+    :param maps: The map strings to write
+    :param maps_dir: The directory to write to (created if missing)
+    :param first_map_id: The id of the first map
+    """
+    os.makedirs(maps_dir, exist_ok=True)
+    for map_id, map_str in enumerate(maps, start=first_map_id):
+        with open(os.path.join(maps_dir, f"map{map_id}.txt"), "w") as f:
+            f.write(map_str)
+
+
+if __name__ == "__main__":
+    print(generate_map(), end="")
@@ -0,0 +1,264 @@
+"""
+Packed binary map library.
+
+All the maps of a maps directory are compiled once into a single file:
+
+    header  | magic (8 bytes), version, number of maps, sha256 fingerprint of the source directory
+    index   | one entry per map: name, planets offset, planets count, fleets offset, fleets count
+    data    | fixed width planet and fleet records (see MAP_PLANET_DTYPE and MAP_FLEET_DTYPE)
+
+The file is memory mapped, so loading a map is a numpy view on the mapped pages - no text parsing, and all the
+processes that use the same library share the same pages.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from planet_wars import PLANET_WARS_MODULE_PATH, TMP_DIR_PATH
+from planet_wars.planet_wars import PlanetWars, Planet, Fleet
+
+MAPS_DIR_PATH = os.path.join(PLANET_WARS_MODULE_PATH, "maps")
+
+MAP_PLANET_DTYPE = np.dtype([
+    ("x", "<f8"), ("y", "<f8"), ("owner", "<i4"), ("num_ships", "<i4"), ("growth_rate", "<i4"), ("_pad", "<i4")
+])
+MAP_FLEET_DTYPE = np.dtype([
+    ("owner", "<i4"), ("num_ships", "<i4"), ("source_planet_id", "<i4"), ("destination_planet_id", "<i4"),
+    ("total_trip_length", "<i4"), ("turns_remaining", "<i4")
+])
+
+_MAGIC = b"PWMAPLIB"
+_VERSION = 1
+_HEADER = struct.Struct("<8sII32s")
+_INDEX_ENTRY = struct.Struct("<64sQIQI")
+_NAME_SIZE = 64
+
+
+def _map_name(map_id: Union[int, str]) -> str:
+    """
+    :param map_id: The map id (17 -> map17.txt) or the map file name without the .txt suffix
+    :return: The map name as stored in the library index
+    """
+    return f"map{map_id}" if isinstance(map_id, int) else map_id
+
+
+def _list_map_files(maps_dir: str) -> List[str]:
+    return sorted(file_name for file_name in os.listdir(maps_dir) if file_name.endswith(".txt"))
+
+
+def compute_maps_dir_fingerprint(maps_dir: str) -> bytes:
+    """
+    The fingerprint changes whenever a map file is added, removed or modified.
+    :param maps_dir: The directory with the map text files
+    :return: sha256 digest of the names, sizes and modification times of the maps in the directory
+    """
+    digest = hashlib.sha256()
+    for file_name in _list_map_files(maps_dir):
+        stat = os.stat(os.path.join(maps_dir, file_name))
+        digest.update(f"{file_name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.digest()
+
+
+def default_compiled_path(maps_dir: str) -> str:
+    """
+    :param maps_dir: The directory with the map text files
+    :return: Where the compiled library of the given directory is stored by default (in TMP_DIR_PATH)
+    """
+    dir_hash = hashlib.sha1(os.path.abspath(maps_dir).encode()).hexdigest()[:12]
+    return os.path.join(TMP_DIR_PATH, f"maps_{dir_hash}.pwlib")
+
+
+def compile_maps_dir(maps_dir: str, compiled_path: str):
+    """
+    Parse all the maps in maps_dir and write them into one packed binary file.
+    The file is written to a temporary path and then renamed, so processes reading the library never see a
+    partially written file.
+
+    :param maps_dir: The directory with the map text files
+    :param compiled_path: Where to write the compiled library
+    """
+    fingerprint = compute_maps_dir_fingerprint(maps_dir)
+    file_names = _list_map_files(maps_dir)
+
+    data_offset = _HEADER.size + _INDEX_ENTRY.size * len(file_names)
+    index = []
+    chunks = []
+    for file_name in file_names:
+        with open(os.path.join(maps_dir, file_name)) as f:
+            game = PlanetWars.parse_game_state(f.read())
+        if not game:
+            raise ValueError(f"Can not parse map file {file_name}")
+
+        planets = np.zeros(len(game.planets), dtype=MAP_PLANET_DTYPE)
+        for i, p in enumerate(game.planets):
+            planets[i] = (p.x, p.y, p.owner, p.num_ships, p.growth_rate, 0)
+        fleets = np.zeros(len(game.fleets), dtype=MAP_FLEET_DTYPE)
+        for i, f in enumerate(game.fleets):
+            fleets[i] = (
+                f.owner, f.num_ships, f.source_planet_id, f.destination_planet_id, f.total_trip_length,
+                f.turns_remaining
+            )
+
+        name = file_name[:-len(".txt")].encode()
+        if len(name) > _NAME_SIZE:
+            raise ValueError(f"Map file name {file_name} is too long")
+        planets_offset = data_offset
+        fleets_offset = planets_offset + planets.nbytes
+        data_offset = fleets_offset + fleets.nbytes
+        index.append(_INDEX_ENTRY.pack(name, planets_offset, len(planets), fleets_offset, len(fleets)))
+        chunks.extend([planets.tobytes(), fleets.tobytes()])
+
+    os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+    tmp_path = f"{compiled_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(file_names), fingerprint))
+        f.writelines(index)
+        f.writelines(chunks)
+    os.replace(tmp_path, compiled_path)
+
+
+class MapLibrary:
+    """
+    Read only access to a compiled maps directory.
+    The compiled file is (re)built automatically when it is missing or when the maps in the directory changed - checked
+    when the library is opened and on each get_map.
+    """
+
+    def __init__(self, maps_dir: str = MAPS_DIR_PATH, compiled_path: Optional[str] = None):
+        """
+        :param maps_dir: The directory with the map text files (defaults to the bundled maps)
+        :param compiled_path: Where to keep the compiled library. Defaults to a file in TMP_DIR_PATH.
+        """
+        self.maps_dir = maps_dir
+        self.compiled_path = compiled_path or default_compiled_path(maps_dir)
+        self._mmap = None
+        self._index: Dict[str, Tuple[int, int, int, int]] = {}
+        # The fingerprint of the maps directory the open library was compiled from
+        self._fingerprint: Optional[bytes] = None
+        self.open()
+
+    def open(self):
+        """
+        Memory map the compiled library, compiling it first if it is missing or stale.
+        """
+        self.close()
+        fingerprint = compute_maps_dir_fingerprint(self.maps_dir)
+        if self._read_fingerprint() != fingerprint:
+            compile_maps_dir(self.maps_dir, self.compiled_path)
+
+        with open(self.compiled_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        _, _, num_maps, self._fingerprint = _HEADER.unpack_from(self._mmap, 0)
+        for i in range(num_maps):
+            name, planets_offset, num_planets, fleets_offset, num_fleets = _INDEX_ENTRY.unpack_from(
+                self._mmap, _HEADER.size + i * _INDEX_ENTRY.size
+            )
+            self._index[name.rstrip(b"\0").decode()] = (planets_offset, num_planets, fleets_offset, num_fleets)
+
+    def _read_fingerprint(self) -> Optional[bytes]:
+        """
+        :return: The fingerprint stored in the compiled file, None if there is no valid compiled file.
+        """
+        try:
+            with open(self.compiled_path, "rb") as f:
+                magic, version, _, fingerprint = _HEADER.unpack(f.read(_HEADER.size))
+        except (OSError, struct.error):
+            return None
+        if magic != _MAGIC or version != _VERSION:
+            return None
+        return fingerprint
+
+    def is_stale(self) -> bool:
+        """
+        :return: True if the maps directory changed since the open library was compiled
+        """
+        return self._fingerprint != compute_maps_dir_fingerprint(self.maps_dir)
+
+    def refresh(self):
+        """
+        Reopen the library if the maps directory changed since it was opened.
+        """
+        if self.is_stale():
+            self.open()
+
+    def close(self):
+        """
+        Close the memory mapped file. Arrays returned by get_map_arrays keep the mapping alive until released.
+        """
+        self._index = {}
+        self._fingerprint = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # There are still numpy views on the mapping - it will be closed when they are released
+            self._mmap = None
+
+    def map_names(self) -> List[str]:
+        """
+        :return: The names of all the maps in the library (the map file names without the .txt suffix)
+        """
+        return list(self._index.keys())
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, map_id: Union[int, str]):
+        return _map_name(map_id) in self._index
+
+    def get_map_arrays(self, map_id: Union[int, str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zero copy access to a map - the returned arrays are read only views of the memory mapped file.
+        :param map_id: The map id (17 -> map17.txt) or the map name
+        :return: The planets array (MAP_PLANET_DTYPE) and the fleets array (MAP_FLEET_DTYPE)
+        """
+        name = _map_name(map_id)
+        if name not in self._index:
+            raise KeyError(f"Map {name} is not in the library of {self.maps_dir}")
+        planets_offset, num_planets, fleets_offset, num_fleets = self._index[name]
+        planets = np.frombuffer(self._mmap, dtype=MAP_PLANET_DTYPE, count=num_planets, offset=planets_offset)
+        fleets = np.frombuffer(self._mmap, dtype=MAP_FLEET_DTYPE, count=num_fleets, offset=fleets_offset)
+        return planets, fleets
+
+    def get_map(self, map_id: Union[int, str]) -> PlanetWars:
+        """
+        The library is rebuilt first if the maps directory changed (see refresh).
+        :param map_id: The map id (17 -> map17.txt) or the map name
+        :return: A new PlanetWars object of the map initial state
+        """
+        self.refresh()
+        planets_array, fleets_array = self.get_map_arrays(map_id)
+        planets = [
+            Planet(planet_id, owner, num_ships, growth_rate, x, y)
+            for planet_id, (x, y, owner, num_ships, growth_rate, _) in enumerate(planets_array.tolist())
+        ]
+        fleets = [Fleet(*record) for record in fleets_array.tolist()]
+        return PlanetWars(planets, fleets)
+
+    def get_map_str(self, map_id: Union[int, str]) -> str:
+        """
+        :param map_id: The map id (17 -> map17.txt) or the map name
+        :return: The map as a string in the map text format
+        """
+        return str(self.get_map(map_id))
+
+
+_libraries: Dict[str, MapLibrary] = {}
+
+
+def get_map_library(maps_dir: str = MAPS_DIR_PATH) -> MapLibrary:
+    """
+    Return the process wide library of the given maps directory. get_map rebuilds the library when the maps directory
+    changed - call refresh() before get_map_arrays to check for changes there too.
+    :param maps_dir: The directory with the map text files (defaults to the bundled maps)
+    """
+    key = os.path.abspath(maps_dir)
+    if key not in _libraries:
+        _libraries[key] = MapLibrary(maps_dir)
+    return _libraries[key]
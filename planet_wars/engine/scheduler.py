@@ -0,0 +1,118 @@
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import Player, PlanetWars
+
+
+class LockstepScheduler:
+    """
+    Runs many games together, turn by turn. In each turn the pending turns of every bot in all the running games
+    are collected and given to the bot in one Player.play_turns call - so bots can share work between the games.
+
+    Games are started as running games end, keeping at most max_concurrent_games running. A bot that receives state
+    deltas keeps a single game state, so a game with such a bot waits until the bot's other game has ended.
+    """
+
+    def __init__(self, max_concurrent_games: int = 32):
+        """
+        :param max_concurrent_games: How many games run together
+        """
+        assert max_concurrent_games >= 1, "max_concurrent_games must be at least 1"
+        self.max_concurrent_games = max_concurrent_games
+
+    def run(
+            self,
+            game_managers: List[GameManager],
+            on_game_end: Optional[Callable[[int, GameManager, str], None]] = None
+    ) -> List[str]:
+        """
+        Run the given games until they all end.
+        :param game_managers: The games to run
+        :param on_game_end: Called with (index of the game, the game manager, finish state) when a game ends
+        :return: The finish state of each game, in the order of the given games
+        """
+        pending = deque(enumerate(game_managers))
+        running: Dict[int, GameManager] = {}
+        finish_states: List[Optional[str]] = [None] * len(game_managers)
+
+        while pending or running:
+            self._start_games(pending, running)
+            orders = self._play_turn(running)
+            for game_index, game_manager in list(running.items()):
+                state = game_manager.finish_turn(orders[game_index, 1], orders[game_index, 2])
+                if state == GameManager.IN_GAME_STATE:
+                    continue
+                print(state)
+                finish_states[game_index] = state
+                del running[game_index]
+                if on_game_end is not None:
+                    on_game_end(game_index, game_manager, state)
+
+        return finish_states
+
+    def _start_games(self, pending: deque, running: Dict[int, GameManager]):
+        """
+        Move games from pending to running, up to max_concurrent_games
+        """
+        busy_delta_players = {
+            id(player) for game_manager in running.values() for player in (game_manager.player_1, game_manager.player_2)
+            if player.RECEIVES_STATE_DELTAS
+        }
+        waiting = deque()
+        while pending and len(running) < self.max_concurrent_games:
+            game_index, game_manager = pending.popleft()
+            delta_players = {
+                id(player) for player in (game_manager.player_1, game_manager.player_2) if player.RECEIVES_STATE_DELTAS
+            }
+            if delta_players & busy_delta_players:
+                waiting.append((game_index, game_manager))
+                continue
+            busy_delta_players |= delta_players
+            running[game_index] = game_manager
+        pending.extendleft(reversed(waiting))
+
+    @staticmethod
+    def _play_turn(running: Dict[int, GameManager]) -> Dict[Tuple[int, int], object]:
+        """
+        Get the orders of both players in all the running games, with one play_turns call per bot.
+        Each game records the bot's batch time divided by the number of games in the batch as the bot's turn time.
+        :return: (game index, player number) -> the orders, or False if the bot failed
+        """
+        orders = {}
+        # id(player) -> (player, [(game index, player number, game object)])
+        batches: Dict[int, Tuple[Player, List[Tuple[int, int, PlanetWars]]]] = {}
+        for game_index, game_manager in running.items():
+            for player_num in (1, 2):
+                player = game_manager.get_player(player_num)
+                game_object = game_manager.safely_start_bot_turn(
+                    player, game_manager.get_game_object_for_player(player_num),
+                    game_manager.get_turn_delta_for_player(player_num)
+                )
+                if game_object is False:
+                    orders[game_index, player_num] = False
+                    continue
+                batches.setdefault(id(player), (player, []))[1].append((game_index, player_num, game_object))
+
+        for player, turns in batches.values():
+            start = time.monotonic()
+            try:
+                turns_orders = player.play_turns([game_object for _, _, game_object in turns])
+                turns_orders = list(turns_orders)
+                if len(turns_orders) != len(turns):
+                    raise ValueError(f"play_turns returned {len(turns_orders)} results for {len(turns)} games")
+            except Exception:
+                # Play the games one by one, so the exception is raised (or the game is lost) in the game causing it
+                turns_orders = None
+
+            for i, (game_index, player_num, game_object) in enumerate(turns):
+                game_manager = running[game_index]
+                if turns_orders is None:
+                    orders[game_index, player_num] = game_manager.safely_play_turn(player, game_object)
+                else:
+                    orders[game_index, player_num] = game_manager.safely_check_orders(player, turns_orders[i])
+            turn_seconds = (time.monotonic() - start) / len(turns)
+            for game_index, player_num, _ in turns:
+                running[game_index].record_turn_time(player_num, turn_seconds)
+        return orders
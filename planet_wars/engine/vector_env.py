@@ -0,0 +1,342 @@
+"""
+Vectorized environment for reinforcement learning - steps many games together with numpy, by the rules of
+GameManager (the same results for the same orders), without Planet/Fleet/PlanetWars objects on the hot path.
+
+The state of all the games is kept in padded arrays - planets (num_envs, max_planets) and, instead of fleet records,
+the ships in flight as a ring buffer of arrivals (num_envs, arrival turns, max_planets, 2 owners): the rules only need
+the total ships each player lands on each planet in each turn, and the total ships in flight of each player. The ring
+buffer is indexed by the number of steps of the environment, the same in all the games, so the arrivals of the next
+turns are the same slots in all the games.
+
+Observations are from the agent's perspective (the agent is player 1 in its observations, like in play_turn - the
+owners are switched like switch_players_of_game_object when the agent plays player 2):
+    owners      (num_envs, max_planets) int8 - 0 neutral, 1 agent, 2 opponent
+    ships       (num_envs, max_planets) int32
+    growth      (num_envs, max_planets) int16
+    planet_mask (num_envs, max_planets) bool - False for padding planets
+    arrivals    (num_envs, max_planets, arrival_horizon, 2) int32 - the ships landing on each planet in
+                1..arrival_horizon turns, of the agent [..., 0] and of the opponent [..., 1]. Fleets landing later are
+                counted in the last turn (the same layout as self_play.features).
+    distances   (num_envs, max_planets, max_planets) int16
+    turn        (num_envs,) int32
+Actions are orders (num_envs, max_orders, 3) int - (source planet id, destination planet id, number of ships). Orders
+with number of ships <= 0 are ignored, like the illegal orders in a game.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.engine.map_library import get_map_library
+
+Observation = Dict[str, np.ndarray]
+# A vectorized bot - the orders of all the games (num_envs, max_orders, 3) given the observations from its perspective
+VectorPolicy = Callable[[Observation], np.ndarray]
+
+# Game states returned in info["outcome"]
+IN_GAME = 0
+AGENT_WINS = 1
+OPPONENT_WINS = 2
+TIE = 3
+
+
+def attack_weakest_planet_from_strongest_policy(observation: Observation) -> np.ndarray:
+    """
+    Vectorized AttackWeakestPlanetFromStrongestBot: when it has no fleet in flight, send half the ships of its
+    strongest planet to the weakest planet it doesn't own (the first one on ties, like min/max in the bot).
+    """
+    owners, ships, mask = observation["owners"], observation["ships"], observation["planet_mask"]
+    num_envs = len(owners)
+    mine = owners == 1
+    strongest = np.argmax(np.where(mine, ships, -1), axis=1)
+    weakest = np.argmin(np.where(~mine & mask, ships, np.iinfo(np.int32).max), axis=1)
+    env_indices = np.arange(num_envs)
+    can_play = (
+        mine.any(axis=1) & (~mine & mask).any(axis=1) & (observation["arrivals"][..., 0].sum(axis=(1, 2)) == 0)
+    )
+    orders = np.zeros((num_envs, 1, 3), dtype=np.int64)
+    orders[:, 0, 0] = strongest
+    orders[:, 0, 1] = weakest
+    orders[:, 0, 2] = np.where(can_play, ships[env_indices, strongest] // 2, 0)
+    return orders
+
+
+class _MapPool:
+    """
+    The maps of the environment as padded arrays
+    """
+
+    def __init__(self, map_ids: List[int]):
+        map_library = get_map_library()
+        map_library.refresh()
+        maps = [map_library.get_map_arrays(map_id) for map_id in map_ids]
+        self.max_planets = max(len(planets) for planets, _ in maps)
+        num_maps = len(maps)
+        self.owners = np.zeros((num_maps, self.max_planets), dtype=np.int8)
+        self.ships = np.zeros((num_maps, self.max_planets), dtype=np.int64)
+        self.growth = np.zeros((num_maps, self.max_planets), dtype=np.int64)
+        self.mask = np.zeros((num_maps, self.max_planets), dtype=bool)
+        self.distances = np.zeros((num_maps, self.max_planets, self.max_planets), dtype=np.int64)
+        for map_index, (planets, _) in enumerate(maps):
+            num_planets = len(planets)
+            self.owners[map_index, :num_planets] = planets["owner"]
+            self.ships[map_index, :num_planets] = planets["num_ships"]
+            self.growth[map_index, :num_planets] = planets["growth_rate"]
+            self.mask[map_index, :num_planets] = True
+            dx = planets["x"][:, None] - planets["x"][None, :]
+            dy = planets["y"][:, None] - planets["y"][None, :]
+            self.distances[map_index, :num_planets, :num_planets] = np.ceil(np.sqrt(dx * dx + dy * dy))
+        # A fleet launched now lands in at most max distance turns - one more slot so a slot is never reused early
+        max_fleet_turns = max([int(fleets["turns_remaining"].max()) for _, fleets in maps if len(fleets)] + [0])
+        self.ring_size = max(int(self.distances.max()), max_fleet_turns) + 1
+        self.arrivals = np.zeros((num_maps, self.ring_size, self.max_planets, 2), dtype=np.int64)
+        for map_index, (_, fleets) in enumerate(maps):
+            for fleet in fleets:
+                if fleet["turns_remaining"] > 0:
+                    self.arrivals[
+                        map_index, fleet["turns_remaining"] - 1, fleet["destination_planet_id"], fleet["owner"] - 1
+                    ] += fleet["num_ships"]
+
+
+class PlanetWarsVectorEnv:
+    """
+    num_envs Planet Wars games stepped together (see the module doc). The agent plays one side of each game and the
+    opponent policy (a vectorized bot, by default attack_weakest_planet_from_strongest_policy) plays the other.
+    When a game ends it is reset to a new game on a random map (auto-reset): step returns the first observation of
+    the new game, and the end of the old one in the reward, done and info.
+    """
+
+    MAX_TURNS = GameManager.MAX_TURNS
+
+    def __init__(
+            self,
+            num_envs: int,
+            map_ids: Optional[List[int]] = None,
+            max_orders: int = 8,
+            arrival_horizon: int = 16,
+            opponent_policy: VectorPolicy = attack_weakest_planet_from_strongest_policy,
+            agent_player: Optional[int] = None,
+            seed: Optional[int] = None
+    ):
+        """
+        :param num_envs: The number of games
+        :param map_ids: The maps of the games (from the map library), default all the maps
+        :param max_orders: The maximal number of orders of each player in a turn
+        :param arrival_horizon: The number of turns of the arrivals observation
+        :param opponent_policy: The bot of the opponent
+        :param agent_player: The side of the agent (1 or 2), None for a random side in each game
+        :param seed: Seed of the maps and sides choice
+        """
+        self.num_envs = num_envs
+        if map_ids is None:
+            map_ids = list(range(1, len(get_map_library()) + 1))
+        self.map_ids = np.array(map_ids)
+        self.maps = _MapPool(map_ids)
+        self.max_planets = self.maps.max_planets
+        self.arrival_horizon = arrival_horizon
+        self.max_orders = max_orders
+        self.opponent_policy = opponent_policy
+        self.fixed_agent_player = agent_player
+        self._rng = np.random.default_rng(seed)
+        self._env_indices = np.arange(num_envs)
+
+        # The state, from the perspective of player 1 of the game
+        self.map_index = np.zeros(num_envs, dtype=np.int64)
+        self.agent_player = np.ones(num_envs, dtype=np.int64)
+        self.owners = np.zeros((num_envs, self.max_planets), dtype=np.int8)
+        self.ships = np.zeros((num_envs, self.max_planets), dtype=np.int64)
+        # arrivals[env, step % ring_size, planet, owner - 1] - the ships landing in that step of the environment
+        self.arrivals = np.zeros((num_envs, self.maps.ring_size, self.max_planets, 2), dtype=np.int64)
+        # The total of arrivals over the steps
+        self.in_flight = np.zeros((num_envs, self.max_planets, 2), dtype=np.int64)
+        self.turn = np.zeros(num_envs, dtype=np.int64)
+        self._step_count = 0
+        # The parts of the observations that change only when a game is reset
+        self._growth = np.zeros((num_envs, self.max_planets), dtype=np.int16)
+        self._planet_mask = np.zeros((num_envs, self.max_planets), dtype=bool)
+        self._distances = np.zeros((num_envs, self.max_planets, self.max_planets), dtype=np.int16)
+        self._num_planets = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self) -> Observation:
+        """
+        Start new games in all the environments
+        :return: The observations
+        """
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._get_observation(self.agent_player)
+
+    def _reset_envs(self, envs: np.ndarray):
+        """
+        Start new games in the given environments (boolean mask)
+        """
+        count = int(envs.sum())
+        if count == 0:
+            return
+        map_index = self._rng.integers(len(self.map_ids), size=count)
+        self.map_index[envs] = map_index
+        if self.fixed_agent_player is None:
+            self.agent_player[envs] = self._rng.integers(1, 3, size=count)
+        else:
+            self.agent_player[envs] = self.fixed_agent_player
+        self.owners[envs] = self.maps.owners[map_index]
+        self.ships[envs] = self.maps.ships[map_index]
+        # The map's fleets land relative to the current step
+        arrivals = np.roll(self.maps.arrivals[map_index], self._step_count % self.maps.ring_size, axis=1)
+        self.arrivals[envs] = arrivals
+        self.in_flight[envs] = arrivals.sum(axis=1)
+        self.turn[envs] = 0
+        self._growth[envs] = self.maps.growth[map_index]
+        self._planet_mask[envs] = self.maps.mask[map_index]
+        self._distances[envs] = self.maps.distances[map_index]
+        self._num_planets[envs] = self.maps.mask[map_index].sum(axis=1)
+
+    def _get_observation(self, player: np.ndarray) -> Observation:
+        """
+        :param player: The perspective of each game (1 or 2)
+        """
+        switched = (player == 2)[:, None]
+        owners = np.where(switched & (self.owners != 0), 3 - self.owners, self.owners).astype(np.int8)
+        slots = (self._step_count + np.arange(self.arrival_horizon)) % self.maps.ring_size
+        arrivals = np.empty((self.num_envs, self.max_planets, self.arrival_horizon, 2), dtype=np.int32)
+        # Pick the owner column of each game's perspective while gathering (switching after is much slower)
+        for index, owner_column in enumerate((player - 1, 2 - player)):
+            owner_arrivals = self.arrivals[self._env_indices[:, None], slots[None, :], :, owner_column[:, None]]
+            # The last turn gets all the fleets landing from it on
+            owner_arrivals[:, -1] = (
+                self.in_flight[self._env_indices, :, owner_column] - owner_arrivals[:, :-1].sum(axis=1)
+            )
+            arrivals[..., index] = owner_arrivals.transpose(0, 2, 1)
+        # The parts that change only on reset are shared between the observations - don't change them
+        return {
+            "owners": owners,
+            "ships": self.ships.astype(np.int32),
+            "growth": self._growth,
+            "planet_mask": self._planet_mask,
+            "arrivals": arrivals,
+            "distances": self._distances,
+            "turn": self.turn.astype(np.int32)
+        }
+
+    def step(self, actions: np.ndarray) -> Tuple[Observation, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Play one turn in all the games
+        :param actions: The orders of the agent (num_envs, max_orders, 3)
+        :return: The observations, the rewards (1 when the agent wins, -1 when it loses, otherwise 0), done flags and
+                 info - "outcome" (see IN_GAME, AGENT_WINS...) and "turns" (the number of turns of the ended games)
+        """
+        opponent_player = 3 - self.agent_player
+        opponent_actions = self.opponent_policy(self._get_observation(opponent_player))
+        agent_orders, opponent_orders = self._to_orders(actions), self._to_orders(opponent_actions)
+        # execute the orders of player 1 and then of player 2, like GameManager.finish_turn
+        for player in (1, 2):
+            self._execute_orders(
+                np.where((self.agent_player == player)[:, None, None], agent_orders, opponent_orders), player
+            )
+        # advance the fleets (the ring buffer slot of the turn lands now), grow the population, land the fleets
+        self.ships += np.where(self.owners != 0, self._growth, 0)
+        self._arrival()
+        self.turn += 1
+        self._step_count += 1
+
+        outcome = self._check_endgame()
+        done = outcome != IN_GAME
+        rewards = np.where(outcome == AGENT_WINS, 1.0, np.where(outcome == OPPONENT_WINS, -1.0, 0.0))
+        info = {"outcome": outcome, "turns": np.where(done, self.turn, 0)}
+        self._reset_envs(done)
+        return self._get_observation(self.agent_player), rewards.astype(np.float32), done, info
+
+    def _to_orders(self, actions: np.ndarray) -> np.ndarray:
+        """
+        :return: The given orders padded (or cut) to (num_envs, max_orders, 3)
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, -1, 3)[:, :self.max_orders]
+        orders = np.zeros((self.num_envs, self.max_orders, 3), dtype=np.int64)
+        orders[:, :actions.shape[1]] = actions
+        return orders
+
+    def _execute_orders(self, orders: np.ndarray, player: int):
+        """
+        Execute the orders of the given player, in order - each order is checked against the ships left after the
+        orders before it (see Order.get_rejection_reason)
+        :param orders: (num_envs, max_orders, 3), zero ships for no order
+        """
+        for order_index in range(orders.shape[1]):
+            source, destination, num_ships = orders[:, order_index].T
+            if not (num_ships > 0).any():
+                continue
+            legal = (
+                (num_ships > 0) & (source >= 0) & (source < self._num_planets) & (destination >= 0) &
+                (destination < self._num_planets) & (source != destination)
+            )
+            source = np.where(legal, source, 0)
+            destination = np.where(legal, destination, 0)
+            legal &= (self.owners[self._env_indices, source] == player)
+            legal &= self.ships[self._env_indices, source] >= num_ships
+            envs = self._env_indices[legal]
+            if len(envs) == 0:
+                continue
+            source, destination, num_ships = source[legal], destination[legal], num_ships[legal]
+            self.ships[envs, source] -= num_ships
+            distance = self.maps.distances[self.map_index[envs], source, destination]
+            # A fleet launched with distance d lands d - 1 steps from now (it advances in its first turn).
+            # A fleet with distance 0 never lands, like in the engine.
+            flying = distance > 0
+            envs, destination, num_ships = envs[flying], destination[flying], num_ships[flying]
+            landing_slot = (self._step_count + distance[flying] - 1) % self.maps.ring_size
+            np.add.at(self.arrivals, (envs, landing_slot, destination, player - 1), num_ships)
+            np.add.at(self.in_flight, (envs, destination, player - 1), num_ships)
+
+    def _arrival(self):
+        """
+        Land the fleets of this turn, see GameManager.arrival
+        """
+        slot = self._step_count % self.maps.ring_size
+        landing = self.arrivals[:, slot].copy()  # (env, planet, 2)
+        self.arrivals[:, slot] = 0
+        self.in_flight -= landing
+        has_battle = landing.sum(axis=2) > 0
+        if not has_battle.any():
+            return
+
+        forces = np.zeros(landing.shape[:2] + (3,), dtype=np.int64)
+        forces[:, :, 1:] = landing
+        np.put_along_axis(
+            forces, self.owners[:, :, None].astype(np.int64),
+            np.take_along_axis(forces, self.owners[:, :, None].astype(np.int64), axis=2) + self.ships[:, :, None],
+            axis=2
+        )
+        largest, smallest = forces.max(axis=2), forces.min(axis=2)
+        second_largest = forces.sum(axis=2) - largest - smallest
+        tie = largest == second_largest
+        new_owners = np.argmax(forces, axis=2).astype(np.int8)
+        # in a tie the owner keeps the planet with zero ships, otherwise the largest force takes it with the difference
+        self.owners = np.where(has_battle & ~tie, new_owners, self.owners)
+        self.ships = np.where(has_battle, np.where(tie, 0, largest - second_largest), self.ships)
+
+    def _get_scores(self) -> np.ndarray:
+        """
+        :return: (num_envs, 2) the total ships of player 1 and player 2, on planets and in flight
+        """
+        in_flight = self.in_flight.sum(axis=1)
+        return np.stack([
+            np.where(self.owners == player, self.ships, 0).sum(axis=1) + in_flight[:, player - 1]
+            for player in (1, 2)
+        ], axis=1)
+
+    def _check_endgame(self) -> np.ndarray:
+        """
+        :return: The outcome of each game from the agent's perspective, see GameManager.check_endgame_conditions
+        """
+        scores = self._get_scores()
+        player_1_ships, player_2_ships = scores[:, 0], scores[:, 1]
+        winner = np.full(self.num_envs, -1)  # -1 in game, 0 tie
+        ended = (player_1_ships == 0) | (player_2_ships == 0) | (self.turn >= self.MAX_TURNS)
+        winner = np.where(ended & (player_1_ships > player_2_ships), 1, winner)
+        winner = np.where(ended & (player_1_ships < player_2_ships), 2, winner)
+        winner = np.where(ended & (player_1_ships == player_2_ships), 0, winner)
+        return np.select(
+            [winner == -1, winner == 0, winner == self.agent_player],
+            [IN_GAME, TIE, AGENT_WINS],
+            OPPONENT_WINS
+        )
@@ -0,0 +1,264 @@
+from typing import Iterable, Optional
+
+import numpy as np
+
+# Map owner -> owner seen by the other player (0 stays 0, 1 <-> 2)
+_SWITCH_OWNERS = np.array([0, 2, 1])
+
+
+class _ForecastState:
+    """
+    The arrays of a forecast, shared between the forecast views of both players.
+    """
+
+    def __init__(self, owners: np.ndarray, ships: np.ndarray, growth: np.ndarray, arrivals: np.ndarray):
+        self.owners = owners  # (turns + 1, planets) planets owner after t turns
+        self.ships = ships  # (turns + 1, planets) number of ships in the planet after t turns
+        self.growth = growth  # (planets,) planets growth rate
+        self.arrivals = arrivals  # (turns + 1, planets, 3) ships of each owner arriving to the planet in turn t
+        self.shared = False  # True if more than one Forecast object uses this state
+
+    def share(self):
+        """
+        Mark the state as used by more than one Forecast object - its arrays become read-only, and changing the
+        forecast copies the state first (see Forecast._own_state)
+        """
+        self.shared = True
+        for array in (self.owners, self.ships, self.arrivals):
+            array.flags.writeable = False
+
+    @property
+    def turns(self) -> int:
+        return len(self.owners) - 1
+
+    def copy(self) -> "_ForecastState":
+        return _ForecastState(self.owners.copy(), self.ships.copy(), self.growth, self.arrivals.copy())
+
+    def simulate(self, from_turn: int = 1, columns: Optional[np.ndarray] = None):
+        """
+        Recompute rows from_turn..turns of the given planets columns (all the planets if None) from the row before,
+        with the same rules as GameManager.population_growth and GameManager.arrival.
+        """
+        columns = np.arange(self.owners.shape[1]) if columns is None else np.asarray(columns)
+        growth = self.growth[columns]
+        owners = self.owners[from_turn - 1, columns]
+        ships = self.ships[from_turn - 1, columns]
+        rows = np.arange(len(columns))
+        for t in range(from_turn, self.turns + 1):
+            # population growth
+            ships = ships + np.where(owners != 0, growth, 0)
+
+            # arrival - the biggest force wins, in a tie the owner stays with zero ships
+            arrivals = self.arrivals[t, columns]
+            fights = arrivals.any(axis=1)
+            if fights.any():
+                forces = arrivals.copy()
+                forces[rows, owners] += ships
+                sorted_forces = np.sort(forces, axis=1)
+                largest, second_largest = sorted_forces[:, 2], sorted_forces[:, 1]
+                tie = largest == second_largest
+                owners = np.where(fights & ~tie, forces.argmax(axis=1), owners)
+                ships = np.where(fights, np.where(tie, 0, largest - second_largest), ships)
+
+            self.owners[t, columns] = owners
+            self.ships[t, columns] = ships
+
+    def extend(self, turns: int):
+        """
+        Add rows to the forecast so it covers the given number of turns
+        """
+        extra = turns - self.turns
+        if extra <= 0:
+            return
+        old_turns = self.turns
+        self.owners = np.concatenate([self.owners, np.zeros((extra, self.owners.shape[1]), dtype=np.int64)])
+        self.ships = np.concatenate([self.ships, np.zeros((extra, self.ships.shape[1]), dtype=np.int64)])
+        self.arrivals = np.concatenate(
+            [self.arrivals, np.zeros((extra,) + self.arrivals.shape[1:], dtype=np.int64)]
+        )
+        self.simulate(from_turn=old_turns + 1)
+
+
+class Forecast:
+    """
+    Forecast of each planet owner and number of ships in the coming turns, given the fleets in flight and assuming
+    no new fleets are sent. Uses the exact growth and battle rules of the engine.
+
+    forecast.owners[t, planet_id] - the owner of the planet after t turns (t=0 is the current state)
+    forecast.ships[t, planet_id] - the number of ships in the planet after t turns
+
+    Get it with PlanetWars.get_forecast(). The engine computes it once per turn and both players get views of the
+    same forecast (each from its own perspective). The arrays of a shared forecast are read-only - add_fleet,
+    add_order and extend copy the forecast before changing it, so they never change the forecast of the other player.
+    """
+
+    DEFAULT_TURNS = 40
+
+    def __init__(self, state: _ForecastState, switched: bool = False):
+        """
+        Don't create directly - use Forecast.from_arrays or PlanetWars.get_forecast
+        """
+        self._state = state
+        self._switched = switched
+
+    @staticmethod
+    def from_arrays(planets: np.ndarray, fleets: np.ndarray, turns: Optional[int] = None) -> "Forecast":
+        """
+        :param planets: The planets array (see PlanetWars.get_planets_array). Planet ids must be 0..len(planets)-1.
+        :param fleets: The fleets array (see PlanetWars.get_fleets_array)
+        :param turns: How many turns to forecast. Default is DEFAULT_TURNS or more to cover all the fleets in flight.
+        """
+        if turns is None:
+            turns = Forecast.DEFAULT_TURNS
+            if len(fleets) > 0:
+                turns = max(turns, int(fleets["turns_remaining"].max()))
+        num_planets = len(planets)
+        owners = np.zeros((turns + 1, num_planets), dtype=np.int64)
+        ships = np.zeros((turns + 1, num_planets), dtype=np.int64)
+        owners[0] = planets["owner"]
+        ships[0] = planets["num_ships"]
+        arrivals = np.zeros((turns + 1, num_planets, 3), dtype=np.int64)
+        in_range = (fleets["turns_remaining"] >= 1) & (fleets["turns_remaining"] <= turns)
+        np.add.at(
+            arrivals,
+            (fleets["turns_remaining"][in_range], fleets["destination_planet_id"][in_range], fleets["owner"][in_range]),
+            fleets["num_ships"][in_range]
+        )
+        state = _ForecastState(owners, ships, planets["growth_rate"].astype(np.int64), arrivals)
+        state.simulate()
+        return Forecast(state)
+
+    @property
+    def turns(self) -> int:
+        """
+        :return: The number of turns forecasted (owners and ships have turns + 1 rows)
+        """
+        return self._state.turns
+
+    @property
+    def owners(self) -> np.ndarray:
+        owners = self._state.owners
+        return _SWITCH_OWNERS[owners] if self._switched else owners
+
+    @property
+    def ships(self) -> np.ndarray:
+        return self._state.ships
+
+    def get_forces(self, turns: np.ndarray, planet_ids: np.ndarray) -> np.ndarray:
+        """
+        The forces fighting in planets in given turns, before the battle (see GameManager.arrival) - the ships of the
+        planet's owner after the growth, plus the ships of the fleets of each owner arriving in that turn.
+        :param turns: Turns in 1..turns (broadcast with planet_ids)
+        :param planet_ids: The planets
+        :return: (..., 3) the forces of owner 0, 1 and 2 (from the perspective of this forecast)
+        """
+        state = self._state
+        turns, planet_ids = np.broadcast_arrays(np.asarray(turns), np.asarray(planet_ids))
+        owners = state.owners[turns - 1, planet_ids][..., None]
+        ships = state.ships[turns - 1, planet_ids] + np.where(owners[..., 0] != 0, state.growth[planet_ids], 0)
+        forces = state.arrivals[turns, planet_ids]
+        np.put_along_axis(forces, owners, np.take_along_axis(forces, owners, axis=-1) + ships[..., None], axis=-1)
+        return forces[..., _SWITCH_OWNERS] if self._switched else forces
+
+    def view(self, switched: bool = False) -> "Forecast":
+        """
+        :param switched: If True the view is from the other player's perspective (owners 1 and 2 switched)
+        :return: A new view of the same forecast (changing a view copies the forecast first)
+        """
+        self._state.share()
+        return Forecast(self._state, self._switched != switched)
+
+    def switched(self) -> "Forecast":
+        """
+        :return: A view of the same forecast from the other player's perspective (owners 1 and 2 switched)
+        """
+        return self.view(switched=True)
+
+    def copy(self) -> "Forecast":
+        """
+        :return: Independent copy of this forecast
+        """
+        return Forecast(self._state.copy(), self._switched)
+
+    def extend(self, turns: int) -> "Forecast":
+        """
+        Make sure the forecast covers at least the given number of turns
+        :return: self
+        """
+        if turns > self.turns:
+            self._own_state()
+            self._state.extend(turns)
+        return self
+
+    def _own_state(self):
+        """
+        Copy the state before changing it, if it is shared with other forecast views
+        """
+        if self._state.shared:
+            self._state = self._state.copy()
+
+    def add_fleet(self, owner: int, destination_planet_id: int, num_ships: int, turns_remaining: int):
+        """
+        Update the forecast with a new fleet. Only the destination planet is recomputed.
+        :param owner: The fleet owner (from the perspective of this forecast)
+        """
+        if turns_remaining < 1:
+            return
+        self._own_state()
+        self._state.extend(turns_remaining)
+        real_owner = int(_SWITCH_OWNERS[owner]) if self._switched else owner
+        self._state.arrivals[turns_remaining, destination_planet_id, real_owner] += num_ships
+        self._state.simulate(from_turn=turns_remaining, columns=[destination_planet_id])
+
+    def add_order(
+            self, source_planet_id: int, destination_planet_id: int, num_ships: int, trip_length: int, owner: int = 1
+    ):
+        """
+        Update the forecast with an order sent this turn: the ships leave the source planet now and arrive to the
+        destination planet after trip_length turns. Only the source and destination planets are recomputed.
+        :param trip_length: The distance between the planets (see Planet.distance_between_planets)
+        :param owner: The player sending the order (from the perspective of this forecast)
+        """
+        self._own_state()
+        self._state.ships[0, source_planet_id] -= num_ships
+        self._state.simulate(from_turn=1, columns=[source_planet_id])
+        self.add_fleet(owner, destination_planet_id, num_ships, trip_length)
+
+    def next_turn(self) -> "Forecast":
+        """
+        :return: The forecast one turn from now, assuming no new fleets are sent - the rows of this forecast shifted
+                 by one turn, plus one new row at the end.
+        """
+        state = self._state
+        next_state = _ForecastState(
+            owners=np.concatenate([state.owners[1:], state.owners[-1:]]),
+            ships=np.concatenate([state.ships[1:], state.ships[-1:]]),
+            growth=state.growth,
+            arrivals=np.concatenate([state.arrivals[1:], np.zeros_like(state.arrivals[-1:])])
+        )
+        next_state.arrivals[0] = 0
+        next_state.simulate(from_turn=next_state.turns)
+        return Forecast(next_state, self._switched)
+
+    def update_planets(self, planets: np.ndarray, planet_ids: Iterable[int], new_fleets: Iterable = ()):
+        """
+        Update the forecast for planets whose state is different than forecasted (because of orders sent).
+        Used by the engine - owners here are the engine owners, not switched.
+        :param planets: The current planets array
+        :param planet_ids: The planets to set the current state of, and recompute
+        :param new_fleets: (owner, destination_planet_id, num_ships, turns_remaining) of fleets that are not in the
+                           forecast yet. Their destinations should be in planet_ids.
+        """
+        self._own_state()
+        state = self._state
+        columns = np.array(sorted(set(planet_ids)), dtype=np.int64)
+        if len(columns) == 0:
+            return
+        for owner, destination_planet_id, num_ships, turns_remaining in new_fleets:
+            if turns_remaining < 1:
+                continue
+            state.extend(turns_remaining)
+            state.arrivals[turns_remaining, destination_planet_id, owner] += num_ships
+        state.owners[0, columns] = planets["owner"][columns]
+        state.ships[0, columns] = planets["num_ships"][columns]
+        state.simulate(from_turn=1, columns=columns)
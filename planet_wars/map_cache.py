@@ -0,0 +1,107 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+
+def get_map_signature(planets: np.ndarray) -> str:
+    """
+    :param planets: The planets array of a game (see PlanetWars.get_planets_array)
+    :return: Signature of the map - the planets locations and growth rates, which never change during a game. The
+             same map has the same signature in every game, every turn and every process.
+    """
+    static_columns = np.stack([
+        planets["x"].astype(np.float64), planets["y"].astype(np.float64), planets["growth_rate"].astype(np.float64)
+    ])
+    return hashlib.blake2b(np.ascontiguousarray(static_columns).tobytes(), digest_size=16).hexdigest()
+
+
+class MapCache:
+    """
+    Size bounded cache of static analysis per map (distance matrices, neighbour rankings, etc.) - so a bot computes
+    its analysis of a map once per process and reuses it in all the battles on that map.
+    Keeps the entries of the max_maps most recently used maps, less recently used maps are evicted.
+
+    Bots use it through PlanetWars.get_map_cache(), which gives a MapCacheView of the game's map.
+    """
+
+    def __init__(self, max_maps: int = 64):
+        """
+        :param max_maps: The maximal number of maps to keep entries for
+        """
+        assert max_maps >= 1, "max_maps must be at least 1"
+        self.max_maps = max_maps
+        # map signature -> {key: value}, the most recently used map last
+        self._maps: "OrderedDict[str, dict]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._maps)
+
+    def get_map_entries(self, map_signature: str) -> dict:
+        """
+        :return: The entries of the given map (created empty if needed). Marks the map as the most recently used.
+        """
+        entries = self._maps.get(map_signature)
+        if entries is None:
+            entries = self._maps[map_signature] = {}
+            while len(self._maps) > self.max_maps:
+                self._maps.popitem(last=False)
+        else:
+            self._maps.move_to_end(map_signature)
+        return entries
+
+    def view(self, map_signature: str) -> "MapCacheView":
+        """
+        :return: The cache of the given map
+        """
+        return MapCacheView(self, map_signature)
+
+    def clear(self):
+        self._maps.clear()
+
+
+class MapCacheView:
+    """
+    The entries of one map in a MapCache, for example:
+        distances = game.get_map_cache().get_or_compute("distances", lambda: compute_distances(game))
+
+    The map signature covers only what never changes in a game (planets locations and growth rates), so the same
+    entries are given to both players. Include the perspective in the key of analysis that depends on the owners, for
+    example ("frontline", my_first_planet_id).
+    """
+
+    def __init__(self, cache: MapCache, map_signature: str):
+        self.cache = cache
+        self.map_signature = map_signature
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        return self.cache.get_map_entries(self.map_signature).get(key, default)
+
+    def put(self, key: Hashable, value: Any):
+        self.cache.get_map_entries(self.map_signature)[key] = value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.cache.get_map_entries(self.map_signature)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        :return: The cached value of the key, computed with compute() if it isn't in the cache
+        """
+        entries = self.cache.get_map_entries(self.map_signature)
+        if key not in entries:
+            entries[key] = compute()
+        return entries[key]
+
+
+_map_cache: Optional[MapCache] = None
+
+
+def get_map_cache() -> MapCache:
+    """
+    :return: The MapCache of this process
+    """
+    global _map_cache
+    if _map_cache is None:
+        _map_cache = MapCache()
+    return _map_cache
@@ -1,11 +1,30 @@
 from abc import abstractmethod
 from collections import defaultdict
+from dataclasses import dataclass
 from math import ceil, sqrt
 from sys import stdout
-from typing import Union, Iterable, List
+import numbers
+import time
+from typing import Union, Iterable, List, Optional, Dict, Tuple
 
+import numpy as np
 import pandas as pd
 
+from planet_wars.forecast import Forecast
+from planet_wars.map_cache import MapCacheView, get_map_cache, get_map_signature
+from planet_wars.state_hash import state_hash
+from planet_wars.turn_timing import HeadroomStats, get_headroom_stats
+from planet_wars.spatial_index import GridIndex
+
+PLANET_DTYPE = np.dtype([
+    ("planet_id", np.int64), ("owner", np.int64), ("num_ships", np.int64), ("growth_rate", np.int64),
+    ("x", np.float64), ("y", np.float64)
+])
+FLEET_DTYPE = np.dtype([
+    ("owner", np.int64), ("num_ships", np.int64), ("source_planet_id", np.int64), ("destination_planet_id", np.int64),
+    ("total_trip_length", np.int64), ("turns_remaining", np.int64)
+])
+
 
 def list_to_data_frame(lst: List, columns: List[str]):
     """
@@ -25,6 +44,30 @@ def list_to_data_frame(lst: List, columns: List[str]):
     return pd.DataFrame(data)
 
 
+def planets_to_array(planets: List["Planet"]) -> np.ndarray:
+    """
+    :return: The given planets as numpy structured array of PLANET_DTYPE (built in a single pass over the planets)
+    """
+    return np.fromiter(
+        ((p.planet_id, p.owner, p.num_ships, p.growth_rate, p.x, p.y) for p in planets),
+        dtype=PLANET_DTYPE, count=len(planets)
+    )
+
+
+def fleets_to_array(fleets: List["Fleet"]) -> np.ndarray:
+    """
+    :return: The given fleets as numpy structured array of FLEET_DTYPE (built in a single pass over the fleets)
+    """
+    return np.fromiter(
+        (
+            (f.owner, f.num_ships, f.source_planet_id, f.destination_planet_id, f.total_trip_length,
+             f.turns_remaining)
+            for f in fleets
+        ),
+        dtype=FLEET_DTYPE, count=len(fleets)
+    )
+
+
 class Fleet:
     def __init__(
             self, owner: int, num_ships: int, source_planet_id: int, destination_planet_id: int,
@@ -75,6 +118,59 @@ class Planet:
         return int(ceil(sqrt(dx * dx + dy * dy)))
 
 
+def _switch_owner(owner: int) -> int:
+    return {1: 2, 2: 1}.get(owner, owner)
+
+
+@dataclass
+class Battle:
+    """
+    A battle that happened in a planet when fleets arrived to it
+    """
+    planet_id: int
+    forces: Dict[int, int]  # owner -> number of ships that fought (planet population + arriving fleets)
+    owner: int  # The owner of the planet after the battle
+    num_ships: int  # The number of ships in the planet after the battle
+
+
+@dataclass
+class TurnDelta:
+    """
+    The changes in the game in one turn, see IncrementalPlayer
+    """
+    turn: int  # The turn number after the changes
+    changed_planets: List[Tuple[int, int, int]]  # (planet_id, owner, num_ships) of planets whose owner/ships changed
+    launched_fleets: List["Fleet"]  # The fleets launched in the turn (by both players), as they are after the turn
+    landed_fleets: List["Fleet"]  # The fleets that arrived to their destination in the turn
+    battles: List[Battle]  # The battles that happened in the turn
+
+    def switched(self) -> "TurnDelta":
+        """
+        :return: The same delta from the perspective of the other player (players 1 and 2 switched)
+        """
+        def switched_fleet(f: "Fleet") -> "Fleet":
+            return Fleet(
+                _switch_owner(f.owner), f.num_ships, f.source_planet_id, f.destination_planet_id,
+                f.total_trip_length, f.turns_remaining
+            )
+
+        return TurnDelta(
+            turn=self.turn,
+            changed_planets=[
+                (planet_id, _switch_owner(owner), num_ships) for planet_id, owner, num_ships in self.changed_planets
+            ],
+            launched_fleets=[switched_fleet(f) for f in self.launched_fleets],
+            landed_fleets=[switched_fleet(f) for f in self.landed_fleets],
+            battles=[
+                Battle(
+                    b.planet_id, {_switch_owner(owner): size for owner, size in b.forces.items()},
+                    _switch_owner(b.owner), b.num_ships
+                )
+                for b in self.battles
+            ]
+        )
+
+
 class PlanetWars:
     """
     The main object of the game -
@@ -94,6 +190,20 @@ class PlanetWars:
         self.planets = planets
         self.fleets = fleets
         self.turns = 0
+        # time.monotonic() by which the bot should return its orders - set by the engine when the game has a turn
+        # time limit (see GameManager turn_time_limit), None if there is no limit. See get_time_left.
+        self.deadline: Optional[float] = None
+        self._spatial_index = None
+        self._map_signature = None
+        self._arrays_turn = None
+        self._planets_array = None
+        self._fleets_array = None
+        self._forecast = None
+        # Set by the engine - a function returning the forecast of the turn, and if it should be switched to the
+        # perspective of player 2
+        self._forecast_provider = None
+        self._forecast_switched = False
+        self._state_hash = None
 
     def get_planets_by_owner(self, owner):
         """
@@ -108,6 +218,87 @@ class PlanetWars:
             if p.planet_id == planet_id:
                 return p
 
+    def get_spatial_index(self) -> GridIndex:
+        """
+        :return: Grid spatial index of the planets locations, point i is self.planets[i].
+                 Built on first use (the engine shares it between all the turns of a game).
+        """
+        if self._spatial_index is None or len(self._spatial_index) != len(self.planets):
+            self._spatial_index = GridIndex.from_points((p.x for p in self.planets), (p.y for p in self.planets))
+        return self._spatial_index
+
+    def get_map_signature(self) -> str:
+        """
+        :return: Signature of the map (see map_cache.get_map_signature), the same in all the games on this map
+        """
+        if self._map_signature is None:
+            self._map_signature = get_map_signature(self.get_planets_array())
+        return self._map_signature
+
+    def get_time_left(self) -> float:
+        """
+        :return: Seconds left until the turn deadline (negative if it passed), infinity if the turn has no deadline
+        """
+        if self.deadline is None:
+            return float("inf")
+        return self.deadline - time.monotonic()
+
+    def get_map_cache(self) -> MapCacheView:
+        """
+        Cache for your static analysis of the map, shared by all the games on this map in the process. For example in
+        new_game_has_started:
+            self.ranking = game.get_map_cache().get_or_compute("ranking", lambda: rank_planets(game))
+        computes the ranking only in the first battle on each map. See MapCacheView.
+        """
+        return get_map_cache().view(self.get_map_signature())
+
+    def get_distance_matrix(self) -> np.ndarray:
+        """
+        :return: Read only (planets, planets) array of the distances between the planets, the same as
+                 Planet.distance_between_planets - distances[source.planet_id, destination.planet_id].
+                 Computed once per map (see get_map_cache).
+        """
+        def compute_distance_matrix() -> np.ndarray:
+            planets = self.get_planets_array()
+            dx = planets["x"][:, None] - planets["x"][None, :]
+            dy = planets["y"][:, None] - planets["y"][None, :]
+            distances = np.ceil(np.sqrt(dx * dx + dy * dy)).astype(np.int64)
+            distances.flags.writeable = False
+            return distances
+
+        return self.get_map_cache().get_or_compute("distance_matrix", compute_distance_matrix)
+
+    def get_planets_within_radius(self, planet: Planet, radius: float, owner: Optional[int] = None) -> List[Planet]:
+        """
+        self.get_planets_within_radius(planet, 10, owner=PlanetWars.ENEMY) will return all the enemy's planets that
+        are at most 10 away from the given planet.
+        :param planet: The planet in the center of the search (it is not included in the result)
+        :param radius: The maximal distance from the given planet
+        :param owner: If given return only planets of this owner
+        """
+        return [
+            self.planets[i] for i in self.get_spatial_index().query_radius(planet.x, planet.y, radius)
+            if self.planets[i] is not planet and (owner is None or self.planets[i].owner == owner)
+        ]
+
+    def get_closest_planet(
+            self, planet: Planet, owner: Optional[int] = None, max_distance: Optional[float] = None
+    ) -> Optional[Planet]:
+        """
+        self.get_closest_planet(planet, owner=PlanetWars.NEUTRAL) will return the closest neutral planet to the given
+        planet.
+        :param planet: The planet to search from (it is never returned)
+        :param owner: If given return only a planet of this owner
+        :param max_distance: If given return only a planet at most this far from the given planet
+        :return: The closest planet, None if there is no planet matching the conditions
+        """
+        closest = self.get_spatial_index().nearest(
+            planet.x, planet.y,
+            accept=lambda i: self.planets[i] is not planet and (owner is None or self.planets[i].owner == owner),
+            max_radius=max_distance
+        )
+        return None if closest is None else self.planets[closest]
+
     def get_fleets_by_owner(self, owner):
         """
         self.get_fleets_by_owner(owner=PlanetWars.ME) will return all your fleets
@@ -126,24 +317,117 @@ class PlanetWars:
                 sum(f.num_ships for f in self.get_fleets_by_owner(owner))
         )
 
-    def get_planets_data_frame(self):
+    def get_planets_array(self) -> np.ndarray:
+        """
+        All the planets in the map as read only numpy structured array (see PLANET_DTYPE), for example:
+            planets = game.get_planets_array()
+            my_ships = planets["num_ships"][planets["owner"] == PlanetWars.ME].sum()
+        The array is built once per turn and shared by all the calls in the turn. If you change the Planet objects
+        and want the array to reflect the changes call invalidate_arrays().
+        """
+        self._validate_arrays()
+        if self._planets_array is None:
+            self._planets_array = planets_to_array(self.planets)
+            self._planets_array.flags.writeable = False
+        return self._planets_array
+
+    def get_fleets_array(self) -> np.ndarray:
+        """
+        All the fleets in the map as read only numpy structured array (see FLEET_DTYPE).
+        See get_planets_array for when the array is built.
         """
-        :return: All the planets in the map as data frame
+        self._validate_arrays()
+        if self._fleets_array is None:
+            self._fleets_array = fleets_to_array(self.fleets)
+            self._fleets_array.flags.writeable = False
+        return self._fleets_array
+
+    def _validate_arrays(self):
+        if self._arrays_turn != self.turns:
+            self.invalidate_arrays()
+            self._arrays_turn = self.turns
+
+    def invalidate_arrays(self):
         """
-        return list_to_data_frame(
-            lst=self.planets, columns=["planet_id", "owner", "num_ships", "growth_rate", "x", "y"]
+        Drop the arrays of get_planets_array/get_fleets_array so the next call builds them from the current planets
+        and fleets.
+        """
+        self._planets_array = None
+        self._fleets_array = None
+        self._forecast = None
+        self._state_hash = None
+
+    def get_forecast(self, turns: Optional[int] = None) -> Forecast:
+        """
+        Forecast of who will own each planet, and with how many ships, in the next turns - given the fleets in flight
+        and assuming no new fleets are sent. For example:
+            forecast = game.get_forecast()
+            forecast.owners[10, planet.planet_id]  # who will own the planet in 10 turns
+            forecast.ships[10, planet.planet_id]  # and with how many ships
+        See Forecast doc. Use forecast.add_order to see how sending a fleet changes the forecast.
+        In a game the engine computes the forecast once per turn for both players.
+
+        :param turns: The minimal number of turns to forecast. Default covers all the fleets in flight.
+        """
+        self._validate_arrays()
+        if self._forecast is None:
+            if self._forecast_provider is not None:
+                self._forecast = self._forecast_provider().view(switched=self._forecast_switched)
+            else:
+                self._forecast = Forecast.from_arrays(self.get_planets_array(), self.get_fleets_array(), turns)
+        if turns is not None and turns > self._forecast.turns:
+            self._forecast = self._forecast.copy().extend(turns)
+        return self._forecast
+
+    def get_state_hash(self) -> int:
+        """
+        64 bit hash of the game state - the turn, the planets owners and ships and the fleets in flight (see
+        state_hash). Equal states have equal hashes, so search bots can use it to detect move orders that reach the same
+        state and as the key of a TranspositionTable.
+        Computed from the arrays once per turn (and after invalidate_arrays). The engine keeps the hash of its own
+        game up to date incrementally, see GameManager.get_state_hash.
+        """
+        self._validate_arrays()
+        if self._state_hash is None:
+            self._state_hash = state_hash(self.get_planets_array(), self.get_fleets_array(), self.turns)
+        return self._state_hash
+
+    def apply_delta(self, delta: TurnDelta):
+        """
+        Update this game object to the next turn given the turn changes:
+        advance the fleets in flight, remove the fleets that arrived, add the launched fleets and update the changed
+        planets.
+        :param delta: The changes in the turn (from this game object perspective)
+        """
+        for f in self.fleets:
+            f.turns_remaining -= 1
+        self.fleets = [f for f in self.fleets if f.turns_remaining > 0]
+        self.fleets.extend(
+            Fleet(f.owner, f.num_ships, f.source_planet_id, f.destination_planet_id, f.total_trip_length,
+                  f.turns_remaining)
+            for f in delta.launched_fleets if f.turns_remaining > 0
         )
+        for planet_id, owner, num_ships in delta.changed_planets:
+            planet = self.planets[planet_id]
+            planet.owner = owner
+            planet.num_ships = num_ships
+        self.turns = delta.turn
+
+    def get_planets_data_frame(self):
+        """
+        :return: All the planets in the map as data frame, built from get_planets_array. The arrays are rebuilt first
+                 (see invalidate_arrays), so changes to the Planet objects are in both the data frame and the array.
+        """
+        self.invalidate_arrays()
+        return pd.DataFrame(self.get_planets_array())
 
     def get_fleets_data_frame(self):
         """
-        :return: All the fleets in the map as data frame
+        :return: All the fleets in the map as data frame, built from get_fleets_array (rebuilt first, like in
+                 get_planets_data_frame).
         """
-        return list_to_data_frame(
-            lst=self.fleets,
-            columns=[
-                "owner", "num_ships", "source_planet_id", "destination_planet_id", "total_trip_length", "turns_remaining"
-            ]
-        )
+        self.invalidate_arrays()
+        return pd.DataFrame(self.get_fleets_array())
 
     def __str__(self):
         planets_str = "\n".join(f"P {p.x} {p.y} {p.owner} {p.num_ships} {p.growth_rate}" for p in self.planets)
@@ -203,6 +487,16 @@ class Order:
     Order to send fleet of 'num_ships' ships from source_planet to destination_planet.
     """
 
+    # Why the engine rejected an order (see get_rejection_reason)
+    MISSING_PLANET_ID = "missing planet id"
+    UNKNOWN_SOURCE_PLANET = "unknown source planet"
+    UNKNOWN_DESTINATION_PLANET = "unknown destination planet"
+    SAME_PLANET = "source and destination are the same planet"
+    NOT_OWNER = "source planet not owned by the player"
+    NOT_ENOUGH_SHIPS = "not enough ships in the source planet"
+    NON_POSITIVE_SHIPS = "number of ships is not positive"
+    NON_INTEGER_SHIPS = "number of ships is not a whole number"
+
     def __init__(self, source_planet: Union[Planet, int], destination_planet: Union[Planet, int], num_ships: int):
         """
         :param source_planet: The planet to send the ships from. You must own this planet.
@@ -231,29 +525,40 @@ class Order:
         Order is legal if:
         1. The source planet exists and owned by the player issued the order
         2. The destination planet exists and different from the source planet
-        3. The source planet have enough ships to support the order
-        4. The source planet is not neutral
+        3. The number of ships is a whole number (like 3 or 3.0), and positive
+        4. The source planet have enough ships to support the order
+        5. The source planet is not neutral
 
         :param game: The PlanetWars object representing the map
         :param player: The player sending the order. Can be 1 or 2.
         :return:
         """
+        return self.get_rejection_reason(game, player) is None
+
+    def get_rejection_reason(self, game: PlanetWars, player: int = 1) -> Optional[str]:
+        """
+        See verify_order.
+        :return: Why the order is illegal (one of the reasons defined in Order, like Order.NOT_ENOUGH_SHIPS), or None
+                 if it is legal
+        """
         if self.source_planet_id is None or self.destination_planet_id is None:
-            return False
+            return self.MISSING_PLANET_ID
         source_planet = game.get_planet_by_id(self.source_planet_id)
         if source_planet is None:
-            return False
+            return self.UNKNOWN_SOURCE_PLANET
         if game.get_planet_by_id(self.destination_planet_id) is None:
-            return False
+            return self.UNKNOWN_DESTINATION_PLANET
         if self.source_planet_id == self.destination_planet_id:
-            return False
+            return self.SAME_PLANET
         if source_planet.owner != player or source_planet.owner == 0:
-            return False
+            return self.NOT_OWNER
+        if not isinstance(self.num_ships, numbers.Real) or not float(self.num_ships).is_integer():
+            return self.NON_INTEGER_SHIPS
         if source_planet.num_ships < self.num_ships:
-            return False
+            return self.NOT_ENOUGH_SHIPS
         if self.num_ships <= 0:
-            return False
-        return True
+            return self.NON_POSITIVE_SHIPS
+        return None
 
 
 class Player:
@@ -265,6 +570,9 @@ class Player:
     """
 
     NAME = "Give The Player Name Here"
+    # If True the engine gives the bot the initial state once and then only the changes of each turn,
+    # see IncrementalPlayer
+    RECEIVES_STATE_DELTAS = False
 
     @abstractmethod
     def play_turn(self, game: PlanetWars) -> Iterable[Order]:
@@ -277,14 +585,164 @@ class Player:
         :param game: PlanetWars object representing the map
         :return: List of orders - fleet to send in this turns.
         """
-        raise NotImplemented("Here is where the fun happens - implement here your bot")
+        raise NotImplementedError("Here is where the fun happens - implement here your bot")
+
+    def play_turns(self, games: List[PlanetWars]) -> List[Iterable[Order]]:
+        """
+        Play the current turn of several games at once.
+        When many games run together (see Tournament concurrent_games) the engine gives the bot all its pending turns
+        in one call. Override it if your bot can share work between the games - for example score all the games in
+        one vectorized computation. By default calls play_turn for each game.
+
+        Note: with concurrent games the same bot object plays several games at the same time, so don't keep per-game
+        state in the bot object (bots that receive state deltas never play two games at the same time).
+
+        :param games: The PlanetWars objects of the games, from your perspective (like in play_turn)
+        :return: The orders of each game, in the order of the given games
+        """
+        return [self.play_turn(game) for game in games]
 
     def new_game_has_started(self, game: PlanetWars):
         """
         This function will be called at the beginning of each game.
         Here is the place to restart the game state.
         for example if you count the number of ships you sent in fleets here is the place to set this counter back to 0
+        It is also the place for static analysis of the map - use game.get_map_cache() to compute it only once for
+        all the battles on the same map.
         Note: Exception here will make you lose the game
         :param game: PlanetWars object representing the map initial state
         """
         pass
+
+
+class IncrementalPlayer(Player):
+    """
+    Base class for bots that keep their own game state and update it with the changes of each turn, instead of
+    getting a new cloned PlanetWars object every turn.
+
+    The bot gets the initial state once in new_game_has_started, and stores it in self.game.
+    Each following turn the engine calls observe_turn_delta with the changes of the last turn (TurnDelta), which by
+    default applies them to self.game, and then play_turn(self.game).
+
+    Note: self.game is the bot's own object, so if you change it (for example subtract ships you plan to send) make
+    sure to undo the changes - the deltas include only the planets that the engine changed.
+    """
+
+    RECEIVES_STATE_DELTAS = True
+
+    def __init__(self):
+        self.game: Optional[PlanetWars] = None
+
+    def new_game_has_started(self, game: PlanetWars):
+        """
+        Store the initial state. If you override this method call super().new_game_has_started(game)
+        """
+        self.game = game
+
+    def observe_turn_delta(self, delta: TurnDelta) -> PlanetWars:
+        """
+        Called at the start of each turn (except the first) with the changes in the last turn.
+        Override to react to the changes (for example to the battles), and call super().observe_turn_delta(delta).
+        :param delta: The changes in the last turn
+        :return: The updated game object, it is given to play_turn
+        """
+        self.game.apply_delta(delta)
+        return self.game
+
+
+class DeadlineReached(Exception):
+    """
+    Raised by AnytimePlayer.check_time when the time for the turn is up - stops the running search iteration
+    """
+
+
+class AnytimePlayer(Player):
+    """
+    Base class for bots that search deeper and deeper (iterative deepening) or refine their orders, until the turn
+    deadline approaches - and then play the best orders found.
+
+    Implement search(game, depth), returning the orders of a search of the given depth, and call
+    self.check_time() in its inner loops. play_turn runs search with depth 1, 2, 3... and plays the orders of the
+    deepest search that completed. It doesn't start a search it expects to overrun the deadline (the next search is
+    expected to take GROWTH_FACTOR times the last one), and a search interrupted by check_time is dropped.
+
+    The deadline is the one the engine gives (see PlanetWars.deadline), minus SAFETY_MARGIN. In games without a turn
+    time limit the bot gives itself TIME_BUDGET seconds per turn.
+    Every turn's duration and headroom are recorded - see get_headroom_stats.
+    """
+
+    # Seconds per turn when the game has no deadline
+    TIME_BUDGET = 0.1
+    # Seconds to keep before the deadline for returning the orders
+    SAFETY_MARGIN = 0.005
+    # The expected ratio between the durations of search(depth + 1) and search(depth)
+    GROWTH_FACTOR = 2.0
+    MAX_DEPTH = 64
+
+    def __init__(self):
+        # The depth of the search played in the last turn, 0 if no search completed
+        self.last_depth = 0
+        self.turn_seconds: List[float] = []
+        self.headroom_seconds: List[float] = []
+        self._search_deadline = None
+
+    @abstractmethod
+    def search(self, game: PlanetWars, depth: int) -> Iterable[Order]:
+        """
+        Search to the given depth (or refine the orders for the given number of iterations)
+        :return: The best orders found
+        """
+        raise NotImplementedError("Implement the search of your bot")
+
+    def fallback_orders(self, game: PlanetWars) -> Iterable[Order]:
+        """
+        :return: The orders to play if not even a search of depth 1 completed in time
+        """
+        return []
+
+    def get_search_deadline(self, game: PlanetWars) -> float:
+        """
+        :return: time.monotonic() by which the search should end
+        """
+        if game.deadline is None:
+            return time.monotonic() + self.TIME_BUDGET - self.SAFETY_MARGIN
+        return game.deadline - self.SAFETY_MARGIN
+
+    def check_time(self):
+        """
+        Raise DeadlineReached if the search time is up - call it in the loops of search
+        """
+        if self._search_deadline is not None and time.monotonic() >= self._search_deadline:
+            raise DeadlineReached()
+
+    def play_turn(self, game: PlanetWars) -> Iterable[Order]:
+        start = time.monotonic()
+        self._search_deadline = self.get_search_deadline(game)
+        best_orders = None
+        self.last_depth = 0
+        last_search_seconds = 0.0
+        for depth in range(1, self.MAX_DEPTH + 1):
+            search_start = time.monotonic()
+            if depth > 1 and search_start + last_search_seconds * self.GROWTH_FACTOR > self._search_deadline:
+                break
+            try:
+                best_orders = list(self.search(game, depth))
+            except DeadlineReached:
+                break
+            self.last_depth = depth
+            last_search_seconds = time.monotonic() - search_start
+        self._search_deadline = None
+        if best_orders is None:
+            best_orders = list(self.fallback_orders(game))
+
+        end = time.monotonic()
+        self.turn_seconds.append(end - start)
+        if game.deadline is not None:
+            self.headroom_seconds.append(game.deadline - end)
+        return best_orders
+
+    def get_headroom_stats(self) -> HeadroomStats:
+        """
+        :return: The durations and headroom of the turns this bot played (headroom only of turns with a deadline)
+        """
+        return get_headroom_stats(self.turn_seconds, self.headroom_seconds or None)
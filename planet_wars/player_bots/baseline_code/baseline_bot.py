@@ -2,7 +2,7 @@ import random
 from typing import Iterable, List
 
 from planet_wars.planet_wars import Player, PlanetWars, Order, Planet
-from planet_wars.battles.tournament import get_map_by_id, run_and_view_battle, TestBot
+from planet_wars.battles.tournament import get_map_game_by_id, run_and_view_battle, TestBot
 
 import pandas as pd
 
@@ -89,10 +89,10 @@ class AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot(AttackWeakestPlanetFr
 
 def get_random_map():
     """
-    :return: A string of a random map in the maps directory
+    :return: A random map in the maps directory, loaded from the compiled map library
     """
     random_map_id = random.randrange(1, 100)
-    return get_map_by_id(random_map_id)
+    return get_map_game_by_id(random_map_id)
 
 
 def view_bots_battle():
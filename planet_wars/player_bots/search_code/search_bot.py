@@ -0,0 +1,378 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from planet_wars.bot_host.codec import decode_state, encode_state
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import Player, PlanetWars, Order
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackWeakestPlanetFromStrongestBot, AttackEnemyWeakestPlanetFromStrongestBot,
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+
+# An order set as (source planet id, destination planet id, number of ships) tuples - what is sent to the workers
+OrderSet = List[Tuple[int, int, int]]
+# A function returning candidate order sets for the current turn (see AttackMoveGenerator)
+MoveGenerator = Callable[[PlanetWars], List[List[Order]]]
+
+DEFAULT_ROLLOUT_POLICIES: List[Type[Player]] = [
+    AttackWeakestPlanetFromStrongestBot, AttackEnemyWeakestPlanetFromStrongestBot,
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+]
+
+
+def to_order_set(orders: Iterable[Order]) -> OrderSet:
+    return [(order.source_planet_id, order.destination_planet_id, int(order.num_ships)) for order in orders]
+
+
+class AttackMoveGenerator:
+    """
+    Candidate order sets of single attacks: from each of my strongest planets, to each of the closest planets I don't
+    own, send the ships needed to take it (its ships, plus its growth on the way if it is the enemy's, plus one).
+    """
+
+    def __init__(self, max_sources: int = 3, max_targets: int = 4):
+        """
+        :param max_sources: The number of my strongest planets to send from
+        :param max_targets: The number of closest targets of each source
+        """
+        self.max_sources = max_sources
+        self.max_targets = max_targets
+
+    def __call__(self, game: PlanetWars) -> List[List[Order]]:
+        distances = game.get_distance_matrix()
+        sources = sorted(game.get_planets_by_owner(PlanetWars.ME), key=lambda p: -p.num_ships)[:self.max_sources]
+        targets = [p for p in game.planets if p.owner != PlanetWars.ME]
+        candidates = []
+        for source in sources:
+            closest_targets = sorted(targets, key=lambda p: distances[source.planet_id, p.planet_id])
+            for target in closest_targets[:self.max_targets]:
+                needed = target.num_ships + 1
+                if target.owner == PlanetWars.ENEMY:
+                    needed += target.growth_rate * int(distances[source.planet_id, target.planet_id])
+                if needed < source.num_ships:
+                    candidates.append([Order(source, target, needed)])
+        return candidates
+
+
+class PolicyMoveGenerator:
+    """
+    Candidate order sets of what each of the given bots would play in the current turn
+    """
+
+    def __init__(self, policies: Sequence[Type[Player]]):
+        self.policies = list(policies)
+
+    def __call__(self, game: PlanetWars) -> List[List[Order]]:
+        return [list(policy().play_turn(game) or []) for policy in self.policies]
+
+
+def evaluate_game(game_manager: GameManager, state: str) -> float:
+    """
+    :param game_manager: A simulated game
+    :param state: The game state (see GameManager states)
+    :return: The value of the game for player 1 - 1 for a win, 0 for a loss, 0.5 for a tie, and the share of player 1
+             in all the ships if the game didn't end
+    """
+    if state == GameManager.PLAYER_1_WIN_STATE:
+        return 1.0
+    if state == GameManager.PLAYER_2_WIN_STATE:
+        return 0.0
+    if state == GameManager.TIE_STATE:
+        return 0.5
+    my_ships = game_manager.get_player_score(1)
+    enemy_ships = game_manager.get_player_score(2)
+    return my_ships / (my_ships + enemy_ships)
+
+
+class RolloutGameManager(GameManager):
+    """
+    GameManager of a rollout. The rollout policies don't change the game objects they get (see SearchBot), so player 1
+    gets the game itself instead of a clone - cloning the game for both players was most of the time of a rollout.
+    """
+
+    def get_game_object_for_player(self, player_num: int) -> Optional[PlanetWars]:
+        if player_num == 2:
+            return super().get_game_object_for_player(player_num)
+        self.game.turns = self.turns
+        return self.game
+
+
+def run_rollout(
+        game: PlanetWars, order_set: OrderSet, my_policy: Player, enemy_policy: Player, horizon: int
+) -> float:
+    """
+    Simulate the game with the engine: play the order set this turn (the enemy plays by its policy), and then both
+    players play by their policies for up to horizon turns.
+    :param game: The current state, from my perspective (like in play_turn). It isn't changed.
+    :return: The value of the simulated game for me (see evaluate_game)
+    """
+    game_manager = RolloutGameManager(game, my_policy, enemy_policy, record_display=False)
+    game_manager.turns = game_manager.game.turns = game.turns
+    for policy, player_num in ((my_policy, 1), (enemy_policy, 2)):
+        policy.new_game_has_started(game_manager.get_game_object_for_player(player_num))
+
+    enemy_orders = game_manager.safely_run_bot(enemy_policy, game_manager.get_game_object_for_player(2))
+    orders = [Order(source_planet_id, destination_planet_id, num_ships)
+              for source_planet_id, destination_planet_id, num_ships in order_set]
+    state = game_manager.finish_turn(orders, enemy_orders)
+    for _ in range(horizon - 1):
+        if state != GameManager.IN_GAME_STATE:
+            break
+        state = game_manager.make_turn()
+    return evaluate_game(game_manager, state)
+
+
+def run_rollouts(
+        state_message: bytes, order_sets: List[OrderSet], candidate_indices: List[int],
+        policies: List[Type[Player]], horizon: int, deadline: float, seed: int
+) -> List[Tuple[int, float]]:
+    """
+    Run a rollout of each of the given candidates, until the deadline - the task a search worker runs.
+    Each rollout picks the policies of both players at random.
+    :param state_message: The current state (see codec.encode_state)
+    :param order_sets: The order sets of all the candidates
+    :param candidate_indices: The candidates to roll out, one rollout each
+    :param deadline: time.monotonic() to stop at, the rollouts not started by then are skipped. The monotonic clock is
+                     the same in all the processes of the machine.
+    :return: (candidate index, value) of each rollout that ran
+    """
+    _, game = decode_state(state_message)
+    rng = random.Random(seed)
+    results = []
+    for candidate_index in candidate_indices:
+        if time.monotonic() >= deadline:
+            break
+        my_policy, enemy_policy = rng.choice(policies)(), rng.choice(policies)()
+        results.append((candidate_index, run_rollout(game, order_sets[candidate_index], my_policy, enemy_policy,
+                                                     horizon)))
+    return results
+
+
+@dataclass
+class SearchStats:
+    num_candidates: int
+    num_rollouts: int
+    elapsed_seconds: float
+    num_cores: int
+
+    @property
+    def rollouts_per_second_per_core(self) -> float:
+        return self.num_rollouts / max(self.elapsed_seconds, 1e-9) / self.num_cores
+
+
+class SearchBot(Player):
+    """
+    Monte Carlo search bot - each turn it generates candidate order sets (with the move generators), and spends the
+    turn's time budget on rollouts of them: the simulated game (by the engine's rules, see run_rollout) where the
+    candidate is played this turn and then both players play by rollout policies (bots, by default the baseline bots)
+    for a few turns. It plays the candidate with the most rollouts.
+    The rollout policies must not change the game object given to play_turn (see RolloutGameManager).
+    The rollouts are split between the candidates as a bandit (UCB1), so the promising candidates get most of them.
+
+    The rollouts run on a pool of worker processes, in tasks of rollouts_per_task rollouts. With num_workers=0 they
+    run in the bot's process.
+    To build a search bot pass your own move generators and rollout policies, or override evaluate_candidates.
+    """
+
+    NAME = "SearchBot"
+    # How long after the deadline to wait for the rollouts that already started
+    DEADLINE_GRACE_SECONDS = 0.02
+    # Seconds to keep before the turn deadline for returning the orders
+    SAFETY_MARGIN = 0.01
+
+    def __init__(
+            self,
+            time_budget: float = 0.5,
+            num_workers: int = 0,
+            horizon: int = 30,
+            move_generators: Optional[List[MoveGenerator]] = None,
+            rollout_policies: Optional[List[Type[Player]]] = None,
+            exploration: float = 0.5,
+            rollouts_per_task: int = 16,
+            mp_context: Optional[multiprocessing.context.BaseContext] = None,
+            seed: Optional[int] = None
+    ):
+        """
+        :param time_budget: Seconds to spend on the search each turn - less if the turn deadline (PlanetWars.deadline)
+                            is closer
+        :param num_workers: Number of worker processes for the rollouts, 0 to run them in this process
+        :param horizon: Maximal number of turns to simulate in a rollout
+        :param move_generators: Functions giving candidate order sets. Default AttackMoveGenerator and the moves of
+                                the rollout policies. Not sending anything is always a candidate.
+        :param rollout_policies: Player classes (created for each rollout) playing both players in the rollouts. They
+                                 must not change the game object they get.
+        :param exploration: The UCB1 exploration constant
+        :param rollouts_per_task: Number of rollouts in each task sent to a worker
+        :param mp_context: The multiprocessing context of the workers
+        :param seed: Seed of the random choice of the rollout policies
+        """
+        self.rollout_policies = list(rollout_policies or DEFAULT_ROLLOUT_POLICIES)
+        assert not any(policy.RECEIVES_STATE_DELTAS for policy in self.rollout_policies), \
+            "Rollout policies play from a cloned state, they can't receive state deltas"
+        self.move_generators = move_generators if move_generators is not None else [
+            AttackMoveGenerator(), PolicyMoveGenerator(self.rollout_policies)
+        ]
+        self.time_budget = time_budget
+        self.num_workers = num_workers
+        self.horizon = horizon
+        self.exploration = exploration
+        self.rollouts_per_task = rollouts_per_task
+        self.mp_context = mp_context
+        self._rng = random.Random(seed)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.last_search_stats: Optional[SearchStats] = None
+
+    def _get_num_cores(self) -> int:
+        """
+        :return: The number of cores the search runs on
+        """
+        return max(min(self.num_workers, os.cpu_count() or 1), 1)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.num_workers, mp_context=self.mp_context)
+        return self._executor
+
+    def new_game_has_started(self, game: PlanetWars):
+        # Start the workers before the first turn, so the first turn's time budget is spent on rollouts
+        if self.num_workers > 0:
+            self._get_executor()
+
+    def close(self):
+        """
+        Stop the worker processes
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self) -> "SearchBot":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getstate__(self):
+        # The bot can be sent to a bot worker process (see bot_host), but not its worker pool
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
+    def get_search_seconds(self, game: PlanetWars) -> float:
+        """
+        :return: Seconds to spend on the rollouts this turn - the time budget, but end before the turn deadline
+        """
+        time_left = game.get_time_left() - self.SAFETY_MARGIN
+        if self.num_workers > 0:
+            time_left -= self.DEADLINE_GRACE_SECONDS
+        return max(min(self.time_budget, time_left), 0.0)
+
+    def get_candidates(self, game: PlanetWars) -> List[OrderSet]:
+        """
+        :return: The distinct candidate order sets of the move generators, not sending anything first
+        """
+        candidates = [[]]
+        seen = {()}
+        for move_generator in self.move_generators:
+            for orders in move_generator(game):
+                order_set = to_order_set(orders)
+                key = tuple(sorted(order_set))
+                if key not in seen:
+                    seen.add(key)
+                    candidates.append(order_set)
+        return candidates
+
+    def play_turn(self, game: PlanetWars) -> Iterable[Order]:
+        candidates = self.get_candidates(game)
+        if len(candidates) == 1:
+            self.last_search_stats = SearchStats(1, 0, 0.0, self._get_num_cores())
+            return []
+        deadline = time.monotonic() + self.get_search_seconds(game)
+        visits = self.evaluate_candidates(game, candidates, deadline)
+        best = max(range(len(candidates)), key=lambda index: visits[index])
+        return [Order(source_planet_id, destination_planet_id, num_ships)
+                for source_planet_id, destination_planet_id, num_ships in candidates[best]]
+
+    def _select_candidates(self, visits: List[int], values: List[float], count: int) -> List[int]:
+        """
+        Pick the candidates of the next rollouts by UCB1. Each picked candidate counts as visited with value 0 (a
+        "virtual loss") until its rollout returns, so the rollouts in flight spread over the candidates.
+        """
+        picked = []
+        for _ in range(count):
+            unvisited = [index for index, visit_count in enumerate(visits) if visit_count == 0]
+            if unvisited:
+                index = self._rng.choice(unvisited)
+            else:
+                log_total = math.log(sum(visits))
+                index = max(range(len(visits)), key=lambda i: (
+                    values[i] / visits[i] + self.exploration * math.sqrt(log_total / visits[i])
+                ))
+            visits[index] += 1
+            picked.append(index)
+        return picked
+
+    def evaluate_candidates(self, game: PlanetWars, candidates: List[OrderSet], deadline: float) -> List[int]:
+        """
+        Run rollouts of the candidates until the deadline
+        :param deadline: time.monotonic() to stop at, at most the turn deadline (see get_search_seconds)
+        :return: The number of rollouts of each candidate
+        """
+        start = time.perf_counter()
+        state_message = encode_state(game)
+        # visits include the rollouts in flight, values only the returned ones
+        visits = [0] * len(candidates)
+        values = [0.0] * len(candidates)
+        num_rollouts = 0
+
+        def submit_task(run_task) -> Tuple[List[int], object]:
+            picked = self._select_candidates(visits, values, self.rollouts_per_task)
+            return picked, run_task(
+                run_rollouts, state_message, candidates, picked, self.rollout_policies, self.horizon, deadline,
+                self._rng.getrandbits(32)
+            )
+
+        def apply_results(picked: List[int], results: List[Tuple[int, float]]):
+            nonlocal num_rollouts
+            for index, value in results:
+                values[index] += value
+            num_rollouts += len(results)
+            # The rollouts skipped at the deadline are not visits
+            for index in picked[len(results):]:
+                visits[index] -= 1
+
+        if self.num_workers == 0:
+            while time.monotonic() < deadline:
+                picked, results = submit_task(lambda function, *args: function(*args))
+                apply_results(picked, results)
+        else:
+            executor = self._get_executor()
+            # Keep every worker busy, with a task waiting for it
+            pending: Dict[Future, List[int]] = {}
+            while True:
+                while time.monotonic() < deadline and len(pending) < self.num_workers * 2:
+                    picked, future = submit_task(executor.submit)
+                    pending[future] = picked
+                if not pending:
+                    break
+                done, _ = wait(
+                    pending, timeout=max(deadline + self.DEADLINE_GRACE_SECONDS - time.monotonic(), 0),
+                    return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    break  # the tasks still running end by themselves after the deadline, their results are dropped
+                for future in done:
+                    apply_results(pending.pop(future), future.result())
+            for future in pending:
+                future.cancel()
+
+        self.last_search_stats = SearchStats(
+            len(candidates), num_rollouts, time.perf_counter() - start, self._get_num_cores()
+        )
+        return visits
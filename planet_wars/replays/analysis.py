@@ -0,0 +1,212 @@
+"""
+Decode replays to numpy arrays for analysis - ship counts over time, territory, fleets - and summaries of battles.
+
+A replay is the text of GameManager.get_description_for_display or an encoded replay (see replays.codec). Turn 0 in
+the arrays is the initial state of the map and turn t is the state after t turns were played.
+"""
+
+import multiprocessing
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from planet_wars.replays.codec import decode_replay
+
+Replay = Union[str, bytes]
+
+REPLAY_FLEET_DTYPE = np.dtype([
+    ("owner", np.int8), ("num_ships", np.int32), ("source_planet_id", np.int32), ("destination_planet_id", np.int32),
+    ("total_trip_length", np.int32), ("launch_turn", np.int32), ("arrival_turn", np.int32)
+])
+
+
+@dataclass
+class ReplayArrays:
+    """
+    The arrays of a decoded replay
+    """
+    x: np.ndarray  # (planets,) float64
+    y: np.ndarray  # (planets,) float64
+    growth: np.ndarray  # (planets,) int32
+    owners: np.ndarray  # (turns + 1, planets) int8
+    ships: np.ndarray  # (turns + 1, planets) int32
+    ships_in_flight: np.ndarray  # (turns + 1, 2) int64 - the ships in flight of player 1 and player 2
+    # Each fleet once (see REPLAY_FLEET_DTYPE). The turn it was launched in (<= 0 for the fleets of the map) and the
+    # turn it lands in (-1 for fleets that never land).
+    # Fleets with trip length 1 land in the turn they were launched in, so the replay never shows them and they are not
+    # here - only in the ships of their source and destination planets. The generated and bundled maps have no such
+    # fleets: their planets are at least minDistance = 2 apart (see engine.map_generator).
+    fleets: np.ndarray
+
+    @property
+    def num_turns(self) -> int:
+        return len(self.owners) - 1
+
+    @property
+    def num_planets(self) -> int:
+        return self.owners.shape[1]
+
+
+def decode_replay_arrays(replay: Replay) -> ReplayArrays:
+    """
+    :param replay: The replay text or an encoded replay
+    :return: The arrays of the replay
+    """
+    description = decode_replay(replay) if isinstance(replay, (bytes, bytearray, memoryview)) else replay
+    map_description, turns_description = description.split("|", 1)
+    planets = np.fromstring(map_description.replace(":", ","), dtype=np.float64, sep=",").reshape(-1, 5)
+    num_planets = len(planets)
+    owners = np.zeros((1, num_planets), dtype=np.int8)
+    ships = np.zeros((1, num_planets), dtype=np.int32)
+    owners[0] = planets[:, 2]
+    ships[0] = planets[:, 3]
+
+    turns = turns_description.split(":") if turns_description else []
+    num_turns = len(turns)
+    # All the numbers of all the turns in one array - each turn is 2 numbers per planet and 6 per fleet
+    values = np.fromstring(turns_description.replace(":", ".").replace(",", "."), dtype=np.int64, sep=".")
+    fleets_per_turn = np.array([turn.count(",") + 1 - num_planets for turn in turns], dtype=np.int64)
+    turn_sizes = 2 * num_planets + 6 * fleets_per_turn
+    turn_starts = np.cumsum(turn_sizes) - turn_sizes
+    planet_values = values[turn_starts[:, None] + np.arange(2 * num_planets)].reshape(num_turns, num_planets, 2)
+    owners = np.concatenate([owners, planet_values[:, :, 0].astype(np.int8)])
+    ships = np.concatenate([ships, planet_values[:, :, 1].astype(np.int32)])
+
+    is_fleet_value = np.ones(len(values), dtype=bool)
+    is_fleet_value[(turn_starts[:, None] + np.arange(2 * num_planets)).ravel()] = False
+    # owner, num_ships, source, destination, total trip length, turns remaining
+    turn_fleets = values[is_fleet_value].reshape(-1, 6)
+    fleet_turns = np.repeat(np.arange(1, num_turns + 1), fleets_per_turn)
+
+    ships_in_flight = np.zeros((num_turns + 1, 2), dtype=np.int64)
+    np.add.at(ships_in_flight, (fleet_turns, turn_fleets[:, 0] - 1), turn_fleets[:, 1])
+
+    # A fleet is shown first in the turn it was launched in, with total trip length - 1 turns remaining (it advanced
+    # once), except the fleets of the map which are already in flight in turn 1
+    total_trip_length, turns_remaining = turn_fleets[:, 4], turn_fleets[:, 5]
+    first_shown = (turns_remaining == total_trip_length - 1) | (fleet_turns == 1)
+    turn_fleets, fleet_turns = turn_fleets[first_shown], fleet_turns[first_shown]
+    fleets = np.zeros(len(turn_fleets), dtype=REPLAY_FLEET_DTYPE)
+    fleets["owner"] = turn_fleets[:, 0]
+    fleets["num_ships"] = turn_fleets[:, 1]
+    fleets["source_planet_id"] = turn_fleets[:, 2]
+    fleets["destination_planet_id"] = turn_fleets[:, 3]
+    fleets["total_trip_length"] = turn_fleets[:, 4]
+    fleets["launch_turn"] = fleet_turns - (turn_fleets[:, 4] - 1 - turn_fleets[:, 5])
+    # The fleet lands when no turns remain - fleets with trip length 0 never land
+    fleets["arrival_turn"] = np.where(turn_fleets[:, 4] > 0, fleet_turns + turn_fleets[:, 5], -1)
+
+    return ReplayArrays(
+        x=planets[:, 0], y=planets[:, 1], growth=planets[:, 4].astype(np.int32), owners=owners, ships=ships,
+        ships_in_flight=ships_in_flight, fleets=fleets
+    )
+
+
+def decode_replays_arrays(
+        replays: Sequence[Replay],
+        num_workers: Optional[int] = None,
+        chunk_size: int = 8,
+        mp_context: Optional[multiprocessing.context.BaseContext] = None
+) -> List[ReplayArrays]:
+    """
+    Decode many replays in worker processes
+    :param replays: The replays texts or encoded replays
+    :param num_workers: Number of worker processes, default the number of cores. 0 to decode in this process.
+    :param chunk_size: Number of replays in each task given to a worker
+    :return: The arrays of each replay, in the order of the given replays
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if num_workers == 0 or len(replays) <= chunk_size:
+        return [decode_replay_arrays(replay) for replay in replays]
+    mp_context = mp_context or multiprocessing.get_context()
+    with mp_context.Pool(num_workers) as pool:
+        return pool.map(decode_replay_arrays, replays, chunksize=chunk_size)
+
+
+def get_player_ships(arrays: ReplayArrays) -> np.ndarray:
+    """
+    :return: (turns + 1, 2) the total ships of player 1 and player 2 in each turn, on planets and in flight (the score)
+    """
+    return np.stack([
+        np.where(arrays.owners == player, arrays.ships, 0).sum(axis=1) for player in (1, 2)
+    ], axis=1) + arrays.ships_in_flight
+
+
+def get_territory_share(arrays: ReplayArrays, by_growth: bool = False) -> np.ndarray:
+    """
+    :param by_growth: If True the share of the growth rate of the planets, otherwise of the number of planets
+    :return: (turns + 1, 3) the share of neutral, player 1 and player 2 of the planets in each turn
+    """
+    weights = arrays.growth if by_growth else np.ones(arrays.num_planets)
+    share = np.stack([(np.where(arrays.owners == owner, weights, 0)).sum(axis=1) for owner in (0, 1, 2)], axis=1)
+    return share / max(weights.sum(), 1)
+
+
+def get_produced_ships(arrays: ReplayArrays) -> np.ndarray:
+    """
+    :return: (2,) the ships each player had at the start plus the ships its planets grew during the game
+    """
+    initial = get_player_ships(arrays)[0]
+    # The planets grow in a turn if they were owned at its start
+    grown = np.stack([
+        np.where(arrays.owners[:-1] == player, arrays.growth, 0).sum() for player in (1, 2)
+    ])
+    return initial + grown
+
+
+def get_ship_efficiency(arrays: ReplayArrays) -> np.ndarray:
+    """
+    :return: (2,) the ships each player has at the end of the game out of the ships it produced (see
+             get_produced_ships) - 1 if it lost no ship, 0 if it lost all of them
+    """
+    return get_player_ships(arrays)[-1] / np.maximum(get_produced_ships(arrays), 1)
+
+
+def get_first_capture_turns(arrays: ReplayArrays) -> np.ndarray:
+    """
+    :return: (planets, 2) the first turn each player owned each planet, 0 for its planets at the start and -1 for the
+             planets it never owned
+    """
+    first_turns = np.full((arrays.num_planets, 2), -1, dtype=np.int64)
+    for index, player in enumerate((1, 2)):
+        owned = arrays.owners == player
+        ever_owned = owned.any(axis=0)
+        first_turns[ever_owned, index] = owned.argmax(axis=0)[ever_owned]
+    return first_turns
+
+
+def summarize_replays(arrays_list: Sequence[ReplayArrays], index: Optional[Sequence] = None) -> pd.DataFrame:
+    """
+    :param arrays_list: Decoded replays (see decode_replays_arrays)
+    :param index: The index of the data frame (for example the battle ids), default 0..len - 1
+    :return: Data frame with a row of summaries of each replay
+    """
+    rows = []
+    for arrays in arrays_list:
+        player_ships = get_player_ships(arrays)[-1]
+        territory = get_territory_share(arrays)
+        growth_territory = get_territory_share(arrays, by_growth=True)
+        efficiency = get_ship_efficiency(arrays)
+        first_captures = get_first_capture_turns(arrays)
+        captured = first_captures > 0
+        fleets = arrays.fleets
+        row = {"turns": arrays.num_turns}
+        for player_index, player in enumerate((1, 2)):
+            captures = first_captures[captured[:, player_index], player_index]
+            row.update({
+                f"player_{player}_ships": int(player_ships[player_index]),
+                f"player_{player}_final_territory": float(territory[-1, player]),
+                f"player_{player}_mean_territory": float(territory[:, player].mean()),
+                f"player_{player}_mean_growth_territory": float(growth_territory[:, player].mean()),
+                f"player_{player}_ship_efficiency": float(efficiency[player_index]),
+                f"player_{player}_planets_captured": len(captures),
+                f"player_{player}_first_capture_turn": int(captures.min()) if len(captures) else -1,
+                f"player_{player}_fleets": int((fleets["owner"] == player).sum()),
+                f"player_{player}_ships_sent": int(fleets["num_ships"][fleets["owner"] == player].sum())
+            })
+        rows.append(row)
+    return pd.DataFrame(rows, index=index)
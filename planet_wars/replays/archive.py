@@ -0,0 +1,193 @@
+"""
+Append-only archive of the replays of a tournament, written while the games run - so the memory used for replays
+doesn't grow with the length of the games or the number of battles.
+
+Two files:
+    path           The compressed replay blocks (see replays.codec) and the map texts, appended as the games produce
+                   them. The blocks of games played together are interleaved.
+    path.index     A JSON line per finished replay - its battle id, replay header and the offsets of its map text and
+                   blocks in the data file.
+Reading a replay reads only its own blocks.
+"""
+
+import json
+import os
+from typing import BinaryIO, Dict, List, Optional
+
+from planet_wars.replays.codec import DEFAULT_KEYFRAME_INTERVAL, ReplayReader, ReplayWriter, join_replay
+
+INDEX_SUFFIX = ".index"
+
+
+class ArchivedReplayWriter(ReplayWriter):
+    """
+    ReplayWriter that appends its blocks to a ReplayArchiveWriter as soon as they are compressed
+    """
+
+    def __init__(
+            self, archive: "ReplayArchiveWriter", map_description: str, keyframe_interval: int, compression: str
+    ):
+        super().__init__(map_description, keyframe_interval, compression)
+        self.archive = archive
+        self.map_location = archive.append(map_description.encode())
+        # (offset, length) of each block in the data file
+        self.block_locations: List[List[int]] = []
+
+    def write_block(self, block: bytes):
+        self.block_locations.append(self.archive.append(block))
+
+    def to_bytes(self) -> bytes:
+        """
+        :return: The encoded replay of the turns added, its blocks read back from the archive
+        """
+        self.flush()
+        return join_replay(
+            self.map_description, self.compression, self.keyframe_interval, self.num_planets or 0, self.num_turns,
+            [self.archive.read(location) for location in self.block_locations]
+        )
+
+
+class ReplayArchiveWriter:
+    """
+    Write replays to an archive (see the module doc):
+        writer = archive.new_replay(game_manager.get_map_description())
+        game_manager.set_replay_writer(writer)
+        ... run the game ...
+        archive.finish_replay(writer, battle_id)
+    """
+
+    def __init__(
+            self, path: str, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, compression: str = "zlib",
+            append: bool = False
+    ):
+        """
+        :param path: The path of the data file, the index is path + INDEX_SUFFIX
+        :param keyframe_interval: The number of turns in a replay block (see ReplayWriter)
+        :param compression: "zlib", "lzma" or "none"
+        :param append: If True add replays to an existing archive, otherwise start a new archive
+        """
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.compression = compression
+        mode = "ab" if append else "wb"
+        self._data_file: Optional[BinaryIO] = open(path, mode)
+        self._index_file = open(path + INDEX_SUFFIX, mode)
+        self._offset = self._data_file.seek(0, os.SEEK_END)
+
+    def append(self, data: bytes) -> List[int]:
+        """
+        Append data to the data file
+        :return: The (offset, length) of the data
+        """
+        location = [self._offset, len(data)]
+        self._data_file.write(data)
+        self._offset += len(data)
+        return location
+
+    def read(self, location: List[int]) -> bytes:
+        """
+        :param location: The (offset, length) of data appended to the data file
+        :return: The data
+        """
+        self._data_file.flush()
+        with open(self.path, "rb") as f:
+            f.seek(location[0])
+            return f.read(location[1])
+
+    def new_replay(self, map_description: str) -> ArchivedReplayWriter:
+        """
+        :param map_description: The map part of the replay text (see GameManager.get_map_description)
+        :return: A writer for the turns of the replay
+        """
+        return ArchivedReplayWriter(self, map_description, self.keyframe_interval, self.compression)
+
+    def finish_replay(self, writer: ArchivedReplayWriter, battle_id: int):
+        """
+        Write the last block of the replay and add the replay to the index. Both files are flushed, so readers see the
+        replay from now on.
+        """
+        writer.flush()
+        entry = {
+            "battle_id": battle_id,
+            "compression": writer.compression,
+            "keyframe_interval": writer.keyframe_interval,
+            "num_planets": writer.num_planets or 0,
+            "num_turns": writer.num_turns,
+            "map": writer.map_location,
+            "blocks": writer.block_locations
+        }
+        self._data_file.flush()
+        self._index_file.write((json.dumps(entry) + "\n").encode())
+        self._index_file.flush()
+
+    def close(self):
+        if self._data_file is not None:
+            self._data_file.close()
+            self._index_file.close()
+            self._data_file = None
+
+    def __enter__(self) -> "ReplayArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ReplayArchive:
+    """
+    Read replays from an archive written by ReplayArchiveWriter
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: The path of the data file
+        """
+        self.path = path
+        # battle id -> index entry
+        self.index: Dict[int, dict] = {}
+        with open(path + INDEX_SUFFIX, "rb") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.index[entry["battle_id"]] = entry
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, battle_id: int) -> bool:
+        return battle_id in self.index
+
+    @property
+    def battle_ids(self) -> List[int]:
+        return list(self.index)
+
+    def get_replay_bytes(self, battle_id: int) -> bytes:
+        """
+        :return: The encoded replay of the battle (see replays.codec), read from its own blocks in the data file
+        """
+        if battle_id not in self.index:
+            raise KeyError(f"battle {battle_id} is not in the replay archive {self.path}")
+        entry = self.index[battle_id]
+        with open(self.path, "rb") as f:
+            def read(location: List[int]) -> bytes:
+                f.seek(location[0])
+                return f.read(location[1])
+
+            map_description = read(entry["map"]).decode()
+            blocks = [read(location) for location in entry["blocks"]]
+        return join_replay(
+            map_description, entry["compression"], entry["keyframe_interval"], entry["num_planets"],
+            entry["num_turns"], blocks
+        )
+
+    def get_reader(self, battle_id: int) -> ReplayReader:
+        """
+        :return: Reader of the turns of the battle
+        """
+        return ReplayReader(self.get_replay_bytes(battle_id))
+
+    def get_description(self, battle_id: int) -> str:
+        """
+        :return: The replay text of the battle (see GameManager.get_description_for_display)
+        """
+        return self.get_reader(battle_id).to_description()
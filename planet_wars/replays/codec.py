@@ -0,0 +1,388 @@
+"""
+Compact binary replay format - the same information as the replay text of GameManager.get_description_for_display
+(the format of ShowGame.jar), converted back to the text losslessly, with random access to any turn.
+
+The turns are split to blocks of keyframe_interval turns. Each block is compressed alone (zlib or lzma) and holds a
+keyframe - the full state of its first turn - and the changes of each of the next turns from the turn before it:
+    planets: the planets whose owner changed, or whose ships are not the ships before plus the growth
+    fleets:  which fleets of the turn before are still in flight (in the same order), plus the new fleets at the end
+So reading a turn decompresses one block and applies at most keyframe_interval - 1 deltas.
+
+Layout:
+    header (magic, version, compression, keyframe interval, number of planets, number of turns, map text length)
+    + utf-8 map text (the part of the replay text before "|", kept verbatim)
+    + offsets of the blocks (number of blocks + 1 uint64, from the end of the offsets)
+    + blocks
+"""
+
+import lzma
+import struct
+import zlib
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+MAGIC = b"PWRP"
+VERSION = 1
+DEFAULT_KEYFRAME_INTERVAL = 32
+
+NO_COMPRESSION = 0
+ZLIB_COMPRESSION = 1
+LZMA_COMPRESSION = 2
+COMPRESSIONS = {"none": NO_COMPRESSION, "zlib": ZLIB_COMPRESSION, "lzma": LZMA_COMPRESSION}
+
+# The columns of the fleets arrays, in the order of the replay text
+FLEET_COLUMNS = [
+    "owner", "num_ships", "source_planet_id", "destination_planet_id", "total_trip_length", "turns_remaining"
+]
+_TURNS_REMAINING = 5
+
+_HEADER = struct.Struct("<4sBBIIII")
+_ARRAY_HEADER = struct.Struct("<3sQ")
+
+
+class ReplayTurn(NamedTuple):
+    """
+    The state of a replay turn (after the turn was played)
+    """
+    owners: np.ndarray  # (planets,) int8
+    ships: np.ndarray  # (planets,) int32
+    fleets: np.ndarray  # (fleets, 6) int32, the columns are FLEET_COLUMNS
+
+
+def _compress(data: bytes, compression: int) -> bytes:
+    if compression == ZLIB_COMPRESSION:
+        return zlib.compress(data, 9)
+    if compression == LZMA_COMPRESSION:
+        return lzma.compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: int) -> bytes:
+    if compression == ZLIB_COMPRESSION:
+        return zlib.decompress(data)
+    if compression == LZMA_COMPRESSION:
+        return lzma.decompress(data)
+    return data
+
+
+def _pack_arrays(arrays: Sequence[np.ndarray]) -> bytes:
+    parts = []
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        parts.append(_ARRAY_HEADER.pack(array.dtype.str.encode(), array.size))
+        parts.append(array.tobytes())
+    return b"".join(parts)
+
+
+def _unpack_arrays(data: bytes) -> List[np.ndarray]:
+    arrays = []
+    offset = 0
+    while offset < len(data):
+        dtype, size = _ARRAY_HEADER.unpack_from(data, offset)
+        offset += _ARRAY_HEADER.size
+        array = np.frombuffer(data, dtype=np.dtype(dtype.decode()), count=size, offset=offset)
+        arrays.append(array)
+        offset += array.nbytes
+    return arrays
+
+
+def get_map_growth(map_description: str) -> np.ndarray:
+    """
+    :param map_description: The map part of the replay text - "x,y,owner,ships,growth" of each planet, ":" separated
+    :return: The growth rate of each planet
+    """
+    return np.array([int(float(planet.split(",")[4])) for planet in map_description.split(":")], dtype=np.int64)
+
+
+def format_turn(turn: ReplayTurn) -> str:
+    """
+    :return: The turn in the replay text format (see GameManager.add_turn_for_display)
+    """
+    planets = ",".join(f"{owner}.{ships}" for owner, ships in zip(turn.owners.tolist(), turn.ships.tolist()))
+    if len(turn.fleets) == 0:
+        return planets
+    return planets + "," + ",".join(".".join(map(str, fleet)) for fleet in turn.fleets.tolist())
+
+
+def parse_turn(turn_description: str, num_planets: int) -> ReplayTurn:
+    """
+    :return: The turn of the given replay text of a turn
+    """
+    values = np.array(turn_description.replace(",", ".").split("."), dtype=np.int64)
+    planets = values[:2 * num_planets].reshape(num_planets, 2)
+    return ReplayTurn(
+        owners=planets[:, 0].astype(np.int8),
+        ships=planets[:, 1].astype(np.int32),
+        fleets=values[2 * num_planets:].reshape(-1, 6).astype(np.int32)
+    )
+
+
+def _split_kept_fleets(previous: np.ndarray, current: np.ndarray) -> np.ndarray:
+    """
+    :return: Mask of the fleets of the previous turn (advanced by one turn) that start the current fleets, in order -
+             the current fleets are previous[mask] followed by the new fleets
+    """
+    predicted = previous.copy()
+    predicted[:, _TURNS_REMAINING] -= 1
+    # The engine removes the fleets that landed and adds the new fleets at the end
+    mask = predicted[:, _TURNS_REMAINING] != 0
+    num_kept = int(mask.sum())
+    if num_kept <= len(current) and (current[:num_kept] == predicted[mask]).all():
+        return mask
+    # Any other order - match greedily, the fleets after the last match are new
+    mask = np.zeros(len(predicted), dtype=bool)
+    current_index = 0
+    for previous_index in range(len(predicted)):
+        if current_index < len(current) and (predicted[previous_index] == current[current_index]).all():
+            mask[previous_index] = True
+            current_index += 1
+    return mask
+
+
+class ReplayWriter:
+    """
+    Encode a replay turn by turn
+    """
+
+    def __init__(
+            self, map_description: str, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, compression: str = "zlib"
+    ):
+        """
+        :param map_description: The map part of the replay text (kept verbatim)
+        :param keyframe_interval: The number of turns in a block, the most deltas applied to read a turn
+        :param compression: "zlib", "lzma" or "none"
+        """
+        assert keyframe_interval >= 1, "keyframe_interval must be at least 1"
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"unknown compression {compression}, use one of {list(COMPRESSIONS)}")
+        self.map_description = map_description
+        self.keyframe_interval = keyframe_interval
+        self.compression = COMPRESSIONS[compression]
+        try:
+            self.growth = get_map_growth(map_description)
+        except (IndexError, ValueError):
+            self.growth = None  # only used to predict the ships, the replay is still lossless
+        self.num_planets: Optional[int] = None
+        self.num_turns = 0
+        self._blocks: List[bytes] = []
+        self._block_turns: List[ReplayTurn] = []
+
+    def add_turn(self, turn: ReplayTurn):
+        """
+        Add the next turn of the replay
+        """
+        if self.num_planets is None:
+            self.num_planets = len(turn.owners)
+            if self.growth is None or len(self.growth) != self.num_planets:
+                self.growth = np.zeros(self.num_planets, dtype=np.int64)
+        assert len(turn.owners) == self.num_planets, "all the turns must have the same planets"
+        self._block_turns.append(ReplayTurn(
+            np.asarray(turn.owners, dtype=np.int8), np.asarray(turn.ships, dtype=np.int32),
+            np.asarray(turn.fleets, dtype=np.int32).reshape(-1, 6)
+        ))
+        self.num_turns += 1
+        if len(self._block_turns) == self.keyframe_interval:
+            self._flush_block()
+
+    def _flush_block(self):
+        if len(self._block_turns) == 0:
+            return
+        keyframe = self._block_turns[0]
+        changed_counts, changed_planets, changed_owners, changed_ships = [], [], [], []
+        kept_masks, new_counts, new_fleets = [], [], []
+        for previous, current in zip(self._block_turns, self._block_turns[1:]):
+            predicted_ships = previous.ships + np.where(previous.owners != 0, self.growth, 0)
+            changed = np.flatnonzero((current.owners != previous.owners) | (current.ships != predicted_ships))
+            changed_counts.append(len(changed))
+            changed_planets.append(changed)
+            changed_owners.append(current.owners[changed])
+            changed_ships.append(current.ships[changed])
+            kept = _split_kept_fleets(previous.fleets, current.fleets)
+            kept_masks.append(kept)
+            new_counts.append(len(current.fleets) - int(kept.sum()))
+            new_fleets.append(current.fleets[int(kept.sum()):])
+
+        def concatenate(arrays, dtype):
+            return np.concatenate(arrays).astype(dtype) if arrays else np.zeros(0, dtype=dtype)
+
+        block = _pack_arrays([
+            keyframe.owners, keyframe.ships, keyframe.fleets.ravel(),
+            np.array(changed_counts, dtype=np.int32), concatenate(changed_planets, np.int32),
+            concatenate(changed_owners, np.int8), concatenate(changed_ships, np.int32),
+            concatenate(kept_masks, np.bool_),
+            np.array(new_counts, dtype=np.int32), concatenate([f.ravel() for f in new_fleets], np.int32)
+        ])
+        self.write_block(_compress(block, self.compression))
+        self._block_turns = []
+
+    def write_block(self, block: bytes):
+        """
+        Keep a compressed block of turns. Override to write the blocks somewhere else (see replays.archive).
+        """
+        self._blocks.append(block)
+
+    def flush(self):
+        """
+        Write the turns added since the last block as the last block, after the last turn was added
+        """
+        self._flush_block()
+
+    def to_bytes(self) -> bytes:
+        """
+        :return: The encoded replay of the turns added
+        """
+        self.flush()
+        return join_replay(
+            self.map_description, self.compression, self.keyframe_interval, self.num_planets or 0, self.num_turns,
+            self._blocks
+        )
+
+
+def join_replay(
+        map_description: str, compression: int, keyframe_interval: int, num_planets: int, num_turns: int,
+        blocks: Sequence[bytes]
+) -> bytes:
+    """
+    :return: The encoded replay of the given compressed blocks (see ReplayWriter)
+    """
+    map_bytes = map_description.encode()
+    header = _HEADER.pack(MAGIC, VERSION, compression, keyframe_interval, num_planets, num_turns, len(map_bytes))
+    offsets = np.zeros(len(blocks) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(block) for block in blocks])
+    return b"".join([header, map_bytes, offsets.tobytes()] + list(blocks))
+
+
+class ReplayReader:
+    """
+    Read turns of an encoded replay, decompressing only the block of the turn. The last block read is kept, so reading
+    the turns in order decompresses each block once.
+    """
+
+    def __init__(self, data: bytes):
+        """
+        :param data: An encoded replay (see encode_replay)
+        """
+        magic, version, compression, keyframe_interval, num_planets, num_turns, map_length = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not an encoded replay")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        self.data = data
+        self.compression = compression
+        self.keyframe_interval = keyframe_interval
+        self.num_planets = num_planets
+        self.num_turns = num_turns
+        offset = _HEADER.size
+        self.map_description = bytes(data[offset:offset + map_length]).decode()
+        offset += map_length
+        num_blocks = -(-num_turns // keyframe_interval)
+        self._offsets = np.frombuffer(data, dtype="<u8", count=num_blocks + 1, offset=offset)
+        self._blocks_start = offset + self._offsets.nbytes
+        self._growth = None
+        self._cached_block_index = None
+        self._cached_block: List[ReplayTurn] = []
+
+    def __len__(self) -> int:
+        return self.num_turns
+
+    @property
+    def growth(self) -> np.ndarray:
+        if self._growth is None:
+            try:
+                self._growth = get_map_growth(self.map_description)
+            except (IndexError, ValueError):
+                self._growth = None
+            if self._growth is None or len(self._growth) != self.num_planets:
+                self._growth = np.zeros(self.num_planets, dtype=np.int64)
+        return self._growth
+
+    def _read_block(self, block_index: int) -> List[ReplayTurn]:
+        if block_index == self._cached_block_index:
+            return self._cached_block
+        start = self._blocks_start + int(self._offsets[block_index])
+        end = self._blocks_start + int(self._offsets[block_index + 1])
+        (
+            owners, ships, fleets, changed_counts, changed_planets, changed_owners, changed_ships, kept_masks,
+            new_counts, new_fleets
+        ) = _unpack_arrays(_decompress(bytes(self.data[start:end]), self.compression))
+        new_fleets = new_fleets.reshape(-1, 6)
+        turn = ReplayTurn(owners.copy(), ships.copy(), fleets.reshape(-1, 6).copy())
+        turns = [turn]
+        changed_start = mask_start = new_start = 0
+        for changed_count, new_count in zip(changed_counts.tolist(), new_counts.tolist()):
+            owners = turn.owners.copy()
+            ships = turn.ships + np.where(turn.owners != 0, self.growth, 0).astype(np.int32)
+            changed = changed_planets[changed_start:changed_start + changed_count]
+            owners[changed] = changed_owners[changed_start:changed_start + changed_count]
+            ships[changed] = changed_ships[changed_start:changed_start + changed_count]
+            changed_start += changed_count
+
+            kept = kept_masks[mask_start:mask_start + len(turn.fleets)]
+            mask_start += len(turn.fleets)
+            kept_fleets = turn.fleets[kept]
+            kept_fleets[:, _TURNS_REMAINING] -= 1
+            fleets = np.concatenate([kept_fleets, new_fleets[new_start:new_start + new_count]])
+            new_start += new_count
+            turn = ReplayTurn(owners, ships, fleets)
+            turns.append(turn)
+        for turn in turns:
+            for array in turn:
+                array.flags.writeable = False
+        self._cached_block_index = block_index
+        self._cached_block = turns
+        return turns
+
+    def get_turn(self, turn: int) -> ReplayTurn:
+        """
+        :param turn: The index of the turn, 0..len - 1 (the state after turn + 1 turns were played)
+        :return: The state of the turn (read only - the arrays are shared with the cached block)
+        """
+        if not 0 <= turn < self.num_turns:
+            raise IndexError(f"turn {turn} out of range, the replay has {self.num_turns} turns")
+        return self._read_block(turn // self.keyframe_interval)[turn % self.keyframe_interval]
+
+    def iter_turns(self) -> Iterator[ReplayTurn]:
+        for turn in range(self.num_turns):
+            yield self.get_turn(turn)
+
+    def get_turn_description(self, turn: int) -> str:
+        """
+        :return: The replay text of the given turn
+        """
+        return format_turn(self.get_turn(turn))
+
+    def to_description(self) -> str:
+        """
+        :return: The replay text (see GameManager.get_description_for_display)
+        """
+        return self.map_description + "|" + ":".join(format_turn(turn) for turn in self.iter_turns())
+
+
+def encode_replay(
+        description: str, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, compression: str = "zlib"
+) -> bytes:
+    """
+    :param description: The replay text (see GameManager.get_description_for_display)
+    :param keyframe_interval: The number of turns in a block, see ReplayWriter
+    :param compression: "zlib", "lzma" or "none"
+    :return: The encoded replay
+    :raise ValueError: If the text can't be encoded losslessly (it isn't in the format of the engine)
+    """
+    map_description, turns_description = description.split("|", 1)
+    writer = ReplayWriter(map_description, keyframe_interval, compression)
+    num_planets = len(map_description.split(":"))
+    for turn_description in (turns_description.split(":") if turns_description else []):
+        turn = parse_turn(turn_description, num_planets)
+        if format_turn(turn) != turn_description:
+            raise ValueError(f"can't encode the turn losslessly: {turn_description[:100]}")
+        writer.add_turn(turn)
+    return writer.to_bytes()
+
+
+def decode_replay(data: bytes) -> str:
+    """
+    :param data: An encoded replay
+    :return: The replay text
+    """
+    return ReplayReader(data).to_description()
@@ -0,0 +1,209 @@
+"""
+Headless replay renderer - draws the turns of replays with Pillow to PNG frames, animated GIFs or thumbnails, without
+the Java viewer. render_replays renders many battles in worker processes, for example thumbnails of a whole round.
+
+The planets are circles (bigger for higher growth rate) colored by owner, with their number of ships. The fleets are
+dots on the line from their source to their destination, at the part of the trip they made.
+"""
+
+import multiprocessing
+import os
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from planet_wars.replays.analysis import Replay, ReplayArrays, decode_replay_arrays, get_player_ships
+
+FRAMES = "frames"
+GIF = "gif"
+THUMBNAIL = "thumbnail"
+
+# Palette indices of the frames - the frames are palette images, so saving a GIF needs no color quantization
+BACKGROUND, TEXT, NEUTRAL, PLAYER_1, PLAYER_2 = range(5)
+PALETTE = [
+    (12, 12, 24),  # background
+    (230, 230, 230),  # text
+    (128, 128, 128),  # neutral
+    (220, 64, 64),  # player 1
+    (64, 120, 230)  # player 2
+]
+_OWNER_COLORS = np.array([NEUTRAL, PLAYER_1, PLAYER_2])
+_FLAT_PALETTE = [value for color in PALETTE for value in color]
+
+
+class ReplayRenderer:
+    """
+    Draws the turns of one replay
+    """
+
+    def __init__(self, replay: Union[Replay, ReplayArrays], size: int = 480, show_ships: bool = True):
+        """
+        :param replay: The replay text, an encoded replay or the decoded ReplayArrays (see replays.analysis)
+        :param size: The width and height of the map part of the frames, in pixels
+        :param show_ships: If True write the number of ships on the planets
+        """
+        self.arrays: ReplayArrays = replay if isinstance(replay, ReplayArrays) else decode_replay_arrays(replay)
+        self.size = size
+        self.show_ships = show_ships
+        self.header_height = 20
+        self.font = ImageFont.load_default()
+        arrays = self.arrays
+        margin = size * 0.06
+        min_x, max_x, min_y, max_y = arrays.x.min(), arrays.x.max(), arrays.y.min(), arrays.y.max()
+        scale = (size - 2 * margin) / max(max_x - min_x, max_y - min_y, 1e-9)
+        self.planet_x = margin + (arrays.x - min_x) * scale
+        self.planet_y = self.header_height + margin + (arrays.y - min_y) * scale
+        self.planet_radius = size * 0.012 + size * 0.006 * arrays.growth
+
+    @property
+    def num_frames(self) -> int:
+        """
+        :return: The number of turns that can be drawn - turn 0 (the map) to the last turn
+        """
+        return self.arrays.num_turns + 1
+
+    def draw_turn(self, turn: int) -> Image.Image:
+        """
+        :param turn: 0 for the initial map, t for the state after t turns
+        :return: Palette image of the turn
+        """
+        arrays = self.arrays
+        image = Image.new("P", (self.size, self.size + self.header_height), BACKGROUND)
+        image.putpalette(_FLAT_PALETTE)
+        draw = ImageDraw.Draw(image)
+
+        player_ships = get_player_ships(arrays)[turn]
+        draw.text((6, 4), f"turn {turn}", fill=TEXT, font=self.font)
+        draw.text((self.size // 3, 4), f"player 1: {player_ships[0]}", fill=PLAYER_1, font=self.font)
+        draw.text((2 * self.size // 3, 4), f"player 2: {player_ships[1]}", fill=PLAYER_2, font=self.font)
+
+        # The fleets in flight after the turn, at the part of the trip they made
+        fleets = arrays.fleets
+        in_flight = (turn >= 1) & (fleets["launch_turn"] <= turn) & (
+            (fleets["arrival_turn"] > turn) | (fleets["arrival_turn"] < 0)
+        )
+        fleets = fleets[in_flight]
+        trip_length = np.maximum(fleets["total_trip_length"], 1)
+        progress = np.clip((turn - fleets["launch_turn"] + 1) / trip_length, 0, 1)
+        progress = np.where(fleets["total_trip_length"] > 0, progress, 0)
+        source, destination = fleets["source_planet_id"], fleets["destination_planet_id"]
+        fleet_x = self.planet_x[source] + (self.planet_x[destination] - self.planet_x[source]) * progress
+        fleet_y = self.planet_y[source] + (self.planet_y[destination] - self.planet_y[source]) * progress
+        fleet_radius = max(self.size * 0.006, 1.5)
+        for x, y, owner in zip(fleet_x.tolist(), fleet_y.tolist(), fleets["owner"].tolist()):
+            draw.ellipse(
+                (x - fleet_radius, y - fleet_radius, x + fleet_radius, y + fleet_radius), fill=int(_OWNER_COLORS[owner])
+            )
+
+        colors = _OWNER_COLORS[arrays.owners[turn]].tolist()
+        for x, y, radius, color, ships in zip(
+                self.planet_x.tolist(), self.planet_y.tolist(), self.planet_radius.tolist(), colors,
+                arrays.ships[turn].tolist()
+        ):
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+            if self.show_ships:
+                draw.text((x, y), str(ships), fill=TEXT, font=self.font, anchor="mm")
+        return image
+
+    def draw_turns(self, turns: Optional[Iterable[int]] = None, every: int = 1) -> List[Image.Image]:
+        """
+        :param turns: The turns to draw, default every `every` turns from 0 and the last turn
+        :return: The images of the turns
+        """
+        if turns is None:
+            turns = list(range(0, self.num_frames, every))
+            if turns[-1] != self.num_frames - 1:
+                turns.append(self.num_frames - 1)
+        return [self.draw_turn(turn) for turn in turns]
+
+    def save_frames(self, output_dir: str, every: int = 1) -> List[str]:
+        """
+        Save the turns as PNG files turn_0000.png, turn_0001.png... in output_dir
+        :return: The paths of the files
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        paths = []
+        for turn in range(0, self.num_frames, every):
+            path = os.path.join(output_dir, f"turn_{turn:04d}.png")
+            self.draw_turn(turn).save(path)
+            paths.append(path)
+        return paths
+
+    def save_gif(self, path: str, every: int = 2, frame_duration: int = 60):
+        """
+        Save an animated GIF of the game
+        :param every: Draw one of every `every` turns
+        :param frame_duration: Milliseconds per frame. The last frame is shown longer.
+        """
+        frames = self.draw_turns(every=every)
+        durations = [frame_duration] * (len(frames) - 1) + [frame_duration * 20]
+        frames[0].save(path, save_all=True, append_images=frames[1:], duration=durations, loop=0, optimize=False)
+
+    def save_thumbnail(self, path: str, turn: Optional[int] = None):
+        """
+        Save a PNG of one turn, default the last turn
+        """
+        self.draw_turn(self.num_frames - 1 if turn is None else turn).save(path)
+
+
+def render_replay(replay: Replay, path: str, kind: str = GIF, size: int = 480, every: int = 2) -> str:
+    """
+    :param replay: The replay text or an encoded replay
+    :param path: The output - a GIF or PNG file, or a directory for the frames
+    :param kind: GIF, FRAMES or THUMBNAIL (the last turn)
+    :param size: The size of the map part of the images, in pixels
+    :param every: Draw one of every `every` turns (GIF and FRAMES)
+    :return: The output path
+    """
+    renderer = ReplayRenderer(replay, size=size, show_ships=kind != THUMBNAIL or size >= 320)
+    if kind == GIF:
+        renderer.save_gif(path, every=every)
+    elif kind == FRAMES:
+        renderer.save_frames(path, every=every)
+    elif kind == THUMBNAIL:
+        renderer.save_thumbnail(path)
+    else:
+        raise ValueError(f"unknown kind {kind}, use one of {[GIF, FRAMES, THUMBNAIL]}")
+    return path
+
+
+def _render_replay_task(args: Tuple[Replay, str, str, int, int]) -> str:
+    return render_replay(*args)
+
+
+def render_replays(
+        replays: Sequence[Replay],
+        output_dir: str,
+        names: Optional[Sequence[str]] = None,
+        kind: str = THUMBNAIL,
+        size: int = 240,
+        every: int = 2,
+        num_workers: Optional[int] = None,
+        mp_context: Optional[multiprocessing.context.BaseContext] = None
+) -> List[str]:
+    """
+    Render many replays in worker processes
+    :param replays: The replays texts or encoded replays
+    :param output_dir: The directory of the outputs
+    :param names: The names of the outputs (without extension), default battle_0, battle_1...
+    :param kind: GIF, FRAMES or THUMBNAIL, see render_replay
+    :param num_workers: Number of worker processes, default the number of cores. 0 to render in this process.
+    :return: The output paths, in the order of the given replays
+    """
+    if kind not in (GIF, FRAMES, THUMBNAIL):
+        raise ValueError(f"unknown kind {kind}, use one of {[GIF, FRAMES, THUMBNAIL]}")
+    os.makedirs(output_dir, exist_ok=True)
+    if names is None:
+        names = [f"battle_{index}" for index in range(len(replays))]
+    extension = {GIF: ".gif", THUMBNAIL: ".png", FRAMES: ""}[kind]
+    tasks = [
+        (replay, os.path.join(output_dir, name + extension), kind, size, every) for replay, name in zip(replays, names)
+    ]
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if num_workers == 0 or len(tasks) <= 1:
+        return [_render_replay_task(task) for task in tasks]
+    mp_context = mp_context or multiprocessing.get_context()
+    with mp_context.Pool(num_workers) as pool:
+        return pool.map(_render_replay_task, tasks)
@@ -1,20 +1,62 @@
 import os
+from typing import List, Optional
 
 import pandas as pd
+import pyarrow.parquet as pq
 
 from planet_wars import PLANET_WARS_MODULE_PATH
 from planet_wars.battles.tournament import Tournament
+from planet_wars.replays.analysis import decode_replays_arrays, summarize_replays
 
+# The replay column - much bigger than all the other columns, read only when a battle is viewed
+REPLAY_COLUMN = "description_for_display"
+# Rows per parquet row group when saving battle results - reading a battle's replay reads only its row group
+BATTLE_RESULTS_ROW_GROUP_SIZE = 64
 
-def get_battle_results_df(round_id: int):
+
+def get_battle_results_path(round_id: int) -> str:
+    return os.path.join(PLANET_WARS_MODULE_PATH, "rounds", f"round{round_id}", "battle_results_df.parquet")
+
+
+def get_battle_results_df(round_id: int, columns: Optional[List[str]] = None, with_replays: bool = False):
     """
-    Get the round battle results data frame
+    Get the round battle results data frame. By default without the replays column - use view_battle or
+    get_battle_description to read the replay of a battle.
     :param round_id: The id of the round 1/2/3
+    :param columns: The columns to read, default all the columns (the battle id index is always read)
+    :param with_replays: If True read also the replays column (when columns isn't given)
     :return: The battle_results_df
     """
-    return pd.read_parquet(
-        os.path.join(PLANET_WARS_MODULE_PATH, "rounds", f"round{round_id}", "battle_results_df.parquet")
+    path = get_battle_results_path(round_id)
+    if columns is None:
+        columns = [name for name in pq.read_schema(path).names if with_replays or name != REPLAY_COLUMN]
+    df = pd.read_parquet(path, columns=columns)
+    df.attrs["round_id"] = round_id
+    return df
+
+
+def get_battle_description(round_id: int, battle_id: int) -> str:
+    """
+    Read the replay of one battle - only the replay column, and only the row groups that may have the battle (by the
+    battle id statistics of the row groups)
+    :param round_id: The id of the round 1/2/3
+    :param battle_id: The id of the battle
+    :return: The battle description for display
+    """
+    table = pq.read_table(
+        get_battle_results_path(round_id), columns=[REPLAY_COLUMN], filters=[("battle_id", "==", battle_id)]
     )
+    if table.num_rows == 0:
+        raise KeyError(f"battle {battle_id} is not in round {round_id}")
+    return table.column(REPLAY_COLUMN)[0].as_py()
+
+
+def save_battle_results_df(battle_results_df: pd.DataFrame, path: str):
+    """
+    Save battle results (see Tournament.get_battle_results_data_frame) so get_battle_description reads a battle's
+    replay from a small row group
+    """
+    battle_results_df.sort_index().to_parquet(path, row_group_size=BATTLE_RESULTS_ROW_GROUP_SIZE)
 
 
 def get_player_results_df(round_id: int):
@@ -28,6 +70,37 @@ def get_player_results_df(round_id: int):
     )
 
 
+def get_round_summary_df(round_id: int, num_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Decode the replays of all the battles of the round and summarize each battle (see replays.analysis)
+    :param round_id: The id of the round 1/2/3
+    :param num_workers: Number of worker processes decoding the replays, default the number of cores
+    :return: Data frame of the summaries, indexed by the battle id
+    """
+    df = get_battle_results_df(round_id, columns=[REPLAY_COLUMN])
+    arrays = decode_replays_arrays(list(df[REPLAY_COLUMN]), num_workers=num_workers)
+    return summarize_replays(arrays, index=df.index)
+
+
+def render_round(
+        round_id: int, output_dir: str, kind: str = "thumbnail", num_workers: Optional[int] = None
+) -> List[str]:
+    """
+    Render the replays of all the battles of the round (see replays.render), for example thumbnails to publish
+    :param round_id: The id of the round 1/2/3
+    :param output_dir: The directory of the outputs, named battle_<battle id>
+    :param kind: "thumbnail" (a PNG of the last turn), "gif" or "frames" (a directory of PNGs per battle)
+    :param num_workers: Number of worker processes rendering the replays, default the number of cores
+    :return: The output paths, in the order of the battle ids
+    """
+    # Pillow is needed only for rendering
+    from planet_wars.replays.render import render_replays
+
+    df = get_battle_results_df(round_id, columns=[REPLAY_COLUMN])
+    names = [f"battle_{battle_id}" for battle_id in df.index]
+    return render_replays(list(df[REPLAY_COLUMN]), output_dir, names=names, kind=kind, num_workers=num_workers)
+
+
 def print_df(df: pd.DataFrame):
     """
     Print the given data frame
@@ -40,13 +113,26 @@ def print_df(df: pd.DataFrame):
     print(df)
 
 
-def view_battle(battle_results_df: pd.DataFrame, battle_id: int):
+def view_battle(battle_results_df: pd.DataFrame, battle_id: int, round_id: Optional[int] = None):
     """
     View the battle with the given battle id
-    :param battle_results_df: The data frame with details on all the battle
+    :param battle_results_df: The data frame with details on all the battle. If it was read without the replays
+                              column (see get_battle_results_df) the replay of the battle is read from the round file.
     :param battle_id: The id of the battle to view
+    :param round_id: The round of the battles, to read the replay from when the data frame has no replays column.
+                     Default the round get_battle_results_df read the data frame from.
     """
-    battle_description = battle_results_df.loc[battle_id]['description_for_display']
+    if REPLAY_COLUMN in battle_results_df.columns:
+        battle_description = battle_results_df.loc[battle_id][REPLAY_COLUMN]
+    else:
+        if round_id is None:
+            round_id = battle_results_df.attrs.get("round_id")
+        if round_id is None:
+            raise ValueError(
+                f"The battle results have no {REPLAY_COLUMN} column and no round id - pass round_id, or read the "
+                "battle results with get_battle_results_df"
+            )
+        battle_description = get_battle_description(round_id, battle_id)
     Tournament.view_battle_given_battle_description(battle_description)
 
 
@@ -0,0 +1,61 @@
+"""
+Fixed shape features of a game position, for training evaluation functions.
+
+A position is a game state from the perspective of the player to move (the player is always player 1, like in
+play_turn). The planets axis is padded to max_planets (padding planets have mask False, owner 0 and no ships):
+    owners      (max_planets,) int8 - 0 neutral, 1 me, 2 enemy
+    ships       (max_planets,) int32
+    growth      (max_planets,) int16
+    arrivals    (max_planets, arrival_horizon, 2) int32 - the ships arriving at each planet in 1..arrival_horizon turns,
+                of me [..., 0] and of the enemy [..., 1]. Fleets arriving later are counted in the last turn.
+    planet_mask (max_planets,) bool
+The distance matrix of the map (max_planets, max_planets) int16 is the same in all the positions of a game, see
+get_distance_features.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from planet_wars.planet_wars import PlanetWars
+
+
+def get_position_features(game: PlanetWars, max_planets: int, arrival_horizon: int) -> Dict[str, np.ndarray]:
+    """
+    :param game: The game state from the perspective of the player to move
+    :param max_planets: The size of the planets axis
+    :param arrival_horizon: The number of turns of the arrivals
+    :return: The position features (see the module doc)
+    """
+    planets = game.get_planets_array()
+    fleets = game.get_fleets_array()
+    num_planets = len(planets)
+    assert num_planets <= max_planets, f"the map has {num_planets} planets, more than max_planets {max_planets}"
+
+    owners = np.zeros(max_planets, dtype=np.int8)
+    ships = np.zeros(max_planets, dtype=np.int32)
+    growth = np.zeros(max_planets, dtype=np.int16)
+    owners[:num_planets] = planets["owner"]
+    ships[:num_planets] = planets["num_ships"]
+    growth[:num_planets] = planets["growth_rate"]
+    planet_mask = np.zeros(max_planets, dtype=bool)
+    planet_mask[:num_planets] = True
+
+    arrivals = np.zeros((max_planets, arrival_horizon, 2), dtype=np.int32)
+    if len(fleets) > 0:
+        arrival_turns = np.clip(fleets["turns_remaining"], 1, arrival_horizon) - 1
+        np.add.at(
+            arrivals, (fleets["destination_planet_id"], arrival_turns, fleets["owner"] - 1), fleets["num_ships"]
+        )
+
+    return {"owners": owners, "ships": ships, "growth": growth, "arrivals": arrivals, "planet_mask": planet_mask}
+
+
+def get_distance_features(game: PlanetWars, max_planets: int) -> np.ndarray:
+    """
+    :return: The distance matrix of the map (see PlanetWars.get_distance_matrix) padded to (max_planets, max_planets)
+    """
+    distances = game.get_distance_matrix()
+    padded = np.zeros((max_planets, max_planets), dtype=np.int16)
+    padded[:len(distances), :len(distances)] = distances
+    return padded
@@ -0,0 +1,350 @@
+"""
+Self-play data generation - run many games in parallel and write every position with the orders played in it and
+the final outcome, as training data for learned evaluation functions.
+
+The games are split into tasks of games_per_task games, run on a pool of worker processes. Each task writes its
+positions to its own compressed .npz shards (np.savez_compressed) of about shard_size positions, and nothing but the
+shard names comes back to the main process. A game is never split between shards, so the memory of a worker is bounded
+by the larger of shard_size positions and the positions of one game (up to 2 * GameManager.MAX_TURNS).
+
+Shard arrays, for N positions of G games (see features for the position features):
+    owners, ships, growth, arrivals, planet_mask - (N, ...) position features
+    turn (N,) int16, player (N,) int8 - the turn and which player (1 or 2) is to move in the position
+    outcome (N,) int8 - the result of the game for the player to move: 1 win, 0 tie, -1 loss
+    game_index (N,) int32 - the game of each position, an index into the per game arrays
+    order_offsets (N + 1,) int64, orders (M, 3) int32 - the orders (source, destination, ships) played in position i
+                                                        are orders[order_offsets[i]:order_offsets[i + 1]]
+    distances (G, max_planets, max_planets) int16, map_id (G,) int32, players (G, 2) str - per game
+The output directory also gets manifest.json with the shards, their number of positions and the features shape.
+"""
+
+import copy
+import json
+import multiprocessing
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.engine.map_library import get_map_library
+from planet_wars.planet_wars import Player, PlanetWars, Order, TurnDelta
+from planet_wars.self_play.features import get_distance_features, get_position_features
+
+POSITION_FEATURES = ["owners", "ships", "growth", "arrivals", "planet_mask"]
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def _get_player_name(player: Player) -> str:
+    return player.NAME if player.NAME != Player.NAME else player.__class__.__name__
+
+
+class RecordingPlayer(Player):
+    """
+    Wraps a bot and records the features of each position it plays and the orders it plays in it
+    """
+
+    def __init__(self, player: Player, max_planets: int, arrival_horizon: int):
+        self.player = player
+        self.max_planets = max_planets
+        self.arrival_horizon = arrival_horizon
+        self.RECEIVES_STATE_DELTAS = player.RECEIVES_STATE_DELTAS
+        self.NAME = _get_player_name(player)
+        self.positions: List[Dict[str, np.ndarray]] = []
+        self.turns: List[int] = []
+        self.orders: List[List[Tuple[int, int, int]]] = []
+
+    def new_game_has_started(self, game: PlanetWars):
+        self.player.new_game_has_started(game)
+
+    def observe_turn_delta(self, delta: TurnDelta) -> PlanetWars:
+        return self.player.observe_turn_delta(delta)
+
+    def play_turn(self, game: PlanetWars) -> Iterable[Order]:
+        # The features are taken before the bot plays, in case it changes the game object
+        position = get_position_features(game, self.max_planets, self.arrival_horizon)
+        orders = self.player.play_turn(game)
+        if orders is None:
+            orders = []
+        elif isinstance(orders, Order):
+            orders = [orders]
+        else:
+            orders = list(orders)
+        self.positions.append(position)
+        self.turns.append(game.turns)
+        self.orders.append([
+            (order.source_planet_id, order.destination_planet_id, int(order.num_ships))
+            for order in orders if isinstance(order, Order)
+        ])
+        return orders
+
+
+class ShardWriter:
+    """
+    Buffers the positions of games and writes them to .npz shards of at most shard_size positions. A game is never
+    split between shards, so a shard may be smaller - or bigger when a single game has more than shard_size positions,
+    then the shard has only that game.
+    """
+
+    def __init__(self, output_dir: str, name_prefix: str, shard_size: int):
+        self.output_dir = output_dir
+        self.name_prefix = name_prefix
+        self.shard_size = shard_size
+        # (shard file name, number of positions) of the written shards
+        self.shards: List[Tuple[str, int]] = []
+        self._clear()
+
+    def _clear(self):
+        self._positions: Dict[str, List[np.ndarray]] = {name: [] for name in POSITION_FEATURES}
+        self._turn: List[int] = []
+        self._player: List[int] = []
+        self._outcome: List[int] = []
+        self._game_index: List[int] = []
+        self._order_counts: List[int] = []
+        self._orders: List[Tuple[int, int, int]] = []
+        self._distances: List[np.ndarray] = []
+        self._map_id: List[int] = []
+        self._players: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._turn)
+
+    def add_game(
+            self, map_id: int, distances: np.ndarray, player_names: Tuple[str, str],
+            recorders: List[Tuple[int, RecordingPlayer]], finish_state: str
+    ):
+        """
+        :param recorders: (player number, the RecordingPlayer of the player) of the recorded players
+        :param finish_state: The game finish state (see GameManager)
+        """
+        num_positions = sum(len(recorder.turns) for _, recorder in recorders)
+        if len(self) > 0 and len(self) + num_positions > self.shard_size:
+            self.flush()
+
+        game_index = len(self._map_id)
+        self._map_id.append(map_id)
+        self._distances.append(distances)
+        self._players.append(player_names)
+        for player_num, recorder in recorders:
+            outcome = _get_outcome(finish_state, player_num)
+            for position, turn, orders in zip(recorder.positions, recorder.turns, recorder.orders):
+                for name in POSITION_FEATURES:
+                    self._positions[name].append(position[name])
+                self._turn.append(turn)
+                self._player.append(player_num)
+                self._outcome.append(outcome)
+                self._game_index.append(game_index)
+                self._order_counts.append(len(orders))
+                self._orders.extend(orders)
+
+    def flush(self):
+        """
+        Write the buffered positions to a new shard
+        """
+        if len(self) == 0:
+            return
+        arrays = {name: np.stack(values) for name, values in self._positions.items()}
+        arrays["turn"] = np.array(self._turn, dtype=np.int16)
+        arrays["player"] = np.array(self._player, dtype=np.int8)
+        arrays["outcome"] = np.array(self._outcome, dtype=np.int8)
+        arrays["game_index"] = np.array(self._game_index, dtype=np.int32)
+        arrays["order_offsets"] = np.concatenate([[0], np.cumsum(self._order_counts)]).astype(np.int64)
+        arrays["orders"] = np.array(self._orders, dtype=np.int32).reshape(-1, 3)
+        arrays["distances"] = np.stack(self._distances)
+        arrays["map_id"] = np.array(self._map_id, dtype=np.int32)
+        arrays["players"] = np.array(self._players, dtype=np.str_).reshape(-1, 2)
+
+        file_name = f"{self.name_prefix}-{len(self.shards):03d}.npz"
+        temp_path = os.path.join(self.output_dir, file_name + ".tmp")
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temp_path, os.path.join(self.output_dir, file_name))
+        self.shards.append((file_name, len(self)))
+        self._clear()
+
+
+def _get_outcome(finish_state: str, player_num: int) -> int:
+    if finish_state == GameManager.TIE_STATE:
+        return 0
+    winner = 1 if finish_state == GameManager.PLAYER_1_WIN_STATE else 2
+    return 1 if winner == player_num else -1
+
+
+@dataclass
+class SelfPlayConfig:
+    output_dir: str
+    players: List[Player]
+    max_planets: int
+    arrival_horizon: int
+    shard_size: int
+    record_player_2: bool
+
+
+@dataclass
+class SelfPlayReport:
+    num_games: int
+    num_positions: int
+    seconds: float
+    shards: List[Tuple[str, int]] = field(default_factory=list)
+
+    @property
+    def positions_per_hour(self) -> float:
+        return self.num_positions / max(self.seconds, 1e-9) * 3600
+
+
+# The config of the self play in a worker process, set by _init_worker
+_worker_config: Optional[SelfPlayConfig] = None
+
+
+def _init_worker(config: SelfPlayConfig):
+    global _worker_config
+    _worker_config = config
+
+
+def play_recorded_game(
+        config: SelfPlayConfig, game: PlanetWars, player_1: Player, player_2: Player
+) -> Tuple[str, List[Tuple[int, RecordingPlayer]]]:
+    """
+    Play a game with the given bots, recording the positions of player 1 (and of player 2 if record_player_2)
+    :return: The finish state, and (player number, RecordingPlayer) of the recorded players
+    """
+    recorders = [(1, RecordingPlayer(player_1, config.max_planets, config.arrival_horizon))]
+    if config.record_player_2:
+        recorders.append((2, RecordingPlayer(player_2, config.max_planets, config.arrival_horizon)))
+    else:
+        recorders.append((2, player_2))
+    game_manager = GameManager(game, recorders[0][1], recorders[1][1], record_display=False)
+    state = GameManager.IN_GAME_STATE
+    while state == GameManager.IN_GAME_STATE:
+        state = game_manager.make_turn()
+    return state, [(player_num, player) for player_num, player in recorders if isinstance(player, RecordingPlayer)]
+
+
+def run_self_play_task(task_index: int, games: List[Tuple[int, int, int]]) -> Tuple[int, int, List[Tuple[str, int]]]:
+    """
+    Run the given games in a worker and write their positions to the task's shards
+    :param games: (map id, player 1 index, player 2 index) of each game
+    :return: The number of games, the number of positions and the written (shard file name, number of positions)
+    """
+    config = _worker_config
+    writer = ShardWriter(config.output_dir, f"shard-{task_index:05d}", config.shard_size)
+    num_positions = 0
+    for map_id, player_1_index, player_2_index in games:
+        game = get_map_library().get_map(map_id)
+        # Each game gets its own copies of the bots, so bots keeping per game state can play both sides
+        player_1 = copy.deepcopy(config.players[player_1_index])
+        player_2 = copy.deepcopy(config.players[player_2_index])
+        state, recorders = play_recorded_game(config, game, player_1, player_2)
+        writer.add_game(
+            map_id, get_distance_features(game, config.max_planets),
+            (_get_player_name(player_1), _get_player_name(player_2)), recorders, state
+        )
+        num_positions += sum(len(recorder.turns) for _, recorder in recorders)
+    writer.flush()
+    return len(games), num_positions, writer.shards
+
+
+def _run_self_play_task(args: Tuple[int, List[Tuple[int, int, int]]]):
+    return run_self_play_task(*args)
+
+
+def run_self_play(
+        output_dir: str,
+        players: List[Player],
+        num_games: int,
+        map_ids: Optional[List[int]] = None,
+        num_workers: Optional[int] = None,
+        games_per_task: int = 32,
+        shard_size: int = 16384,
+        max_planets: Optional[int] = None,
+        arrival_horizon: int = 16,
+        record_player_2: bool = True,
+        seed: int = 0,
+        mp_context: Optional[multiprocessing.context.BaseContext] = None
+) -> SelfPlayReport:
+    """
+    Run self-play games and write their positions to shards in output_dir (see the module doc).
+    Each game is on a random map of map_ids, between two random bots of players (possibly the same bot).
+    :param players: The bots. They are sent to the workers, and copied for each game.
+    :param num_games: The number of games
+    :param map_ids: The maps to play on (from the map library), default all the maps
+    :param num_workers: Number of worker processes, default the number of cores. 0 to run in this process.
+    :param games_per_task: Number of games in each task given to a worker
+    :param shard_size: Maximal number of positions in a shard, except shards of a single game with more positions
+    :param max_planets: The size of the planets axis of the features, default the most planets in the maps
+    :param arrival_horizon: The number of turns of the arrivals feature
+    :param record_player_2: If True the positions of both players are recorded, otherwise only of player 1
+    :param seed: Seed of the maps and bots choice
+    :return: The report of the run
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    map_library = get_map_library()
+    if map_ids is None:
+        map_ids = list(range(1, len(map_library) + 1))
+    if max_planets is None:
+        max_planets = max(len(map_library.get_map_arrays(map_id)[0]) for map_id in map_ids)
+    config = SelfPlayConfig(output_dir, players, max_planets, arrival_horizon, shard_size, record_player_2)
+
+    rng = random.Random(seed)
+    games = [
+        (rng.choice(map_ids), rng.randrange(len(players)), rng.randrange(len(players))) for _ in range(num_games)
+    ]
+    tasks = [
+        (task_index, games[game_start:game_start + games_per_task])
+        for task_index, game_start in enumerate(range(0, num_games, games_per_task))
+    ]
+
+    report = SelfPlayReport(num_games=0, num_positions=0, seconds=0.0)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if num_workers == 0:
+        _init_worker(config)
+        results = map(_run_self_play_task, tasks)
+        _collect_results(report, results)
+    else:
+        mp_context = mp_context or multiprocessing.get_context()
+        with mp_context.Pool(num_workers, initializer=_init_worker, initargs=(config,)) as pool:
+            _collect_results(report, pool.imap_unordered(_run_self_play_task, tasks))
+
+    report.shards.sort()
+    report.seconds = time.perf_counter() - start
+    with open(os.path.join(output_dir, MANIFEST_FILE_NAME), "w") as f:
+        json.dump({
+            "shards": [
+                {"file": file_name, "num_positions": num_positions} for file_name, num_positions in report.shards
+            ],
+            "num_games": report.num_games,
+            "num_positions": report.num_positions,
+            "max_planets": max_planets,
+            "arrival_horizon": arrival_horizon
+        }, f, indent=2)
+    return report
+
+
+def _collect_results(report: SelfPlayReport, results: Iterable[Tuple[int, int, List[Tuple[str, int]]]]):
+    for num_games, num_positions, shards in results:
+        report.num_games += num_games
+        report.num_positions += num_positions
+        report.shards.extend(shards)
+
+
+def load_shard(path: str) -> Dict[str, np.ndarray]:
+    """
+    :return: The arrays of the shard (see the module doc)
+    """
+    with np.load(path) as shard:
+        return {name: shard[name] for name in shard.files}
+
+
+def iter_shards(output_dir: str) -> Iterable[Dict[str, np.ndarray]]:
+    """
+    :return: The arrays of each shard listed in the manifest of the output directory, one shard at a time
+    """
+    with open(os.path.join(output_dir, MANIFEST_FILE_NAME)) as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        yield load_shard(os.path.join(output_dir, shard["file"]))
@@ -0,0 +1,142 @@
+from math import floor, sqrt
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class GridIndex:
+    """
+    Uniform grid spatial index over points in the plane.
+    Each point is kept in the cell that contains it, so radius and nearest neighbour queries only look at the cells
+    around the query point instead of at all the points.
+    Points are referenced by an integer index (for example the planet index in PlanetWars.planets).
+    """
+
+    def __init__(self, cell_size: float):
+        """
+        :param cell_size: The side of a grid cell. Queries are fastest when the cell size is close to the typical
+                          query radius / distance between neighbouring points.
+        """
+        assert cell_size > 0, "cell_size must be positive"
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        self.xs: List[float] = []
+        self.ys: List[float] = []
+        self.min_cell = None
+        self.max_cell = None
+
+    @staticmethod
+    def from_points(xs: Iterable[float], ys: Iterable[float], cell_size: Optional[float] = None) -> "GridIndex":
+        """
+        Build an index over the given points. Point i is referenced by index i.
+        :param cell_size: The grid cell side. Default is chosen so there is about one point per cell.
+        """
+        xs = list(xs)
+        ys = list(ys)
+        if cell_size is None:
+            width = (max(xs) - min(xs)) if xs else 1
+            height = (max(ys) - min(ys)) if ys else 1
+            cell_size = max(sqrt(max(width * height, 1) / max(len(xs), 1)), 1e-6)
+        index = GridIndex(cell_size)
+        for x, y in zip(xs, ys):
+            index.add(x, y)
+        return index
+
+    def __len__(self):
+        return len(self.xs)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def add(self, x: float, y: float) -> int:
+        """
+        Add a point to the index.
+        :return: The index of the added point
+        """
+        i = len(self.xs)
+        self.xs.append(x)
+        self.ys.append(y)
+        cell = self._cell(x, y)
+        self.cells.setdefault(cell, []).append(i)
+        if self.min_cell is None:
+            self.min_cell = cell
+            self.max_cell = cell
+        else:
+            self.min_cell = (min(self.min_cell[0], cell[0]), min(self.min_cell[1], cell[1]))
+            self.max_cell = (max(self.max_cell[0], cell[0]), max(self.max_cell[1], cell[1]))
+        return i
+
+    def query_radius(self, x: float, y: float, radius: float) -> List[int]:
+        """
+        :return: The indices of all the points with distance <= radius from (x, y)
+        """
+        if not self.xs:
+            return []
+        cx_min, cy_min = self._cell(x - radius, y - radius)
+        cx_max, cy_max = self._cell(x + radius, y + radius)
+        cx_min, cy_min = max(cx_min, self.min_cell[0]), max(cy_min, self.min_cell[1])
+        cx_max, cy_max = min(cx_max, self.max_cell[0]), min(cy_max, self.max_cell[1])
+        radius_squared = radius * radius
+        result = []
+        for cx in range(cx_min, cx_max + 1):
+            for cy in range(cy_min, cy_max + 1):
+                for i in self.cells.get((cx, cy), ()):
+                    dx = self.xs[i] - x
+                    dy = self.ys[i] - y
+                    if dx * dx + dy * dy <= radius_squared:
+                        result.append(i)
+        return result
+
+    def nearest(
+            self, x: float, y: float, accept: Optional[Callable[[int], bool]] = None,
+            max_radius: Optional[float] = None
+    ) -> Optional[int]:
+        """
+        Find the closest point to (x, y). Searches rings of cells around the query point, from the inside out, and
+        stops as soon as no unsearched cell can contain a closer point.
+
+        :param accept: Optional filter - only points for which accept(index) is True are considered
+        :param max_radius: If given only points within this distance are considered
+        :return: The index of the closest point, None if there is no such point
+        """
+        if not self.xs:
+            return None
+        cx, cy = self._cell(x, y)
+        max_ring = max(
+            abs(cx - self.min_cell[0]), abs(cx - self.max_cell[0]),
+            abs(cy - self.min_cell[1]), abs(cy - self.max_cell[1])
+        )
+        if max_radius is not None:
+            max_ring = min(max_ring, int(max_radius / self.cell_size) + 1)
+
+        best = None
+        best_distance_squared = float("inf") if max_radius is None else max_radius * max_radius
+        for ring in range(max_ring + 1):
+            # every point in this ring (or farther) is at least (ring - 1) * cell_size away
+            if ring > 0 and ((ring - 1) * self.cell_size) ** 2 > best_distance_squared:
+                break
+            for cell in self._ring_cells(cx, cy, ring):
+                for i in self.cells.get(cell, ()):
+                    dx = self.xs[i] - x
+                    dy = self.ys[i] - y
+                    distance_squared = dx * dx + dy * dy
+                    closer = distance_squared < best_distance_squared or (
+                        distance_squared == best_distance_squared and (best is None or i < best)
+                    )
+                    if closer and (accept is None or accept(i)):
+                        best = i
+                        best_distance_squared = distance_squared
+        return best
+
+    @staticmethod
+    def _ring_cells(cx: int, cy: int, ring: int) -> Iterable[Tuple[int, int]]:
+        """
+        :return: The cells at Chebyshev distance exactly 'ring' from the cell (cx, cy)
+        """
+        if ring == 0:
+            yield cx, cy
+            return
+        for dx in range(-ring, ring + 1):
+            yield cx + dx, cy - ring
+            yield cx + dx, cy + ring
+        for dy in range(-ring + 1, ring):
+            yield cx - ring, cy + dy
+            yield cx + ring, cy + dy
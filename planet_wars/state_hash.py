@@ -0,0 +1,129 @@
+"""
+Zobrist style hashing of the game state - the planets owners and ships, the fleets in flight and the turn.
+
+The state hash is the sum (mod 2^64) of a 64 bit hash of each planet, a 64 bit hash of each fleet and a hash of the
+turn. Because it is a sum it can be updated incrementally: when something changes, subtract the hash of the old value
+and add the hash of the new one. Fleets are hashed with their absolute arrival turn (turn + turns_remaining), so a
+fleet's hash doesn't change while it flies - it is added when the fleet is launched and subtracted when it lands.
+
+Equal states always have equal hashes, different states have different hashes with probability of about 1 - 2^-64.
+"""
+
+import numpy as np
+
+_MASK = (1 << 64) - 1
+_PLANET_TAG = 0x9E3779B97F4A7C15
+_FLEET_TAG = 0xC2B2AE3D27D4EB4F
+_TURN_TAG = 0x165667B19E3779F9
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """
+    The splitmix64 finalizer - a bijection on uint64 that spreads every input bit over all the output bits
+    """
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _hash_columns(tag: int, *columns: np.ndarray) -> np.ndarray:
+    """
+    :return: The hash of each row of the given integer columns
+    """
+    h = np.full(len(columns[0]), tag, dtype=np.uint64)
+    for column in columns:
+        h = _mix(h ^ np.asarray(column).astype(np.int64).astype(np.uint64))
+    return h
+
+
+def planets_hashes(planet_ids: np.ndarray, owners: np.ndarray, num_ships: np.ndarray) -> np.ndarray:
+    """
+    :return: The hash of each planet state
+    """
+    return _hash_columns(_PLANET_TAG, planet_ids, owners, num_ships)
+
+
+def fleets_hashes(
+        owners: np.ndarray, num_ships: np.ndarray, source_planet_ids: np.ndarray, destination_planet_ids: np.ndarray,
+        total_trip_lengths: np.ndarray, arrival_turns: np.ndarray
+) -> np.ndarray:
+    """
+    :return: The hash of each fleet. arrival_turns are absolute - turn + turns_remaining.
+    """
+    return _hash_columns(
+        _FLEET_TAG, owners, num_ships, source_planet_ids, destination_planet_ids, total_trip_lengths, arrival_turns
+    )
+
+
+def _mix_int(x: int) -> int:
+    """
+    _mix of a single python int, faster than numpy for one value
+    """
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+def fleet_hash(
+        owner: int, num_ships: int, source_planet_id: int, destination_planet_id: int, total_trip_length: int,
+        arrival_turn: int
+) -> int:
+    """
+    :return: The hash of one fleet, the same as fleets_hashes gives
+    """
+    h = _FLEET_TAG
+    for value in (owner, num_ships, source_planet_id, destination_planet_id, total_trip_length, arrival_turn):
+        h = _mix_int(h ^ (int(value) & _MASK))
+    return h
+
+
+def turn_hash(turn: int) -> int:
+    return _mix_int(_TURN_TAG ^ (turn & _MASK))
+
+
+def sum_hashes(hashes: np.ndarray) -> int:
+    """
+    :return: The sum of the given hashes mod 2^64
+    """
+    return int(np.sum(hashes, dtype=np.uint64))
+
+
+def planets_hash(planets: np.ndarray) -> int:
+    """
+    :param planets: Planets array (see PlanetWars.get_planets_array)
+    :return: The hash of all the planets
+    """
+    return sum_hashes(planets_hashes(planets["planet_id"], planets["owner"], planets["num_ships"]))
+
+
+def fleets_hash(fleets: np.ndarray, turn: int) -> int:
+    """
+    :param fleets: Fleets array (see PlanetWars.get_fleets_array)
+    :param turn: The current turn
+    :return: The hash of all the fleets
+    """
+    return sum_hashes(fleets_hashes(
+        fleets["owner"], fleets["num_ships"], fleets["source_planet_id"], fleets["destination_planet_id"],
+        fleets["total_trip_length"], turn + fleets["turns_remaining"]
+    ))
+
+
+def switched_owners(owners: np.ndarray) -> np.ndarray:
+    """
+    :return: The owners from the perspective of the other player - player 1 and player 2 switched
+    """
+    return np.where(owners == 0, owners, 3 - owners)
+
+
+def state_hash(planets: np.ndarray, fleets: np.ndarray, turn: int) -> int:
+    """
+    :return: The hash of the game state with the given planets and fleets arrays in the given turn
+    """
+    return (planets_hash(planets) + fleets_hash(fleets, turn) + turn_hash(turn)) & _MASK
+
+
+def combine_hashes(*hashes: int) -> int:
+    """
+    :return: The sum of the given hashes mod 2^64 - for example the planets, fleets and turn hashes of a state
+    """
+    return sum(hashes) & _MASK
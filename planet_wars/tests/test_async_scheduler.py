@@ -0,0 +1,102 @@
+import asyncio
+import itertools
+
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.bot_host.worker import RemotePlayerPool
+from planet_wars.engine.async_scheduler import AsyncScheduler
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import Player
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestBot,
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+
+MAP_IDS = [1, 6, 11]
+BOT_CLASSES = [
+    AttackWeakestPlanetFromStrongestBot, AttackEnemyWeakestPlanetFromStrongestBot,
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+]
+GAMES = [
+    (map_id, bot_1, bot_2) for map_id in MAP_IDS for bot_1, bot_2 in itertools.permutations(BOT_CLASSES, 2)
+]
+
+
+def _run_games_one_by_one():
+    results = []
+    for map_id, bot_1, bot_2 in GAMES:
+        game_manager = GameManager(get_map_by_id(map_id), bot_1(), bot_2())
+        results.append((game_manager.run_game(), game_manager.get_description_for_display()))
+    return results
+
+
+def _run_scheduled_games(max_in_flight: int, players=None):
+    """
+    :param players: bot class -> the player to use for it, new in-process bots by default
+    :return: The (finish state, replay) of each game, and the most games that were in flight together
+    """
+    descriptions = {}
+    counts = {"taken": 0, "max_in_flight": 0}
+
+    def new_game_managers():
+        for map_id, bot_1, bot_2 in GAMES:
+            counts["taken"] += 1
+            counts["max_in_flight"] = max(counts["max_in_flight"], counts["taken"] - len(descriptions))
+            if players is None:
+                yield GameManager(get_map_by_id(map_id), bot_1(), bot_2())
+            else:
+                yield GameManager(get_map_by_id(map_id), players[bot_1], players[bot_2])
+
+    def on_game_end(game_index, game_manager, finish_state):
+        descriptions[game_index] = game_manager.get_description_for_display()
+
+    finish_states = AsyncScheduler(max_in_flight).run(new_game_managers(), on_game_end)
+    results = [(finish_state, descriptions[i]) for i, finish_state in enumerate(finish_states)]
+    return results, counts["max_in_flight"]
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 4, 256])
+def test_scheduled_games_match_run_game(max_in_flight):
+    results, most_in_flight = _run_scheduled_games(max_in_flight)
+    assert results == _run_games_one_by_one()
+    # Back-pressure - a game is taken from the iterable only when there is room for it
+    assert most_in_flight == min(max_in_flight, len(GAMES))
+
+
+@pytest.mark.parametrize("thread_fallback", [False, True])
+def test_scheduled_remote_games_match_run_game(monkeypatch, thread_fallback):
+    add_reader_calls = []
+    if thread_fallback:
+        # Like the event loop of Windows, which can't watch pipes - the replies are awaited in threads
+        def add_reader(*args):
+            add_reader_calls.append(args)
+            raise NotImplementedError
+
+        monkeypatch.setattr(asyncio.SelectorEventLoop, "add_reader", add_reader)
+    pools = {bot_class: RemotePlayerPool(bot_class(), 2) for bot_class in BOT_CLASSES}
+    try:
+        results, _ = _run_scheduled_games(4, pools)
+    finally:
+        for pool in pools.values():
+            pool.close()
+    assert results == _run_games_one_by_one()
+    assert bool(add_reader_calls) == thread_fallback
+
+
+class _FailingBot(Player):
+    def play_turn(self, game):
+        raise RuntimeError("bot failed")
+
+
+def test_bot_exception_is_raised():
+    game_managers = [
+        GameManager(get_map_by_id(1), AttackWeakestPlanetFromStrongestBot(), _FailingBot(), raise_bot_exceptions=True)
+    ]
+    with pytest.raises(RuntimeError, match="bot failed"):
+        AsyncScheduler().run(game_managers)
+
+
+def test_bot_exception_loses_the_game():
+    game_managers = [GameManager(get_map_by_id(1), AttackWeakestPlanetFromStrongestBot(), _FailingBot())]
+    assert AsyncScheduler().run(game_managers) == [GameManager.PLAYER_1_WIN_STATE]
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from planet_wars.benchmarks.stress_scenarios import make_stress_scenario
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import Order
+
+
+def _get_random_orders(game_manager: GameManager, player_id: int, rng: random.Random):
+    """
+    Orders of the player mixing valid orders with every kind of invalid order
+    """
+    num_planets = len(game_manager.game.planets)
+    own_planets = [p.planet_id for p in game_manager.game.planets if p.owner == player_id]
+    orders = []
+    for _ in range(rng.randint(0, 60)):
+        source = rng.choice(own_planets + [rng.randrange(-2, num_planets + 3)]) if rng.random() < 0.9 else None
+        destination = rng.randrange(-1, num_planets + 1) if rng.random() < 0.95 else None
+        num_ships = rng.choice([rng.randint(1, 400), rng.randint(-3, 3), 1000])
+        orders.append(Order(source, destination, num_ships))
+    orders.append(Order(game_manager.game.planets[own_planets[0]], game_manager.game.planets[0], 2))
+    orders.append(Order(own_planets[0], 0, 2.5))
+    return orders
+
+
+def _get_state(game_manager: GameManager):
+    planets = [(p.owner, p.num_ships) for p in game_manager.game.planets]
+    fleets = [
+        (f.owner, f.num_ships, f.source_planet_id, f.destination_planet_id, f.total_trip_length, f.turns_remaining)
+        for f in game_manager.game.fleets
+    ]
+    return planets, fleets, game_manager._launched_fleets
+
+
+@pytest.mark.parametrize("coalesce_fleets", [False, True])
+def test_batch_orders_match_sequential_orders(coalesce_fleets):
+    scenario = make_stress_scenario(60, 200)
+    for seed in range(40):
+        rng = random.Random(seed)
+        sequential = GameManager(scenario.game, *scenario.get_players(), coalesce_fleets=coalesce_fleets)
+        batch = GameManager(scenario.game, *scenario.get_players(), coalesce_fleets=coalesce_fleets)
+        # Validate the orders together even when there are few of them
+        batch.BATCH_ORDERS_MIN_WORK = 0
+        for player_id in (1, 2):
+            orders = _get_random_orders(sequential, player_id, rng)
+            expected_reasons = [sequential._execute_single_order(order, player_id) for order in orders]
+            report = batch.execute_orders(orders, player_id)
+            reasons = [None] * len(orders)
+            for rejected_order in report.rejected:
+                reasons[rejected_order.index] = rejected_order.reason
+            assert reasons == expected_reasons
+            assert report.num_accepted == expected_reasons.count(None)
+        assert _get_state(batch) == _get_state(sequential)
@@ -0,0 +1,88 @@
+import contextlib
+import math
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.bot_host import codec
+from planet_wars.bot_host.worker import RemotePlayer
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import Order, PlanetWars, Player
+from planet_wars.player_bots.baseline_code.baseline_bot import AttackWeakestPlanetFromStrongestBot
+
+
+class _OddOrdersBot(Player):
+    """
+    Sends a valid order and orders the engine rejects or accepts only in some turns - fractional number of ships,
+    missing and invalid planet ids
+    """
+
+    NAME = "odd orders"
+
+    def play_turn(self, game: PlanetWars):
+        my_planets = game.get_planets_by_owner(PlanetWars.ME)
+        if not my_planets:
+            return []
+        source = max(my_planets, key=lambda p: p.num_ships)
+        destination = min(game.planets, key=lambda p: p.num_ships if p.owner != PlanetWars.ME else float("inf"))
+        return [
+            Order(source, destination, source.num_ships // 4),
+            Order(source, destination, 2.7),
+            Order(source.planet_id, float(destination.planet_id), 3.0),
+            Order(None, destination, 1),
+            Order(source, "1", 1),
+            Order(source, 0.5, 1),
+            Order(source, destination, source.num_ships + 0.5),
+        ]
+
+
+def test_orders_round_trip():
+    orders = [
+        Order(1, 2, 3), Order(1, 2, 2.7), Order(1.0, 2, 3.0), Order(None, 2, 1), Order(1, None, 1),
+        Order(1, "2", 1), Order(1, 2.5, 1), Order(1, -3, 1), Order(1, 2, "many"), Order(1, 2, -4)
+    ]
+    decoded = [
+        (o.source_planet_id, o.destination_planet_id, o.num_ships)
+        for o in codec.decode_orders(codec.encode_orders(orders))
+    ]
+    # Not a number of ships is decoded as NaN, which is not a whole number like the original value
+    assert math.isnan(decoded[8][2])
+    decoded[8] = (1, 2, "many")
+    assert decoded == [
+        (1, 2, 3), (1, 2, 2.7), (1, 2, 3), (None, 2, 1), (1, None, 1),
+        (1, -1, 1), (1, -1, 1), (1, -1, 1), (1, 2, "many"), (1, 2, -4)
+    ]
+    assert isinstance(decoded[0][2], int) and isinstance(decoded[2][2], int)
+
+
+def test_decoded_orders_are_rejected_like_the_original_orders():
+    game = PlanetWars.parse_game_state(get_map_by_id(5))
+    source = game.get_planets_by_owner(PlanetWars.ME)[0]
+    orders = [
+        Order(source, 0, 2), Order(source, 0, 2.7), Order(source, 0.0, 3.0), Order(None, 0, 1), Order(source, "0", 1),
+        Order(source, 0.5, 1), Order(source, 0, "many"), Order(source, 0, float("nan")), Order(source, 0, -1),
+        Order(source, 0, float("inf")), Order(source, source, 1)
+    ]
+    decoded = codec.decode_orders(codec.encode_orders(orders))
+    assert [o.get_rejection_reason(game) for o in decoded] == [o.get_rejection_reason(game) for o in orders]
+
+
+def test_state_round_trip():
+    game = PlanetWars.parse_game_state(get_map_by_id(5))
+    game.turns = 17
+    flags, decoded = codec.decode_state(codec.encode_state(game, codec.NEW_GAME_FLAG))
+    assert flags == codec.NEW_GAME_FLAG
+    assert decoded.turns == 17
+    assert str(decoded) == str(game)
+    assert codec.decode_seconds_left(codec.encode_state(game)) is None
+
+
+def test_remote_player_plays_like_in_process_player():
+    replays = []
+    for remote in (False, True):
+        bot = _OddOrdersBot()
+        with RemotePlayer(bot) if remote else contextlib.nullcontext(bot) as player:
+            game_manager = GameManager(
+                get_map_by_id(2), player, AttackWeakestPlanetFromStrongestBot(), raise_bot_exceptions=True
+            )
+            game_manager.run_game()
+        replays.append(game_manager.get_description_for_display())
+    assert replays[0] == replays[1]
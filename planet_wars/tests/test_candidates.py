@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.candidates import CandidateMoves
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import Order, PlanetWars, Player
+
+# My planet 0 and, at trip lengths 3, 4 and 6 from it: a neutral planet an enemy fleet of 8 ships lands on in 2 turns,
+# an enemy planet and another neutral planet
+SMALL_MAP = """P 0 0 1 50 5
+P 3 0 0 10 2
+P 0 4 2 20 4
+P 6 0 0 5 1
+F 2 8 2 1 5 2
+"""
+
+
+def test_features_match_forecast_by_hand():
+    moves = CandidateMoves(PlanetWars.parse_game_state(SMALL_MAP))
+    np.testing.assert_array_equal(moves.trip_lengths[0], [0, 3, 4, 6])
+    # Planet 1: the enemy fleet leaves the neutral 10 - 8 = 2 ships. Planet 2: 20 ships + 4 turns of growth 4.
+    np.testing.assert_array_equal(moves.ships_needed[0], [0, 3, 37, 6])
+    np.testing.assert_array_equal(moves.arrival_owners[0], [1, 0, 2, 0])
+    np.testing.assert_array_equal(moves.feasible[0], [False, True, True, True])
+    # Only my planet can send, and planets I will own anyway need no ships
+    assert not moves.feasible[1:].any()
+    assert (moves.ships_needed[:, 0] == 0).all()
+    np.testing.assert_allclose(moves.growth_per_ship[0], [0, 2 / 3, 4 / 37, 1 / 6])
+
+
+def test_get_orders():
+    moves = CandidateMoves(PlanetWars.parse_game_state(SMALL_MAP))
+    orders = moves.get_orders(moves.growth_per_ship)
+    assert [(o.source_planet_id, o.destination_planet_id, o.num_ships) for o in orders] == [
+        (0, 1, 3), (0, 3, 6), (0, 2, 37)
+    ]
+    orders = moves.get_orders(moves.growth_per_ship, max_orders=2)
+    assert [o.destination_planet_id for o in orders] == [1, 3]
+
+    # Orders the source doesn't have the ships for after the better orders are skipped
+    num_ships = moves.ships_needed.copy()
+    num_ships[0, 2] = 45
+    orders = moves.get_orders(moves.growth_per_ship, num_ships=num_ships)
+    assert [o.destination_planet_id for o in orders] == [1, 3]
+
+    # Scores of -inf are never picked
+    scores = moves.growth_per_ship.copy()
+    scores[0, 1] = -np.inf
+    assert [o.destination_planet_id for o in moves.get_orders(scores)] == [3, 2]
+
+
+class _SendOnceBot(Player):
+    def __init__(self, order: Order):
+        self.order = order
+
+    def play_turn(self, game: PlanetWars):
+        return [self.order] if game.turns == 0 else []
+
+
+class _NoOrdersBot(Player):
+    def play_turn(self, game: PlanetWars):
+        return []
+
+
+def _owner_on_arrival(game: PlanetWars, source: int, destination: int, num_ships: int) -> int:
+    game_manager = GameManager(game, _SendOnceBot(Order(source, destination, num_ships)), _NoOrdersBot())
+    for _ in range(int(game.get_distance_matrix()[source, destination])):
+        game_manager.make_turn()
+    return game_manager.game.planets[destination].owner
+
+
+@pytest.mark.parametrize("map_str", [SMALL_MAP, get_map_by_id(1), get_map_by_id(13)])
+def test_ships_needed_are_just_enough_in_the_engine(map_str):
+    game = PlanetWars.parse_game_state(map_str)
+    moves = CandidateMoves(game)
+    assert moves.feasible.any()
+    for source, destination in zip(*np.nonzero(moves.feasible)):
+        ships_needed = int(moves.ships_needed[source, destination])
+        assert _owner_on_arrival(game, source, destination, ships_needed) == PlanetWars.ME
+        assert _owner_on_arrival(game, source, destination, ships_needed - 1) != PlanetWars.ME
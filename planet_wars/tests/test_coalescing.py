@@ -0,0 +1,54 @@
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.benchmarks.stress_scenarios import make_stress_scenario
+from planet_wars.engine.game_logic import GameManager, expand_fleets
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestBot,
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+
+BOT_PAIRS = [
+    (AttackWeakestPlanetFromStrongestBot, AttackEnemyWeakestPlanetFromStrongestBot),
+    (AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot, AttackWeakestPlanetFromStrongestBot),
+    (AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot),
+]
+
+
+def _get_fleets(game_manager: GameManager):
+    return [
+        (f.owner, f.num_ships, f.source_planet_id, f.destination_planet_id, f.total_trip_length, f.turns_remaining)
+        for f in expand_fleets(game_manager.game.fleets)
+    ]
+
+
+def _check_coalesced_game(plain: GameManager, coalesced: GameManager):
+    plain_state = coalesced_state = GameManager.IN_GAME_STATE
+    while plain_state == GameManager.IN_GAME_STATE:
+        plain_state = plain.make_turn()
+        coalesced_state = coalesced.make_turn()
+        assert coalesced_state == plain_state
+        # The same fleets in the same (launch) order, and no records kept for fleets that landed
+        assert _get_fleets(coalesced) == _get_fleets(plain)
+        assert len(coalesced._coalesced_fleets) == len(coalesced.game.fleets)
+    assert coalesced.turns == plain.turns
+    assert coalesced.get_description_for_display() == plain.get_description_for_display()
+
+
+@pytest.mark.parametrize("map_id", [1, 4, 7, 12])
+@pytest.mark.parametrize("bot_1, bot_2", BOT_PAIRS)
+def test_coalesced_game_matches_plain_game(map_id, bot_1, bot_2):
+    _check_coalesced_game(
+        GameManager(get_map_by_id(map_id), bot_1(), bot_2()),
+        GameManager(get_map_by_id(map_id), bot_1(), bot_2(), coalesce_fleets=True)
+    )
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_coalesced_stress_game_matches_plain_game(seed):
+    # Many orders per turn, so fleets launched in different turns are merged into the same records
+    scenario = make_stress_scenario(30, 40, turns=30, orders_per_turn=40, seed=seed)
+    _check_coalesced_game(
+        GameManager(scenario.game, *scenario.get_players()),
+        GameManager(scenario.game, *scenario.get_players(), coalesce_fleets=True)
+    )
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.forecast import Forecast
+from planet_wars.planet_wars import PlanetWars, Player
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+
+
+@pytest.mark.parametrize("map_id", [2, 5, 9])
+@pytest.mark.parametrize("coalesce_fleets", [False, True])
+def test_incremental_forecast_matches_fresh(map_id, coalesce_fleets):
+    game_manager = GameManager(
+        get_map_by_id(map_id), AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot(),
+        AttackWeakestPlanetFromStrongestBot(), coalesce_fleets=coalesce_fleets
+    )
+    state = GameManager.IN_GAME_STATE
+    while state == GameManager.IN_GAME_STATE:
+        for player_num in (1, 2):
+            game = game_manager.get_game_object_for_player(player_num)
+            forecast = game.get_forecast()
+            fresh = Forecast.from_arrays(game.get_planets_array(), game.get_fleets_array(), forecast.turns)
+            np.testing.assert_array_equal(forecast.owners, fresh.owners)
+            np.testing.assert_array_equal(forecast.ships, fresh.ships)
+        state = game_manager.make_turn()
+
+
+class _ForecastWriterBot(Player):
+    """
+    Tries to change the shared forecast, then changes its own copy
+    """
+
+    def play_turn(self, game):
+        forecast = game.get_forecast()
+        with pytest.raises(ValueError):
+            forecast.ships[:] = 7
+        my_planet = game.get_planets_by_owner(PlanetWars.ME)[0]
+        forecast.add_order(my_planet.planet_id, 0, my_planet.num_ships, 5)
+        forecast.extend(forecast.turns + 5)
+        return []
+
+
+class _ForecastCheckerBot(Player):
+    def play_turn(self, game):
+        forecast = game.get_forecast()
+        fresh = Forecast.from_arrays(game.get_planets_array(), game.get_fleets_array(), forecast.turns)
+        np.testing.assert_array_equal(forecast.ships, fresh.ships)
+        return []
+
+
+def test_bots_cannot_change_the_shared_forecast():
+    game_manager = GameManager(
+        get_map_by_id(3), _ForecastWriterBot(), _ForecastCheckerBot(), raise_bot_exceptions=True
+    )
+    for _ in range(20):
+        assert game_manager.make_turn() == GameManager.IN_GAME_STATE
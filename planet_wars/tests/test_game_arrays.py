@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import FLEET_DTYPE, PLANET_DTYPE, Fleet, PlanetWars
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestBot
+)
+
+
+def _get_game_with_fleets() -> PlanetWars:
+    game_manager = GameManager(
+        get_map_by_id(8), AttackWeakestPlanetFromStrongestBot(), AttackEnemyWeakestPlanetFromStrongestBot()
+    )
+    for _ in range(10):
+        game_manager.make_turn()
+    game = game_manager.get_game_object_for_player(1)
+    assert game.fleets
+    return game
+
+
+def _check_frames_match_objects(game: PlanetWars):
+    planets_frame = game.get_planets_data_frame()
+    fleets_frame = game.get_fleets_data_frame()
+    pd.testing.assert_frame_equal(planets_frame, pd.DataFrame(game.get_planets_array()))
+    pd.testing.assert_frame_equal(fleets_frame, pd.DataFrame(game.get_fleets_array()))
+    assert planets_frame.values.tolist() == [
+        [p.planet_id, p.owner, p.num_ships, p.growth_rate, p.x, p.y] for p in game.planets
+    ]
+    assert fleets_frame.values.tolist() == [
+        [f.owner, f.num_ships, f.source_planet_id, f.destination_planet_id, f.total_trip_length, f.turns_remaining]
+        for f in game.fleets
+    ]
+
+
+def test_frames_and_arrays_agree_after_objects_change():
+    game = _get_game_with_fleets()
+    _check_frames_match_objects(game)
+
+    # The arrays are cached for the turn...
+    planets = game.get_planets_array()
+    game.planets[0].num_ships += 17
+    game.planets[1].owner = PlanetWars.ENEMY
+    game.fleets[0].turns_remaining += 1
+    game.fleets.append(Fleet(PlanetWars.ME, 3, 0, 1, 5, 5))
+    assert game.get_planets_array() is planets
+    # ...and rebuilt for the data frames
+    _check_frames_match_objects(game)
+    assert game.get_planets_array()["num_ships"][0] == game.planets[0].num_ships
+    assert len(game.get_fleets_array()) == len(game.fleets)
+    assert not game.get_planets_array().flags.writeable
+
+
+def test_frames_of_empty_fleets_keep_columns():
+    game = PlanetWars.parse_game_state(get_map_by_id(8))
+    assert list(game.get_fleets_data_frame().columns) == list(FLEET_DTYPE.names)
+    assert list(game.get_planets_data_frame().columns) == list(PLANET_DTYPE.names)
+    np.testing.assert_array_equal(game.get_planets_data_frame()["owner"], [p.owner for p in game.planets])
@@ -0,0 +1,75 @@
+import os
+import shutil
+
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.engine.map_library import MAPS_DIR_PATH, MapLibrary, compute_maps_dir_fingerprint
+from planet_wars.planet_wars import PlanetWars
+
+MAP_IDS = [1, 2, 3, 40]
+
+
+@pytest.fixture
+def maps_dir(tmp_path):
+    maps_dir = tmp_path / "maps"
+    maps_dir.mkdir()
+    for map_id in MAP_IDS:
+        shutil.copy(os.path.join(MAPS_DIR_PATH, f"map{map_id}.txt"), maps_dir)
+    return str(maps_dir)
+
+
+def _new_library(maps_dir: str) -> MapLibrary:
+    return MapLibrary(maps_dir, os.path.join(os.path.dirname(maps_dir), "maps.pwlib"))
+
+
+def test_compiled_maps_match_map_files(maps_dir):
+    library = _new_library(maps_dir)
+    assert sorted(library.map_names()) == sorted(f"map{map_id}" for map_id in MAP_IDS)
+    assert 2 in library and "map40" in library and 5 not in library
+    for map_id in MAP_IDS:
+        expected = str(PlanetWars.parse_game_state(get_map_by_id(map_id)))
+        assert str(library.get_map(map_id)) == expected
+        assert library.get_map_str(f"map{map_id}") == expected
+        planets, fleets = library.get_map_arrays(map_id)
+        assert not planets.flags.writeable
+    with pytest.raises(KeyError):
+        library.get_map(5)
+    library.close()
+
+
+def test_compiled_library_is_reused(maps_dir):
+    first = _new_library(maps_dir)
+    compiled_mtime = os.stat(first.compiled_path).st_mtime_ns
+    second = _new_library(maps_dir)
+    assert os.stat(second.compiled_path).st_mtime_ns == compiled_mtime
+    assert not second.is_stale()
+    first.close()
+    second.close()
+
+
+def test_library_is_rebuilt_when_a_map_changes(maps_dir):
+    library = _new_library(maps_dir)
+    fingerprint = compute_maps_dir_fingerprint(maps_dir)
+    with open(os.path.join(maps_dir, "map1.txt"), "w") as f:
+        f.write(get_map_by_id(7))
+    assert compute_maps_dir_fingerprint(maps_dir) != fingerprint
+    assert library.is_stale()
+    assert str(library.get_map(1)) == str(PlanetWars.parse_game_state(get_map_by_id(7)))
+    assert not library.is_stale()
+
+    # Added and removed maps
+    shutil.copy(os.path.join(MAPS_DIR_PATH, "map5.txt"), maps_dir)
+    os.remove(os.path.join(maps_dir, "map2.txt"))
+    assert str(library.get_map(5)) == str(PlanetWars.parse_game_state(get_map_by_id(5)))
+    assert 2 not in library
+
+    # Another library (another process) rebuilds the file - the first library still reopens it
+    other = _new_library(maps_dir)
+    with open(os.path.join(maps_dir, "map3.txt"), "w") as f:
+        f.write(get_map_by_id(9))
+    other.refresh()
+    assert library.is_stale()
+    assert str(library.get_map(3)) == str(other.get_map(3)) == str(PlanetWars.parse_game_state(get_map_by_id(9)))
+    library.close()
+    other.close()
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import Order, PlanetWars, Player
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+from planet_wars.replays.analysis import decode_replay_arrays, get_player_ships
+from planet_wars.replays.codec import encode_replay
+
+
+def _run_game(game_manager: GameManager, max_turns: int = 1000):
+    """
+    :return: The planets array after each turn (turn 0 is the map), and each launched fleet as
+             (owner, ships, source, destination, trip length, launch turn, arrival turn)
+    """
+    planets = [game_manager.game.get_planets_array().copy()]
+    launched = []
+    state = GameManager.IN_GAME_STATE
+    while state == GameManager.IN_GAME_STATE and game_manager.turns < max_turns:
+        state = game_manager.make_turn()
+        planets.append(game_manager.game.get_planets_array().copy())
+        launched.extend(
+            (owner, num_ships, source, destination, trip_length, game_manager.turns, arrival_turn)
+            for owner, source, destination, num_ships, arrival_turn, trip_length in game_manager._launched_fleets
+        )
+    return planets, launched
+
+
+def _fleets_table(arrays):
+    return sorted(
+        tuple(int(value) for value in fleet)
+        for fleet in arrays.fleets[[
+            "owner", "num_ships", "source_planet_id", "destination_planet_id", "total_trip_length", "launch_turn",
+            "arrival_turn"
+        ]]
+    )
+
+
+@pytest.mark.parametrize("map_id", [2, 9, 33])
+def test_replay_arrays_match_game(map_id):
+    game_manager = GameManager(
+        get_map_by_id(map_id), AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot(),
+        AttackEnemyWeakestPlanetFromStrongestBot()
+    )
+    planets, launched = _run_game(game_manager)
+    description = game_manager.get_description_for_display()
+    arrays = decode_replay_arrays(description)
+
+    assert arrays.num_turns == game_manager.turns
+    np.testing.assert_array_equal(arrays.owners, [p["owner"] for p in planets])
+    np.testing.assert_array_equal(arrays.ships, [p["num_ships"] for p in planets])
+    assert _fleets_table(arrays) == sorted(launched)
+    assert list(get_player_ships(arrays)[-1]) == [game_manager.get_player_score(1), game_manager.get_player_score(2)]
+
+    encoded_arrays = decode_replay_arrays(encode_replay(description))
+    np.testing.assert_array_equal(encoded_arrays.fleets, arrays.fleets)
+    np.testing.assert_array_equal(encoded_arrays.ships_in_flight, arrays.ships_in_flight)
+
+
+class _NearAndFarBot(Player):
+    """
+    Each turn sends a ship to the planet next to its planet (trip length 1) and a ship to the far planet
+    """
+
+    def play_turn(self, game: PlanetWars):
+        return [Order(0, 1, 1), Order(0, 2, 1)]
+
+
+class _NoOrdersBot(Player):
+    def play_turn(self, game: PlanetWars):
+        return []
+
+
+def test_fleets_with_trip_length_one_are_not_in_the_table():
+    game_map = "P 0 0 1 50 5\nP 0.5 0 0 0 0\nP 10 0 2 50 5\n"
+    game_manager = GameManager(game_map, _NearAndFarBot(), _NoOrdersBot())
+    planets, launched = _run_game(game_manager, max_turns=5)
+    arrays = decode_replay_arrays(game_manager.get_description_for_display())
+
+    assert len(launched) == 10
+    # Only the fleets to the far planet are in the table - the others land in the turn they are launched in
+    assert _fleets_table(arrays) == sorted(fleet for fleet in launched if fleet[4] > 1)
+    # Their ships are only seen on the planets
+    np.testing.assert_array_equal(arrays.ships[:, 0], [50, 53, 56, 59, 62, 65])
+    np.testing.assert_array_equal(arrays.ships[:, 1], [0, 1, 2, 3, 4, 5])
+    np.testing.assert_array_equal(arrays.owners[1:, 1], 1)
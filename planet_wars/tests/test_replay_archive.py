@@ -0,0 +1,74 @@
+import pytest
+
+from planet_wars.battles.tournament import TestBot as BotTester, get_map_by_id
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestBot,
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+from planet_wars.replays.archive import ReplayArchive, ReplayArchiveWriter
+from planet_wars.replays.codec import ReplayReader
+
+
+def _new_tester(**kwargs) -> BotTester:
+    return BotTester(
+        AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot(),
+        [AttackWeakestPlanetFromStrongestBot(), AttackEnemyWeakestPlanetFromStrongestBot()],
+        [get_map_by_id(3), get_map_by_id(6)], **kwargs
+    )
+
+
+@pytest.mark.parametrize("concurrent_games", [1, 4])
+def test_archived_replays_match_in_memory_replays(tmp_path, concurrent_games):
+    in_memory = _new_tester()
+    in_memory.run_tournament()
+
+    # With concurrent games the blocks of the games are interleaved in the archive
+    archive_path = str(tmp_path / "replays")
+    archived = _new_tester(concurrent_games=concurrent_games, replay_archive_path=archive_path)
+    archived.run_tournament()
+    assert archived._replay_archive is None, "the archive is closed after the battles"
+    archive = ReplayArchive(archive_path)
+    assert len(archive) == len(in_memory.battle_results)
+    for battle_result in in_memory.battle_results:
+        assert archive.get_description(battle_result.battle_id) == battle_result.description_for_display
+
+    # More battles are added to the same archive
+    archived.run_tournament()
+    archive = ReplayArchive(archive_path)
+    assert len(archive) == 2 * len(in_memory.battle_results)
+    for battle_result in in_memory.battle_results:
+        assert archive.get_description(battle_result.battle_id + len(in_memory.battle_results)) == \
+               battle_result.description_for_display
+
+
+def test_archived_replay_writer_to_bytes(tmp_path):
+    archive_path = str(tmp_path / "replays")
+    with ReplayArchiveWriter(archive_path, keyframe_interval=8) as archive_writer:
+        game_managers = [
+            GameManager(get_map_by_id(map_id), AttackWeakestPlanetFromStrongestBot(),
+                        AttackEnemyWeakestPlanetFromStrongestBot())
+            for map_id in (4, 9)
+        ]
+        writers = [archive_writer.new_replay(game_manager.get_map_description()) for game_manager in game_managers]
+        for game_manager, writer in zip(game_managers, writers):
+            game_manager.set_replay_writer(writer)
+        # Interleave the turns of the two games
+        states = [GameManager.IN_GAME_STATE] * 2
+        while GameManager.IN_GAME_STATE in states:
+            for i, game_manager in enumerate(game_managers):
+                if states[i] == GameManager.IN_GAME_STATE:
+                    states[i] = game_manager.make_turn()
+        for battle_id, writer in enumerate(writers):
+            archive_writer.finish_replay(writer, battle_id)
+        replay_bytes = [writer.to_bytes() for writer in writers]
+
+    archive = ReplayArchive(archive_path)
+    for battle_id, data in enumerate(replay_bytes):
+        assert data == archive.get_replay_bytes(battle_id)
+        plain = GameManager(
+            get_map_by_id((4, 9)[battle_id]), AttackWeakestPlanetFromStrongestBot(),
+            AttackEnemyWeakestPlanetFromStrongestBot()
+        )
+        plain.run_game()
+        assert ReplayReader(data).to_description() == plain.get_description_for_display()
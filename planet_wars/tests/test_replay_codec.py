@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+from planet_wars.replays.codec import (
+    ReplayReader, _split_kept_fleets, decode_replay, encode_replay, format_turn, parse_turn
+)
+
+
+def _run_game(map_id: int) -> str:
+    game_manager = GameManager(
+        get_map_by_id(map_id), AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot(),
+        AttackEnemyWeakestPlanetFromStrongestBot()
+    )
+    game_manager.run_game()
+    return game_manager.get_description_for_display()
+
+
+@pytest.mark.parametrize("map_id", [1, 8, 15])
+@pytest.mark.parametrize("compression", ["zlib", "lzma", "none"])
+@pytest.mark.parametrize("keyframe_interval", [1, 7, 32])
+def test_replay_round_trip(map_id, compression, keyframe_interval):
+    description = _run_game(map_id)
+    data = encode_replay(description, keyframe_interval, compression)
+    assert decode_replay(data) == description
+
+    # Random access to the turns, backwards so every block is read again
+    reader = ReplayReader(data)
+    turn_descriptions = description.split("|", 1)[1].split(":")
+    assert len(reader) == len(turn_descriptions)
+    for turn in reversed(range(0, len(reader), 5)):
+        assert reader.get_turn_description(turn) == turn_descriptions[turn]
+
+
+def _reorder_fleets(description: str) -> str:
+    """
+    :return: The replay with the fleets of every turn in reverse order - not the launch order of the engine
+    """
+    map_description, turns_description = description.split("|", 1)
+    num_planets = len(map_description.split(":"))
+    turns = []
+    for turn_description in turns_description.split(":"):
+        turn = parse_turn(turn_description, num_planets)
+        turns.append(format_turn(turn._replace(fleets=turn.fleets[::-1])))
+    return map_description + "|" + ":".join(turns)
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma", "none"])
+def test_replay_round_trip_with_fleets_out_of_order(compression):
+    description = _reorder_fleets(_run_game(4))
+    assert decode_replay(encode_replay(description, 16, compression)) == description
+
+
+def test_split_kept_fleets_fallback():
+    # owner, ships, source, destination, total trip length, turns remaining
+    previous = np.array([[1, 5, 0, 1, 4, 3], [2, 6, 1, 0, 4, 1], [1, 7, 0, 2, 5, 4]], dtype=np.int32)
+    in_order = np.array([[1, 5, 0, 1, 4, 2], [1, 7, 0, 2, 5, 3], [2, 9, 1, 2, 3, 3]], dtype=np.int32)
+    np.testing.assert_array_equal(_split_kept_fleets(previous, in_order), [True, False, True])
+
+    # The kept fleets are not first - only the fleets matched in order before the new fleets are kept
+    out_of_order = in_order[[1, 0, 2]]
+    mask = _split_kept_fleets(previous, out_of_order)
+    np.testing.assert_array_equal(mask, [False, False, True])
+
+
+def test_encode_replay_rejects_text_it_cant_encode_losslessly():
+    description = _run_game(2)
+    map_description, turns_description = description.split("|", 1)
+    with pytest.raises(ValueError):
+        encode_replay(map_description + "|" + turns_description.replace(",", ",+", 1))
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import PlanetWars
+from planet_wars.player_bots.baseline_code.baseline_bot import AttackWeakestPlanetFromStrongestBot
+from planet_wars.player_bots.search_code import search_bot
+from planet_wars.player_bots.search_code.search_bot import DEFAULT_ROLLOUT_POLICIES, SearchBot, run_rollout
+
+
+def _get_rollout_values(game: PlanetWars, order_sets):
+    rng = random.Random(0)
+    return [
+        run_rollout(game, order_set, rng.choice(DEFAULT_ROLLOUT_POLICIES)(), rng.choice(DEFAULT_ROLLOUT_POLICIES)(), 40)
+        for order_set in order_sets for _ in range(4)
+    ]
+
+
+@pytest.mark.parametrize("map_id", [3, 10, 21])
+def test_rollouts_match_rollouts_with_cloned_game_objects(monkeypatch, map_id):
+    game_manager = GameManager(get_map_by_id(map_id), SearchBot(), AttackWeakestPlanetFromStrongestBot())
+    for _ in range(5):
+        game_manager.finish_turn([], [])
+    game = game_manager.get_game_object_for_player(1)
+    game_str = str(game)
+    order_sets = SearchBot().get_candidates(game)
+    assert len(order_sets) > 1
+
+    values = _get_rollout_values(game, order_sets)
+    assert str(game) == game_str
+    monkeypatch.setattr(search_bot, "RolloutGameManager", GameManager)
+    assert values == _get_rollout_values(game, order_sets)
+
+
+def test_search_ends_before_the_turn_deadline():
+    turn_time_limit = 0.1
+    bot = SearchBot(time_budget=1.0, seed=0)
+    game_manager = GameManager(
+        get_map_by_id(3), bot, AttackWeakestPlanetFromStrongestBot(), raise_bot_exceptions=True,
+        turn_time_limit=turn_time_limit
+    )
+    for _ in range(5):
+        game_manager.make_turn()
+        assert bot.last_search_stats.elapsed_seconds < turn_time_limit
+    assert bot.last_search_stats.num_rollouts > 0
+    # The search stops SAFETY_MARGIN before the deadline, and a rollout takes a few milliseconds
+    assert game_manager.get_headroom_stats(1).min_headroom_seconds > 0
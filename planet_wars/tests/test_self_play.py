@@ -0,0 +1,118 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from planet_wars.engine.map_library import get_map_library
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestBot,
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+from planet_wars.self_play.features import get_distance_features
+from planet_wars.self_play.pipeline import (
+    MANIFEST_FILE_NAME, POSITION_FEATURES, SelfPlayConfig, ShardWriter, iter_shards, load_shard, play_recorded_game,
+    run_self_play
+)
+
+PLAYERS = [
+    AttackWeakestPlanetFromStrongestBot(), AttackEnemyWeakestPlanetFromStrongestBot(),
+    AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot()
+]
+MAX_PLANETS = 30
+
+
+def _play_games(output_dir, map_ids):
+    config = SelfPlayConfig(output_dir, PLAYERS, MAX_PLANETS, 8, 0, record_player_2=True)
+    games = []
+    for index, map_id in enumerate(map_ids):
+        game = get_map_library().get_map(map_id)
+        state, recorders = play_recorded_game(config, game, PLAYERS[index % 3], PLAYERS[(index + 1) % 3])
+        games.append((map_id, get_distance_features(game, MAX_PLANETS), state, recorders))
+    return games
+
+
+@pytest.mark.parametrize("shard_size", [1, 150, 400, 100000])
+def test_shard_writer_keeps_games_whole(tmp_path, shard_size):
+    games = _play_games(str(tmp_path), [1, 2, 3, 4, 5])
+    game_positions = [sum(len(recorder.turns) for _, recorder in recorders) for _, _, _, recorders in games]
+    writer = ShardWriter(str(tmp_path), "test", shard_size)
+    for map_id, distances, state, recorders in games:
+        writer.add_game(map_id, distances, ("a", "b"), recorders, state)
+    writer.flush()
+    writer.flush()  # nothing more to write
+
+    assert sum(num_positions for _, num_positions in writer.shards) == sum(game_positions)
+    map_ids = []
+    for file_name, num_positions in writer.shards:
+        shard = load_shard(os.path.join(str(tmp_path), file_name))
+        assert len(shard["turn"]) == num_positions
+        # At most shard_size positions, unless the shard is a single game
+        assert num_positions <= shard_size or len(shard["map_id"]) == 1
+        assert shard["order_offsets"][-1] == len(shard["orders"])
+        for name in POSITION_FEATURES:
+            assert len(shard[name]) == num_positions
+        assert set(shard["game_index"]) == set(range(len(shard["map_id"])))
+        map_ids.extend(shard["map_id"].tolist())
+    # Every game is in exactly one shard, in order
+    assert map_ids == [1, 2, 3, 4, 5]
+    if shard_size >= sum(game_positions):
+        assert len(writer.shards) == 1
+    if shard_size == 1:
+        assert len(writer.shards) == len(games)
+
+
+def test_shard_positions_match_recorded_games(tmp_path):
+    games = _play_games(str(tmp_path), [6, 7])
+    writer = ShardWriter(str(tmp_path), "test", 100000)
+    for map_id, distances, state, recorders in games:
+        writer.add_game(map_id, distances, ("a", "b"), recorders, state)
+    writer.flush()
+    shard = load_shard(os.path.join(str(tmp_path), writer.shards[0][0]))
+
+    position_index = 0
+    for game_index, (_, distances, _, recorders) in enumerate(games):
+        np.testing.assert_array_equal(shard["distances"][game_index], distances)
+        for player_num, recorder in recorders:
+            for position, turn, orders in zip(recorder.positions, recorder.turns, recorder.orders):
+                assert shard["game_index"][position_index] == game_index
+                assert shard["player"][position_index] == player_num
+                assert shard["turn"][position_index] == turn
+                np.testing.assert_array_equal(shard["ships"][position_index], position["ships"])
+                start, end = shard["order_offsets"][position_index:position_index + 2]
+                assert shard["orders"][start:end].tolist() == [list(order) for order in orders]
+                position_index += 1
+    assert position_index == len(shard["turn"])
+
+
+def test_run_self_play_in_process(tmp_path):
+    output_dir = str(tmp_path / "self_play")
+    report = run_self_play(
+        output_dir, PLAYERS, num_games=7, map_ids=[1, 2, 3], num_workers=0, games_per_task=3, shard_size=300,
+        max_planets=MAX_PLANETS, seed=1
+    )
+    assert report.num_games == 7
+    with open(os.path.join(output_dir, MANIFEST_FILE_NAME)) as f:
+        manifest = json.load(f)
+    assert manifest["num_games"] == 7
+    assert manifest["num_positions"] == report.num_positions
+    assert manifest["max_planets"] == MAX_PLANETS
+    assert [(shard["file"], shard["num_positions"]) for shard in manifest["shards"]] == report.shards
+
+    num_positions = 0
+    num_games = 0
+    for shard in iter_shards(output_dir):
+        num_positions += len(shard["turn"])
+        num_games += len(shard["map_id"])
+        assert shard["owners"].shape[1] == MAX_PLANETS
+        assert set(shard["map_id"]) <= {1, 2, 3}
+        # Both players of a game are recorded, with opposite outcomes
+        for game_index in range(len(shard["map_id"])):
+            in_game = shard["game_index"] == game_index
+            outcomes = {
+                player: set(shard["outcome"][in_game & (shard["player"] == player)]) for player in (1, 2)
+            }
+            assert len(outcomes[1]) == len(outcomes[2]) == 1
+            assert outcomes[1].pop() == -outcomes[2].pop()
+    assert num_positions == report.num_positions
+    assert num_games == 7
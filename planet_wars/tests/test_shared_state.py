@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.bot_host.shared_state import SharedStatePublisher, SharedStateReader, StaleGameStateError
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import PlanetWars
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackEnemyWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestBot
+)
+
+
+def _new_game_manager(map_id: int = 7) -> GameManager:
+    return GameManager(
+        get_map_by_id(map_id), AttackWeakestPlanetFromStrongestBot(), AttackEnemyWeakestPlanetFromStrongestBot()
+    )
+
+
+def _check_view(view: PlanetWars, game: PlanetWars):
+    np.testing.assert_array_equal(view.get_planets_array(), game.get_planets_array())
+    np.testing.assert_array_equal(view.get_fleets_array(), game.get_fleets_array())
+    assert view.turns == game.turns
+    assert str(view) == str(game)
+
+
+def test_published_state_is_read_by_the_reader():
+    game_manager = _new_game_manager()
+    publisher = SharedStatePublisher()
+    # Like the worker, the reader maps the region after the first state was published in it
+    publisher.publish(game_manager.game)
+    reader = SharedStateReader(publisher.name)
+    try:
+        for _ in range(20):
+            game_manager.make_turn()
+            _, sequence = publisher.publish(game_manager.game)
+            view = reader.get_game()
+            assert reader.sequence() == sequence
+            _check_view(view, game_manager.game)
+            with pytest.raises(ValueError):
+                view.get_planets_array()["num_ships"][0] = 1
+    finally:
+        reader.close()
+        publisher.close()
+
+
+def test_old_view_is_stale():
+    game_manager = _new_game_manager()
+    publisher = SharedStatePublisher()
+    publisher.publish(game_manager.game)
+    reader = SharedStateReader(publisher.name)
+    try:
+        first_view = reader.get_game()
+        first_planets = first_view.planets
+        second_view = reader.get_game()
+
+        game_manager.make_turn()
+        publisher.publish(game_manager.game)
+        # Objects created before the next state was published stay usable
+        assert first_view.planets is first_planets
+        with pytest.raises(StaleGameStateError):
+            second_view.planets
+        with pytest.raises(StaleGameStateError):
+            second_view.fleets
+        _check_view(reader.get_game(), game_manager.game)
+    finally:
+        reader.close()
+        publisher.close()
+
+
+def test_region_grows():
+    game_manager = _new_game_manager()
+    for _ in range(10):
+        game_manager.make_turn()
+    game = game_manager.game
+    assert len(game.fleets) > 1
+
+    publisher = SharedStatePublisher(planet_capacity=len(game.planets), fleet_capacity=1)
+    first_name, first_sequence = publisher.publish(PlanetWars.parse_game_state(get_map_by_id(7)))
+    first_reader = SharedStateReader(first_name)
+    try:
+        name, sequence = publisher.publish(game)
+        assert name != first_name
+        # The old region was removed, so the old reader doesn't see the new state. The new region's reader does.
+        assert first_reader.sequence() == first_sequence
+        reader = SharedStateReader(name)
+        try:
+            assert reader.sequence() == sequence
+            _check_view(reader.get_game(), game)
+        finally:
+            reader.close()
+    finally:
+        first_reader.close()
+        publisher.close()
+
+
+def test_views_are_readable_after_the_region_is_removed():
+    game_manager = _new_game_manager()
+    for _ in range(10):
+        game_manager.make_turn()
+    publisher = SharedStatePublisher()
+    publisher.publish(game_manager.game)
+    reader = SharedStateReader(publisher.name)
+    _, _, planets, fleets = reader.read_arrays()
+    view = reader.get_game()
+    publisher.close()
+    reader.close()
+
+    np.testing.assert_array_equal(planets, game_manager.game.get_planets_array())
+    np.testing.assert_array_equal(fleets, game_manager.game.get_fleets_array())
+    assert str(view) == str(game_manager.game)
@@ -0,0 +1,106 @@
+import itertools
+import math
+import random
+
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.engine.map_generator import (
+    epsilon, generate_large_map, generate_map, largeMapEpsilonRadius, minDistance
+)
+from planet_wars.planet_wars import PlanetWars
+from planet_wars.spatial_index import GridIndex
+
+
+def _brute_force_radius(xs, ys, x, y, radius):
+    return sorted(i for i in range(len(xs)) if (xs[i] - x) ** 2 + (ys[i] - y) ** 2 <= radius * radius)
+
+
+def _brute_force_nearest(xs, ys, x, y, accept=None, max_radius=None):
+    candidates = [
+        ((xs[i] - x) ** 2 + (ys[i] - y) ** 2, i) for i in range(len(xs)) if accept is None or accept(i)
+    ]
+    if max_radius is not None:
+        candidates = [c for c in candidates if c[0] <= max_radius * max_radius]
+    return min(candidates)[1] if candidates else None
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("cell_size", [None, 0.3, 2, 50])
+def test_grid_index_matches_brute_force(seed, cell_size):
+    rng = random.Random(seed)
+    num_points = rng.randint(1, 150)
+    # Integer coordinates too, so there are duplicate points and ties
+    xs = [rng.choice([rng.uniform(-20, 40), rng.randint(-3, 3)]) for _ in range(num_points)]
+    ys = [rng.choice([rng.uniform(-10, 30), rng.randint(-3, 3)]) for _ in range(num_points)]
+    index = GridIndex.from_points(xs, ys, cell_size)
+    for _ in range(100):
+        x, y = rng.uniform(-30, 50), rng.uniform(-20, 40)
+        radius = rng.choice([0, 0.5, 3, 10, 100])
+        assert sorted(index.query_radius(x, y, radius)) == _brute_force_radius(xs, ys, x, y, radius)
+
+        assert index.nearest(x, y) == _brute_force_nearest(xs, ys, x, y)
+        max_radius = rng.choice([None, 1, 5])
+        parity = rng.randint(0, 2)
+        accept = lambda i: i % 3 == parity
+        assert index.nearest(x, y, accept, max_radius) == _brute_force_nearest(xs, ys, x, y, accept, max_radius)
+
+
+def test_empty_grid_index():
+    index = GridIndex(1)
+    assert index.query_radius(0, 0, 10) == []
+    assert index.nearest(0, 0) is None
+
+
+@pytest.mark.parametrize("map_id", [1, 30, 77])
+def test_planet_queries_match_brute_force(map_id):
+    game = PlanetWars.parse_game_state(get_map_by_id(map_id))
+    for planet in game.planets:
+        for radius in (3, 8):
+            in_radius = game.get_planets_within_radius(planet, radius)
+            assert sorted(p.planet_id for p in in_radius) == sorted(
+                p.planet_id for p in game.planets
+                if p is not planet and (p.x - planet.x) ** 2 + (p.y - planet.y) ** 2 <= radius * radius
+            )
+        for owner in (None, PlanetWars.NEUTRAL, PlanetWars.ENEMY):
+            others = [p for p in game.planets if p is not planet and (owner is None or p.owner == owner)]
+            closest = game.get_closest_planet(planet, owner)
+            if not others:
+                assert closest is None
+            else:
+                distance = min((p.x - planet.x) ** 2 + (p.y - planet.y) ** 2 for p in others)
+                assert (closest.x - planet.x) ** 2 + (closest.y - planet.y) ** 2 == distance
+
+
+def _parse_positions(map_str: str):
+    return [tuple(map(float, line.split()[1:3])) for line in map_str.splitlines() if line.startswith("P")]
+
+
+def test_large_map_epsilon_radius():
+    assert largeMapEpsilonRadius == 5
+    num_planets = 300
+    map_str = generate_large_map(num_planets, seed=3)
+    positions = _parse_positions(map_str)
+    assert len(positions) in (num_planets, num_planets + 1)
+
+    num_far_rounding_pairs = 0
+    for (x1, y1), (x2, y2) in itertools.combinations(positions, 2):
+        d = math.hypot(x1 - x2, y1 - y2)
+        assert math.ceil(d) >= minDistance
+        if abs(d - round(d)) < epsilon:
+            # Only pairs farther than the epsilon radius may have a distance too close to an integer
+            assert d > largeMapEpsilonRadius
+            num_far_rounding_pairs += 1
+    # On a map this large the rounding check can't hold for all the pairs - that is why it has a radius
+    assert num_far_rounding_pairs > 0
+
+    # The spatial index finds the same conflicts as checking all the placed planets
+    assert generate_large_map(num_planets, seed=3, use_spatial_index=False) == map_str
+
+
+def test_regular_maps_check_all_pairs():
+    map_str = generate_map(seed=11)
+    positions = _parse_positions(map_str)
+    for (x1, y1), (x2, y2) in itertools.combinations(positions, 2):
+        d = math.hypot(x1 - x2, y1 - y2)
+        assert math.ceil(d) >= minDistance and abs(d - round(d)) >= epsilon
@@ -0,0 +1,36 @@
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.player_bots.baseline_code.baseline_bot import (
+    AttackWeakestPlanetFromStrongestBot, AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot
+)
+
+
+@pytest.mark.parametrize("map_id", [2, 5, 9])
+@pytest.mark.parametrize("coalesce_fleets", [False, True])
+def test_incremental_state_hash_matches_fresh(map_id, coalesce_fleets):
+    game_manager = GameManager(
+        get_map_by_id(map_id), AttackWeakestPlanetFromStrongestSmarterNumOfShipsBot(),
+        AttackWeakestPlanetFromStrongestBot(), coalesce_fleets=coalesce_fleets
+    )
+    state = GameManager.IN_GAME_STATE
+    while state == GameManager.IN_GAME_STATE:
+        for player_num in (1, 2):
+            game = game_manager.get_game_object_for_player(player_num)
+            # The hash the engine keeps up to date against the hash of the game object arrays
+            assert game_manager.get_state_hash(player_num) == game.get_state_hash()
+        state = game_manager.make_turn()
+
+
+def test_state_hash_depends_on_the_perspective_and_state():
+    game_manager = GameManager(
+        get_map_by_id(3), AttackWeakestPlanetFromStrongestBot(), AttackWeakestPlanetFromStrongestBot()
+    )
+    other = GameManager(
+        get_map_by_id(3), AttackWeakestPlanetFromStrongestBot(), AttackWeakestPlanetFromStrongestBot()
+    )
+    assert game_manager.get_state_hash() == other.get_state_hash()
+    assert game_manager.get_state_hash(1) != game_manager.get_state_hash(2)
+    game_manager.make_turn()
+    assert game_manager.get_state_hash() != other.get_state_hash()
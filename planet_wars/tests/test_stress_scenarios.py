@@ -0,0 +1,25 @@
+from planet_wars.benchmarks.stress_scenarios import ScriptedPlayer, make_stress_scenario
+from planet_wars.engine.game_logic import GameManager
+
+
+def test_stress_scenario_runs_in_the_engine():
+    scenario = make_stress_scenario(60, 200, turns=5, orders_per_turn=20, seed=4)
+    assert str(scenario.game) == str(make_stress_scenario(60, 200, turns=5, orders_per_turn=20, seed=4).game)
+    assert len(scenario.game.planets) >= 60
+    assert len(scenario.game.fleets) == 200
+    initial_state = str(scenario.game)
+
+    players = scenario.get_players()
+    assert all(isinstance(player, ScriptedPlayer) for player in players)
+    game_manager = GameManager(scenario.game, *players, raise_bot_exceptions=True)
+    for turn in range(8):
+        assert game_manager.make_turn() == GameManager.IN_GAME_STATE
+        launched = [f for f in game_manager.game.fleets if f.turns_remaining == f.total_trip_length - 1]
+        if turn < 5:
+            # Most of the scripted orders are legal
+            assert len(launched) > 20
+        else:
+            # No more scripted orders
+            assert not launched
+    # The scenario's game is the initial state of every game
+    assert str(scenario.game) == initial_state
@@ -0,0 +1,88 @@
+import pytest
+
+from planet_wars.battles.tournament import get_map_by_id
+from planet_wars.bot_host.worker import RemotePlayer
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.planet_wars import AnytimePlayer, PlanetWars, Player
+from planet_wars.player_bots.baseline_code.baseline_bot import AttackWeakestPlanetFromStrongestBot
+from planet_wars.turn_timing import get_headroom_stats
+
+
+def test_headroom_stats():
+    stats = get_headroom_stats([0.01, 0.02, 0.03, 0.04], [0.04, 0.03, 0.02, -0.01])
+    assert stats.num_turns == 4
+    assert stats.mean_seconds == pytest.approx(0.025)
+    assert stats.max_seconds == pytest.approx(0.04)
+    assert stats.min_headroom_seconds == pytest.approx(-0.01)
+    assert stats.num_overruns == 1
+
+    no_deadline = get_headroom_stats([0.01, 0.02])
+    assert no_deadline.min_headroom_seconds is None and no_deadline.num_overruns == 0
+    assert get_headroom_stats([]).num_turns == 0
+
+
+class _DeadlineCheckingBot(Player):
+    """
+    Fails the game if its deadline is not the one the engine should give
+    """
+
+    NAME = "deadline checker"
+
+    def __init__(self, turn_time_limit):
+        self.turn_time_limit = turn_time_limit
+
+    def play_turn(self, game: PlanetWars):
+        if self.turn_time_limit is None:
+            assert game.deadline is None
+        else:
+            assert 0 < game.get_time_left() <= self.turn_time_limit
+        return []
+
+
+@pytest.mark.parametrize("remote, shared_state", [(False, False), (True, False), (True, True)])
+@pytest.mark.parametrize("turn_time_limit", [None, 0.5])
+def test_bots_get_the_turn_deadline(remote, shared_state, turn_time_limit):
+    bot = _DeadlineCheckingBot(turn_time_limit)
+    player = RemotePlayer(bot, shared_state=shared_state) if remote else bot
+    try:
+        game_manager = GameManager(
+            get_map_by_id(2), player, AttackWeakestPlanetFromStrongestBot(), raise_bot_exceptions=True,
+            turn_time_limit=turn_time_limit
+        )
+        for _ in range(10):
+            game_manager.make_turn()
+    finally:
+        if remote:
+            player.close()
+    stats = game_manager.get_headroom_stats(1)
+    assert stats.num_turns == 10
+    assert (stats.min_headroom_seconds is None) == (turn_time_limit is None)
+
+
+class _CountingAnytimeBot(AnytimePlayer):
+    """
+    A search that takes longer with the depth, checking the time in its loop
+    """
+
+    def search(self, game: PlanetWars, depth: int):
+        for _ in range(200 * 2 ** depth):
+            self.check_time()
+        return []
+
+
+def test_anytime_player_stops_at_the_deadline():
+    bot = _CountingAnytimeBot()
+    game_manager = GameManager(
+        get_map_by_id(2), bot, AttackWeakestPlanetFromStrongestBot(), raise_bot_exceptions=True, turn_time_limit=0.02
+    )
+    for _ in range(5):
+        game_manager.make_turn()
+    stats = bot.get_headroom_stats()
+    assert stats.num_turns == 5
+    assert stats.min_headroom_seconds is not None
+    assert 1 <= bot.last_depth < AnytimePlayer.MAX_DEPTH
+
+
+def test_anytime_player_search_must_be_implemented():
+    with pytest.raises(NotImplementedError):
+        AnytimePlayer().search(PlanetWars.parse_game_state(get_map_by_id(2)), 1)
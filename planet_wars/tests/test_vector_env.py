@@ -0,0 +1,85 @@
+import numpy as np
+
+from planet_wars.engine.game_logic import GameManager
+from planet_wars.engine.map_library import get_map_library
+from planet_wars.engine.vector_env import (
+    AGENT_WINS, IN_GAME, OPPONENT_WINS, TIE, PlanetWarsVectorEnv, attack_weakest_planet_from_strongest_policy
+)
+from planet_wars.planet_wars import Order, Player
+
+
+class _NoOrdersBot(Player):
+    def play_turn(self, game):
+        return []
+
+
+def _get_random_actions(observation, rng: np.random.Generator) -> np.ndarray:
+    """
+    Random orders, many of them invalid (not my planet, too many ships, no ships...)
+    """
+    num_envs, num_planets = observation["owners"].shape
+    actions = np.zeros((num_envs, 4, 3), dtype=np.int64)
+    actions[:, :, :2] = rng.integers(0, num_planets + 1, (num_envs, 4, 2))
+    actions[:, :, 2] = rng.integers(-2, 60, (num_envs, 4))
+    return actions
+
+
+def _to_orders(actions: np.ndarray):
+    return [Order(int(source), int(destination), int(ships)) for source, destination, ships in actions if ships > 0]
+
+
+def test_vector_env_matches_game_manager():
+    rng = np.random.default_rng(0)
+    opponent_actions = {}
+
+    def opponent_policy(observation):
+        if rng.random() < 0.5:
+            opponent_actions["last"] = attack_weakest_planet_from_strongest_policy(observation)
+        else:
+            opponent_actions["last"] = _get_random_actions(observation, rng)
+        return opponent_actions["last"]
+
+    num_envs = 16
+    env = PlanetWarsVectorEnv(num_envs, map_ids=[1, 2, 3, 8, 20], opponent_policy=opponent_policy, seed=1)
+    observation = env.reset()
+    map_library = get_map_library()
+
+    def new_game_manager(env_index):
+        map_id = int(env.map_ids[env.map_index[env_index]])
+        return GameManager(map_library.get_map(map_id), _NoOrdersBot(), _NoOrdersBot(), record_display=False)
+
+    game_managers = [new_game_manager(env_index) for env_index in range(num_envs)]
+    num_ended = 0
+    for step in range(250):
+        if step % 3:
+            actions = _get_random_actions(observation, rng)
+        else:
+            actions = attack_weakest_planet_from_strongest_policy(observation)
+        agent_player = env.agent_player.copy()
+        observation, _, done, info = env.step(actions)
+
+        for env_index, game_manager in enumerate(game_managers):
+            agent_orders = _to_orders(actions[env_index])
+            opponent_orders = _to_orders(opponent_actions["last"][env_index])
+            if agent_player[env_index] == 1:
+                state = game_manager.finish_turn(agent_orders, opponent_orders)
+            else:
+                state = game_manager.finish_turn(opponent_orders, agent_orders)
+            if state == GameManager.IN_GAME_STATE:
+                expected_outcome = IN_GAME
+            elif state == GameManager.TIE_STATE:
+                expected_outcome = TIE
+            elif (state == GameManager.PLAYER_1_WIN_STATE) == (agent_player[env_index] == 1):
+                expected_outcome = AGENT_WINS
+            else:
+                expected_outcome = OPPONENT_WINS
+            assert info["outcome"][env_index] == expected_outcome
+
+            if done[env_index]:
+                num_ended += 1
+                game_managers[env_index] = new_game_manager(env_index)
+                continue
+            planets = game_manager.game.get_planets_array()
+            np.testing.assert_array_equal(env.owners[env_index, :len(planets)], planets["owner"])
+            np.testing.assert_array_equal(env.ships[env_index, :len(planets)], planets["num_ships"])
+    assert num_ended > 0
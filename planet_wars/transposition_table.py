@@ -0,0 +1,167 @@
+from typing import Any, List, NamedTuple, Optional
+
+
+class TranspositionEntry(NamedTuple):
+    key: int
+    value: Any
+    depth: int
+    generation: int
+
+
+class TranspositionTable:
+    """
+    Fixed size table of evaluations keyed by state hash (see PlanetWars.get_state_hash), for search bots to reuse the
+    evaluation of a state reached by different move orders, and across turns. For example:
+        table = TranspositionTable(size=2 ** 16)
+        ...
+        entry = table.lookup(game.get_state_hash())
+        if entry is not None and entry.depth >= depth:
+            return entry.value
+        value = evaluate(game, depth)
+        table.store(game.get_state_hash(), value, depth)
+
+    Each key has one place in the table (a bucket of slots, chosen by the key), so the memory never grows. When the
+    place of a new entry is taken by another key, the replacement policy decides which entry to keep:
+        ALWAYS_REPLACE - the new entry always replaces the old one. Simple, and keeps the table fresh.
+        DEPTH_PREFERRED - the old entry is kept if it is from the current generation and was searched deeper than the
+                          new one - deep searches are the expensive ones to redo.
+        TWO_TIER - two slots per bucket: a depth preferred slot, and an always replace slot for the entries the first
+                   slot rejects. Keeps the deep entries without getting stuck with them.
+    Call new_generation() once per turn, so entries from the previous turns are reused when they are found, but don't
+    keep their place against the entries of the current turn.
+    """
+
+    ALWAYS_REPLACE = "always_replace"
+    DEPTH_PREFERRED = "depth_preferred"
+    TWO_TIER = "two_tier"
+    POLICIES = [ALWAYS_REPLACE, DEPTH_PREFERRED, TWO_TIER]
+
+    def __init__(self, size: int = 2 ** 16, policy: str = DEPTH_PREFERRED):
+        """
+        :param size: The maximal number of entries in the table
+        :param policy: The replacement policy, one of POLICIES
+        """
+        assert size >= 1, "size must be at least 1"
+        assert policy in self.POLICIES, f"Unknown replacement policy {policy}, use one of {self.POLICIES}"
+        self.policy = policy
+        self.slots_per_bucket = 2 if policy == self.TWO_TIER else 1
+        self.num_buckets = max(1, size // self.slots_per_bucket)
+        self.size = self.num_buckets * self.slots_per_bucket
+        self.generation = 0
+        self._entries: List[Optional[TranspositionEntry]] = [None] * self.size
+        self._num_entries = 0
+        self.hits = 0
+        self.misses = 0
+        # Number of stored entries that took the place of an entry of another key
+        self.overwrites = 0
+        # Number of entries not stored because the policy kept the old entry
+        self.rejections = 0
+
+    def __len__(self) -> int:
+        return self._num_entries
+
+    def __contains__(self, key: int) -> bool:
+        return self._find(key) is not None
+
+    def _bucket_start(self, key: int) -> int:
+        # The state hashes are uniformly mixed, so their low bits pick the bucket
+        return (key % self.num_buckets) * self.slots_per_bucket
+
+    def _find(self, key: int) -> Optional[int]:
+        """
+        :return: The slot of the entry of the key, None if it isn't in the table
+        """
+        start = self._bucket_start(key)
+        for slot in range(start, start + self.slots_per_bucket):
+            entry = self._entries[slot]
+            if entry is not None and entry.key == key:
+                return slot
+        return None
+
+    def lookup(self, key: int) -> Optional[TranspositionEntry]:
+        """
+        :return: The entry of the key, None if it isn't in the table
+        """
+        slot = self._find(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._entries[slot]
+
+    def get(self, key: int, default: Any = None, min_depth: int = 0) -> Any:
+        """
+        :return: The value of the key if it is in the table with depth of at least min_depth, otherwise default
+        """
+        entry = self.lookup(key)
+        if entry is None or entry.depth < min_depth:
+            return default
+        return entry.value
+
+    def store(self, key: int, value: Any, depth: int = 0) -> bool:
+        """
+        Store the value of the key, unless the replacement policy keeps the entry that has its place
+        :param depth: How deep the search behind the value is (0 for a static evaluation)
+        :return: True if the value was stored
+        """
+        slot = self._find(key)
+        if slot is None:
+            slot = self._choose_slot(key, depth)
+            if slot is None:
+                self.rejections += 1
+                return False
+        old_entry = self._entries[slot]
+        if old_entry is None:
+            self._num_entries += 1
+        elif old_entry.key != key:
+            self.overwrites += 1
+        self._entries[slot] = TranspositionEntry(key, value, depth, self.generation)
+        return True
+
+    def _choose_slot(self, key: int, depth: int) -> Optional[int]:
+        """
+        :return: The slot for a new entry of the key by the replacement policy, None to keep the old entries
+        """
+        start = self._bucket_start(key)
+        if self.policy == self.ALWAYS_REPLACE:
+            return start
+        first_entry = self._entries[start]
+        if (
+                first_entry is None or first_entry.generation != self.generation or
+                depth >= first_entry.depth
+        ):
+            if self.policy == self.TWO_TIER and first_entry is not None:
+                # The entry pushed out of the depth preferred slot moves to the always replace slot
+                if self._entries[start + 1] is None:
+                    self._num_entries += 1
+                else:
+                    self.overwrites += 1
+                self._entries[start + 1] = first_entry
+                self._entries[start] = None
+                self._num_entries -= 1
+            return start
+        if self.policy == self.TWO_TIER:
+            return start + 1
+        return None
+
+    def new_generation(self):
+        """
+        Start a new generation (call once per turn) - the entries stored before it lose their priority
+        """
+        self.generation += 1
+
+    def clear(self):
+        self._entries = [None] * self.size
+        self._num_entries = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+        self.rejections = 0
+
+    def get_hit_rate(self) -> float:
+        """
+        :return: The fraction of lookups that found their key
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class HeadroomStats:
+    """
+    How long a bot's turns took, and how much time was left of their deadline - to tune the depth of a search against
+    the real latency. Headroom is the time left at the end of the turn, negative when the turn overran its deadline.
+    The headroom fields are None when the turns had no deadline.
+    """
+    num_turns: int
+    mean_seconds: float
+    p95_seconds: float
+    max_seconds: float
+    min_headroom_seconds: Optional[float] = None
+    p5_headroom_seconds: Optional[float] = None
+    num_overruns: int = 0
+
+    def __str__(self):
+        s = (f"{self.num_turns} turns: mean {self.mean_seconds * 1000:.1f} ms, p95 {self.p95_seconds * 1000:.1f} ms, "
+             f"max {self.max_seconds * 1000:.1f} ms")
+        if self.min_headroom_seconds is not None:
+            s += (f", headroom p5 {self.p5_headroom_seconds * 1000:.1f} ms, min "
+                  f"{self.min_headroom_seconds * 1000:.1f} ms, {self.num_overruns} overruns")
+        return s
+
+
+def get_headroom_stats(
+        turn_seconds: Sequence[float], headroom_seconds: Optional[Sequence[float]] = None
+) -> HeadroomStats:
+    """
+    :param turn_seconds: How long each turn took
+    :param headroom_seconds: The time left to the deadline at the end of each turn, None if the turns had no deadline
+    :return: The summary of the turns
+    """
+    turn_seconds = np.asarray(turn_seconds, dtype=np.float64)
+    if len(turn_seconds) == 0:
+        return HeadroomStats(0, 0.0, 0.0, 0.0)
+    stats = HeadroomStats(
+        num_turns=len(turn_seconds),
+        mean_seconds=float(turn_seconds.mean()),
+        p95_seconds=float(np.percentile(turn_seconds, 95)),
+        max_seconds=float(turn_seconds.max())
+    )
+    if headroom_seconds is not None and len(headroom_seconds) > 0:
+        headroom_seconds = np.asarray(headroom_seconds, dtype=np.float64)
+        stats.min_headroom_seconds = float(headroom_seconds.min())
+        stats.p5_headroom_seconds = float(np.percentile(headroom_seconds, 5))
+        stats.num_overruns = int((headroom_seconds < 0).sum())
+    return stats